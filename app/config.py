@@ -0,0 +1,116 @@
+import os
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# โหมด production: ไม่เรียก cv2.imshow/waitKey และไม่เขียนภาพ debug ลงดิสก์บน request path
+HEADLESS = _env_bool("LPR_HEADLESS", True)
+
+# ภาพ debug จะถูกส่งเข้าคิวเขียนแบบ asynchronous เฉพาะเมื่อกำหนดโฟลเดอร์นี้
+DEBUG_DUMP_DIR = os.getenv("LPR_DEBUG_DUMP_DIR") or None
+DEBUG_DUMP_MAX_PER_SECOND = _env_float("LPR_DEBUG_DUMP_MAX_PER_SECOND", 1.0)
+DEBUG_DUMP_QUEUE_SIZE = _env_int("LPR_DEBUG_DUMP_QUEUE_SIZE", 16)
+
+# OCR cascade: ลอง variant ตามลำดับและหยุดเมื่อได้ป้ายที่สมบูรณ์พร้อมจังหวัด
+OCR_CASCADE = _env_bool("LPR_OCR_CASCADE", False)
+OCR_CASCADE_ORDER = [v.strip() for v in os.getenv("LPR_OCR_CASCADE_ORDER", "").split(",") if v.strip()] or None
+OCR_CASCADE_MIN_CONFIDENCE = _env_float("LPR_OCR_CASCADE_MIN_CONFIDENCE", 0.5)
+
+# OCR consensus: โหวตผลอ่านจากหลาย variant (ระดับตัวอักษร ถ่วงด้วย confidence)
+# และหยุด variant ที่เหลือเมื่อมี K variant อ่านป้ายตรงกัน (K=0 = อ่านครบทุก variant)
+# ปิดไว้เป็นค่าเริ่มต้น: เมื่อเปิด confidence ที่ตอบกลับเป็นค่าเฉลี่ยของกลุ่มที่ชนะ (ไม่ใช่ค่าสูงสุดแบบเดิม)
+OCR_CONSENSUS = _env_bool("LPR_OCR_CONSENSUS", False)
+OCR_CONSENSUS_K = _env_int("LPR_OCR_CONSENSUS_K", 2)
+OCR_CONSENSUS_SIMILARITY = _env_float("LPR_OCR_CONSENSUS_SIMILARITY", 0.75)
+
+# Shared detection: รัน text detector ของ EasyOCR ครั้งเดียวแล้วใช้กล่องเดิมกับทุก variant
+OCR_SHARED_DETECTION = _env_bool("LPR_OCR_SHARED_DETECTION", False)
+OCR_DETECTION_VARIANT = os.getenv("LPR_OCR_DETECTION_VARIANT", "sharpened")
+
+# จำนวนกล่องข้อความต่อ batch ของ recognizer (ทุกกล่องของป้ายถูก recognize ใน batch เดียว)
+OCR_RECOGNIZER_BATCH_SIZE = _env_int("LPR_OCR_RECOGNIZER_BATCH_SIZE", 16)
+
+# Preprocess profile ของ OCR: "quality" (Non-local means denoise) หรือ "fast" (bilateral filter เร็วกว่ามาก)
+OCR_PREPROCESS_PROFILE = os.getenv("LPR_OCR_PREPROCESS_PROFILE", "quality").strip().lower()
+
+# Worker mode: "thread" (ThreadPoolExecutor ใน process เดียว) หรือ "process" (InferenceWorkerPool)
+WORKER_MODE = os.getenv("LPR_WORKER_MODE", "thread").strip().lower()
+WORKERS = _env_int("LPR_WORKERS", 3)
+TORCH_THREADS = _env_int("LPR_TORCH_THREADS", max(1, (os.cpu_count() or 1) // max(1, WORKERS)))
+WORKER_STARTUP_TIMEOUT = _env_float("LPR_WORKER_STARTUP_TIMEOUT", 300.0)
+# เวลาสูงสุดต่องานใน process worker (วินาที, 0 = ไม่จำกัด) worker ที่ค้างเกินนี้จะถูก kill และสร้างใหม่
+WORKER_TASK_TIMEOUT = _env_float("LPR_WORKER_TASK_TIMEOUT", 120.0)
+
+# Batch endpoint: จำนวนไฟล์สูงสุดต่อ request (เกินตอบ 413) และจำนวนภาพต่อ YOLO forward pass
+BATCH_MAX_FILES = _env_int("LPR_BATCH_MAX_FILES", 32)
+BATCH_DETECT_MAX_SIZE = max(1, _env_int("LPR_BATCH_DETECT_MAX_SIZE", 8))
+
+# Micro-batching: รวม request ภาพเดี่ยวที่เข้ามาพร้อมกันเป็น YOLO batch เดียว (เฉพาะโหมด thread)
+MICROBATCH = _env_bool("LPR_MICROBATCH", False)
+MICROBATCH_MAX_SIZE = _env_int("LPR_MICROBATCH_MAX_SIZE", 16)
+MICROBATCH_MAX_WAIT_MS = _env_float("LPR_MICROBATCH_MAX_WAIT_MS", 8.0)
+
+# Result cache: key จาก hash ของ pixel (และ perceptual hash สำหรับภาพที่เกือบซ้ำ)
+CACHE = _env_bool("LPR_CACHE", False)
+CACHE_MAX_ENTRIES = _env_int("LPR_CACHE_MAX_ENTRIES", 1024)
+CACHE_TTL_SECONDS = _env_float("LPR_CACHE_TTL_SECONDS", 60.0)
+CACHE_PERCEPTUAL = _env_bool("LPR_CACHE_PERCEPTUAL", False)
+CACHE_MAX_HAMMING_DISTANCE = _env_int("LPR_CACHE_MAX_HAMMING_DISTANCE", 6)
+CACHE_HASH_SIZE = _env_int("LPR_CACHE_HASH_SIZE", 16)
+
+# Detector backend: "ultralytics" (new_trained_model.pt) หรือ "onnx" (new_trained_model.onnx ผ่าน onnxruntime)
+DETECTOR_BACKEND = os.getenv("LPR_DETECTOR_BACKEND", "ultralytics").strip().lower()
+DETECTOR_IMGSZ = _env_int("LPR_DETECTOR_IMGSZ", 640)
+# ย่อภาพก่อน inference ให้ด้านยาวไม่เกินค่านี้ (YOLO ย่อเหลือ DETECTOR_IMGSZ อยู่แล้ว) crop ยังตัดจากภาพเต็ม (0 = ไม่ย่อ)
+DETECTOR_MAX_SIDE = _env_int("LPR_DETECTOR_MAX_SIDE", 1280)
+ONNX_PROVIDERS = [p.strip() for p in os.getenv("LPR_ONNX_PROVIDERS", "").split(",") if p.strip()] or None
+
+# Multi-plate: คืนผลทุกป้ายในภาพ (OCR แต่ละป้ายขนานกัน) แทนการใช้เฉพาะป้ายที่ใหญ่ที่สุด
+MULTI_PLATE = _env_bool("LPR_MULTI_PLATE", False)
+MULTI_PLATE_MAX_PLATES = _env_int("LPR_MULTI_PLATE_MAX_PLATES", 8)
+MULTI_PLATE_DEDUP_IOU = _env_float("LPR_MULTI_PLATE_DEDUP_IOU", 0.3)
+
+# Image decode: ถ้ากำหนด จะ decode JPEG ขนาดใหญ่แบบลดความละเอียด (1/2, 1/4, 1/8) ให้ด้านยาวไม่ต่ำกว่าค่านี้ (0 = เต็มความละเอียด)
+DECODE_MAX_SIDE = _env_int("LPR_DECODE_MAX_SIDE", 0) or None
+
+# Job API (POST /jobs): คิวงานแบบ async ในหน่วยความจำ
+JOB_QUEUE_SIZE = _env_int("LPR_JOB_QUEUE_SIZE", 100)
+JOB_WORKERS = _env_int("LPR_JOB_WORKERS", 2)
+JOB_RESULT_TTL_SECONDS = _env_float("LPR_JOB_RESULT_TTL_SECONDS", 600.0)
+
+# Webhook (callback_url ของ POST /jobs): ปิดไว้เป็นค่าเริ่มต้น เมื่อเปิดส่งได้เฉพาะ host ที่ resolve เป็น public IP
+# LPR_WEBHOOK_ALLOWED_HOSTS จำกัด host ที่ส่งได้ (คั่นด้วย ,) LPR_WEBHOOK_ALLOW_PRIVATE=1 สำหรับ deployment ในเครือข่ายภายใน
+WEBHOOK_ENABLED = _env_bool("LPR_WEBHOOK_ENABLED", False)
+WEBHOOK_ALLOWED_HOSTS = [h.strip() for h in os.getenv("LPR_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+WEBHOOK_ALLOW_PRIVATE = _env_bool("LPR_WEBHOOK_ALLOW_PRIVATE", False)
+
+# Admission control: จำกัด request ที่ประมวลผลพร้อมกัน คิวรอมีขนาดจำกัด และ deadline ต่อ request (วินาที)
+# ค่าเริ่มต้นของความจุ = จำนวน executor thread x ขนาด micro-batch (ถ้าเปิด) เพื่อให้ batch เต็มได้
+# request ที่แตกงานหลายชิ้น (multi-plate / batch) ใช้หลายหน่วย ไม่เกิน WORKERS
+ADMISSION_CONTROL = _env_bool("LPR_ADMISSION_CONTROL", True)
+ADMISSION_MAX_CONCURRENT = _env_int(
+    "LPR_ADMISSION_MAX_CONCURRENT",
+    WORKERS * MICROBATCH_MAX_SIZE if MICROBATCH and WORKER_MODE == "thread" else WORKERS
+)
+ADMISSION_MAX_QUEUE = _env_int("LPR_ADMISSION_MAX_QUEUE", 32)
+ADMISSION_DEFAULT_TIMEOUT = _env_float("LPR_ADMISSION_DEFAULT_TIMEOUT", 30.0)
+ADMISSION_MAX_TIMEOUT = _env_float("LPR_ADMISSION_MAX_TIMEOUT", 300.0)
+
+# Startup: โหลดโมเดลใน background (ตอบ /live ได้ทันที ส่วน /ready รอจนโหลดเสร็จ) และ warm-up ด้วยภาพสังเคราะห์
+BACKGROUND_LOAD = _env_bool("LPR_BACKGROUND_LOAD", True)
+WARMUP = _env_bool("LPR_WARMUP", False)
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
-from PIL import Image
-import io
+from typing import List, Optional
+import json
 import logging
 import traceback
 import asyncio
+import contextlib
 from concurrent.futures import ThreadPoolExecutor
 import time
 
+from app import config
+from app.services import metrics
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.image_io import decode_image
+from app.services.job_queue import FINAL_STATES, PRIORITIES, JobQueue, JobQueueFull
+from app.services.pipeline import detector_kwargs, ocr_kwargs, recognize_plate
+from app.services.webhook import CallbackPolicy, CallbackRejected
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -27,95 +37,666 @@ app.add_middleware(
 
 detector = None
 ocr_service = None
-executor = ThreadPoolExecutor(max_workers=3)
+worker_pool = None
+batch_scheduler = None
+result_cache = None
+job_queue = None
+_load_task = None
+# สถานะการโหลดโมเดล: pending -> loading -> ready / failed (ใช้ตอบ /ready และ /health)
+load_state = {"status": "pending", "error": None, "started_at": None, "load_seconds": None, "components": {}}
+executor = ThreadPoolExecutor(max_workers=config.WORKERS)
+
+# จำกัด request ที่เข้าถึง executor พร้อมกัน (request ที่รอเกิน deadline หรือคิวเต็มจะได้ 503 ทันที)
+admission = AdmissionController(
+    max_concurrent=config.ADMISSION_MAX_CONCURRENT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    default_timeout=config.ADMISSION_DEFAULT_TIMEOUT,
+    max_timeout=config.ADMISSION_MAX_TIMEOUT
+) if config.ADMISSION_CONTROL else None
+
+# จำนวนงานที่รอ thread ว่างใน executor (อ่านตอน scrape /metrics)
+metrics.EXECUTOR_QUEUE_DEPTH.set_function(lambda: executor._work_queue.qsize())
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    metrics.IN_FLIGHT.inc()
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.IN_FLIGHT.dec()
+        # ใช้ path template ของ route (เช่น /jobs/{job_id}) เพื่อไม่ให้ label แตกตาม id
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint=endpoint)
+        metrics.REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+
+def _services_ready():
+    if worker_pool is not None:
+        return worker_pool.ready_workers > 0
+    return detector is not None and ocr_service is not None
 
 @app.on_event("startup")
 async def startup_event():
-    global detector, ocr_service
+    global result_cache, job_queue, _load_task
+
+    # คิวงานรับงานได้ทันที ส่วนงานที่รันก่อนโมเดลพร้อมจะได้ผล "AI services not loaded"
+    job_queue = JobQueue(
+        process_image_data,
+        max_queue_size=config.JOB_QUEUE_SIZE,
+        num_consumers=config.JOB_WORKERS,
+        result_ttl_seconds=config.JOB_RESULT_TTL_SECONDS,
+        callback_policy=CallbackPolicy(
+            config.WEBHOOK_ALLOWED_HOSTS, allow_private=config.WEBHOOK_ALLOW_PRIVATE
+        ) if config.WEBHOOK_ENABLED else None
+    )
+    job_queue.start()
+
+    if config.CACHE:
+        from app.services.result_cache import ResultCache
+        result_cache = ResultCache(
+            max_entries=config.CACHE_MAX_ENTRIES,
+            ttl_seconds=config.CACHE_TTL_SECONDS,
+            perceptual=config.CACHE_PERCEPTUAL,
+            max_hamming_distance=config.CACHE_MAX_HAMMING_DISTANCE,
+            hash_size=config.CACHE_HASH_SIZE
+        )
+
+    if config.BACKGROUND_LOAD:
+        # server เริ่มรับ request ทันที (/live) ส่วน /ready จะตอบ 200 เมื่อโหลดโมเดลเสร็จ
+        _load_task = asyncio.create_task(_load_services())
+    else:
+        await _load_services()
+
+async def _load_services():
+    global detector, ocr_service, worker_pool, batch_scheduler
+    load_state.update({"status": "loading", "started_at": time.time()})
+    start_time = time.perf_counter()
     try:
         logger.info("🚀 Initializing AI services...")
-        from app.services.detection_service import LicensePlateDetector
-        from app.services.ocr_service import OCRService
 
-        detector = LicensePlateDetector()
-        ocr_service = OCRService(debug=True)
+        if config.WORKER_MODE == "process":
+            from app.services.worker_pool import InferenceWorkerPool
 
-        logger.info("✅ All AI services initialized successfully")
+            # debug dumper ใช้ thread ภายใน process จึงไม่ส่งข้าม process
+            worker_pool = InferenceWorkerPool(
+                num_workers=config.WORKERS,
+                torch_threads=config.TORCH_THREADS,
+                task_timeout=config.WORKER_TASK_TIMEOUT,
+                detector_kwargs=detector_kwargs(),
+                ocr_kwargs=ocr_kwargs()
+            )
+            ready = await asyncio.get_event_loop().run_in_executor(
+                None, worker_pool.wait_ready, config.WORKER_STARTUP_TIMEOUT
+            )
+            if not ready:
+                raise RuntimeError("No inference worker finished loading models")
+            logger.info(f"✅ Inference worker pool ready: {worker_pool.get_stats()}")
+        else:
+            debug_dumper = None
+            if config.DEBUG_DUMP_DIR:
+                from app.services.debug_dump import DebugImageDumper
+                debug_dumper = DebugImageDumper(
+                    config.DEBUG_DUMP_DIR,
+                    max_per_second=config.DEBUG_DUMP_MAX_PER_SECOND,
+                    queue_size=config.DEBUG_DUMP_QUEUE_SIZE
+                )
+
+            # โหลด YOLO และ EasyOCR พร้อมกันคนละ thread (import torch/ultralytics/easyocr อยู่ในนี้)
+            loaded_detector, loaded_ocr = await asyncio.gather(
+                _timed_load("detector", _create_detector, debug_dumper),
+                _timed_load("ocr", _create_ocr_service, debug_dumper)
+            )
+            if loaded_ocr.reader is None:
+                raise RuntimeError("EasyOCR reader failed to initialize")
+            detector, ocr_service = loaded_detector, loaded_ocr
+
+            if config.MICROBATCH:
+                from app.services.batch_scheduler import MicroBatchScheduler
+                batch_scheduler = MicroBatchScheduler(
+                    detector, executor,
+                    max_batch_size=config.MICROBATCH_MAX_SIZE,
+                    max_wait_ms=config.MICROBATCH_MAX_WAIT_MS
+                )
+                batch_scheduler.start()
+
+        if config.WARMUP:
+            await _warm_up()
+
+        load_state.update({"status": "ready", "load_seconds": round(time.perf_counter() - start_time, 2)})
+        logger.info(f"✅ All AI services initialized successfully in {load_state['load_seconds']}s")
     except Exception as e:
         logger.error(f"❌ Failed to initialize AI services: {e}")
         logger.error(traceback.format_exc())
+        load_state.update({"status": "failed", "error": str(e)})
         detector = None
         ocr_service = None
 
+def _create_detector(debug_dumper):
+    from app.services.detection_service import LicensePlateDetector
+    return LicensePlateDetector(**detector_kwargs(debug_dumper))
+
+def _create_ocr_service(debug_dumper):
+    from app.services.ocr_service import OCRService
+    return OCRService(**ocr_kwargs(debug_dumper))
+
+async def _timed_load(name, factory, *args):
+    start_time = time.perf_counter()
+    # ใช้ default executor เพื่อไม่กิน thread ของ inference
+    service = await asyncio.get_event_loop().run_in_executor(None, factory, *args)
+    load_state["components"][name] = round(time.perf_counter() - start_time, 2)
+    logger.info(f"📦 Loaded {name} in {load_state['components'][name]}s")
+    return service
+
+def _synthetic_plate_image():
+    """ภาพสังเคราะห์รูปป้ายทะเบียน ใช้ warm-up ให้ torch/EasyOCR จัดเตรียม kernel และ buffer ก่อน request จริง"""
+    import cv2
+    import numpy as np
+    image = np.full((480, 640, 3), 90, dtype=np.uint8)
+    cv2.rectangle(image, (200, 200), (440, 290), (255, 255, 255), -1)
+    cv2.rectangle(image, (200, 200), (440, 290), (0, 0, 0), 3)
+    cv2.putText(image, "1234", (235, 270), cv2.FONT_HERSHEY_SIMPLEX, 1.8, (0, 0, 0), 4)
+    return image
+
+async def _warm_up():
+    start_time = time.perf_counter()
+    image = _synthetic_plate_image()
+    if worker_pool is not None:
+        # ส่งงานเท่าจำนวน worker เพื่อให้แต่ละ process ได้ warm-up
+        await asyncio.gather(*[
+            worker_pool.run('recognize', image) for _ in range(config.WORKERS)
+        ])
+    else:
+        await asyncio.get_event_loop().run_in_executor(
+            executor, recognize_plate, detector, ocr_service, image
+        )
+    load_state["components"]["warmup"] = round(time.perf_counter() - start_time, 2)
+    logger.info(f"🔥 Warm-up finished in {load_state['components']['warmup']}s")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _load_task is not None and not _load_task.done():
+        _load_task.cancel()
+    if job_queue is not None:
+        await job_queue.stop()
+    if batch_scheduler is not None:
+        await batch_scheduler.stop()
+    if worker_pool is not None:
+        worker_pool.close()
+
 @app.get("/")
 async def root():
     return {"message": "License Plate Detection API is running"}
 
+@app.get("/live")
+async def liveness():
+    """process ยังทำงานและ event loop ตอบสนอง (ไม่ขึ้นกับสถานะโมเดล)"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def readiness():
+    """พร้อมรับ request เมื่อโหลดโมเดลเสร็จแล้วเท่านั้น (ใช้เป็น readiness probe)"""
+    if load_state["status"] == "ready" and _services_ready():
+        return {"status": "ready"}
+    return JSONResponse(
+        status_code=503,
+        content={"status": load_state["status"], "error": load_state["error"]}
+    )
+
 @app.get("/health")
 async def health_check():
+    ready = load_state["status"] == "ready" and _services_ready()
+    yolo_loaded = detector is not None and detector.model is not None
+    if ready:
+        # ไม่มีโมเดล YOLO ยังทำงานได้ด้วย fallback regions แต่ช้าและแม่นยำน้อยกว่า
+        status = "healthy" if yolo_loaded or worker_pool is not None else "degraded"
+    else:
+        status = "unhealthy" if load_state["status"] == "failed" else "starting"
+
     return {
-        "status": "healthy",
-        "yolo_loaded": detector is not None,
-        "ocr_loaded": ocr_service is not None
+        "status": status,
+        "load_state": load_state,
+        "yolo_loaded": yolo_loaded,
+        "ocr_loaded": ocr_service is not None and ocr_service.reader is not None,
+        "worker_mode": config.WORKER_MODE,
+        "worker_pool": worker_pool.get_stats() if worker_pool is not None else None,
+        "job_queue": job_queue.get_stats() if job_queue is not None else None
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admission/stats")
+async def admission_stats():
+    if admission is None:
+        return {"success": False, "message": "Admission control is disabled"}
+    return {"success": True, **admission.get_stats()}
+
+@app.get("/ocr/variant-stats")
+async def ocr_variant_stats():
+    if ocr_service is None:
+        return {"success": False, "message": "AI services not loaded"}
+    return {"success": True, **ocr_service.get_variant_stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    if result_cache is None:
+        return {"success": False, "message": "Result cache is disabled"}
+    return {"success": True, **result_cache.get_stats()}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    if batch_scheduler is None:
+        return {"success": False, "message": "Micro-batching is disabled"}
+    return {"success": True, **batch_scheduler.get_stats()}
+
+def _single_response(combined_text, total_time, cached=False):
+    if combined_text:
+        return {
+            "success": True,
+            "message": "ตรวจจับป้ายทะเบียนสำเร็จ",
+            "combined_text": combined_text.strip(),
+            "processing_time": total_time,
+            "cached": cached
+        }
+    else:
+        return {
+            "success": False,
+            "message": "ไม่สามารถอ่านข้อความจากป้ายทะเบียนได้",
+            "combined_text": None,
+            "processing_time": total_time,
+            "cached": cached
+        }
+
+def _admission_slot(request, timeout=None, fan_out=1):
+    """
+    slot ของ admission control ตาม deadline จาก query ?timeout= หรือ header X-Request-Timeout (วินาที)
+    fan_out: จำนวนงานที่ request นี้ส่งเข้า executor พร้อมกันได้ (ใช้ได้ไม่เกิน WORKERS thread)
+    """
+    if admission is None:
+        return contextlib.nullcontext()
+    if timeout is None:
+        try:
+            timeout = float(request.headers.get("x-request-timeout", ""))
+        except ValueError:
+            timeout = None
+    return admission.slot(admission.deadline_for(timeout), weight=min(fan_out, config.WORKERS))
+
+def _shed_response(rejection):
+    return JSONResponse(
+        status_code=503,
+        content={
+            "success": False,
+            "message": "เซิร์ฟเวอร์มีงานมากเกินไป กรุณาลองใหม่ภายหลัง",
+            "reason": rejection.reason,
+            "combined_text": None,
+            "processing_time": 0
+        },
+        headers={"Retry-After": str(rejection.retry_after)}
+    )
+
 @app.post("/detect-license-plate")
-async def detect_license_plate(file: UploadFile = File(...)):
-    start_time = time.time()
+async def detect_license_plate(
+    request: Request,
+    file: UploadFile = File(...),
+    multi_plate: Optional[bool] = None,
+    timeout: Optional[float] = None
+):
     try:
         image_data = await file.read()
-        image = Image.open(io.BytesIO(image_data))
-        logger.info(f"📷 Image loaded: {image.size}")
+        use_multi_plate = config.MULTI_PLATE if multi_plate is None else multi_plate
+        fan_out = config.MULTI_PLATE_MAX_PLATES if use_multi_plate else 1
+        async with _admission_slot(request, timeout, fan_out):
+            if await request.is_disconnected():
+                # client เลิกรอระหว่างอยู่ในคิวแล้ว ไม่ต้องประมวลผล
+                logger.info("🔌 Client disconnected before processing, skipping")
+                return _single_response(None, 0)
+            return await process_image_data(image_data, multi_plate=multi_plate)
+
+    except AdmissionRejected as e:
+        return _shed_response(e)
+    except Exception as e:
+        logger.error(f"💥 Error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return {
+            "success": False,
+            "message": f"เกิดข้อผิดพลาด: {str(e)}",
+            "combined_text": None,
+            "processing_time": 0
+        }
+
+async def process_image_data(image_data, multi_plate=None):
+    """
+    pipeline เต็มของภาพหนึ่งภาพ (decode -> cache -> detection -> OCR) คืนค่า response dict
+    ใช้ร่วมกันระหว่าง endpoint แบบ sync และ job queue
+    """
+    start_time = time.time()
+    # decode เป็น BGR ndarray ครั้งเดียวใน executor แล้วใช้ array นี้ตลอด pipeline
+    image = await asyncio.get_event_loop().run_in_executor(
+        executor, decode_image, image_data, config.DECODE_MAX_SIDE
+    )
+    del image_data
+    logger.info(f"📷 Image loaded: {image.shape[1]}x{image.shape[0]}")
+
+    if not _services_ready():
+        return {"success": False, "message": "AI services not loaded", "combined_text": None, "processing_time": 0}
 
-        if detector is None or ocr_service is None:
-            return {"success": False, "message": "AI services not loaded", "combined_text": None, "processing_time": 0}
+    if config.MULTI_PLATE if multi_plate is None else multi_plate:
+        # ไม่ใช้ cache ในโหมดนี้ เพราะ cache เก็บเฉพาะ combined_text
+        # ไม่ถือ reference ของภาพต้นฉบับไว้ใน frame นี้ ให้ pipeline ปล่อยภาพได้ทันทีหลัง crop
+        recognition = _recognize_all_plates(image)
+        del image
+        plates = await recognition
+        combined_text = plates[0]["text"] if plates else ""
+        response = _single_response(combined_text, time.time() - start_time)
+        response["plates"] = plates
+        return response
 
-        # ตรวจจับป้าย (YOLO) ก่อน แต่ถ้า skip YOLO จะใช้ทั้งภาพ
+    cache_keys = None
+    if result_cache is not None:
+        # hash ของ pixel ที่ decode แล้ว (คำนวณใน executor เพราะภาพใหญ่ใช้เวลา)
+        cache_keys = await asyncio.get_event_loop().run_in_executor(
+            executor, result_cache.keys_for, image
+        )
+        cached_text = result_cache.get(cache_keys)
+        if cached_text is not None:
+            logger.info("⚡ Cache hit")
+            return _single_response(cached_text, time.time() - start_time, cached=True)
+
+    recognition = _recognize_image(image)
+    del image
+    combined_text = await recognition
+
+    # ไม่ cache ผลว่าง (ไม่พบทั้งป้ายและจังหวัด): เฟรมเสียเฟรมเดียวจะไม่ถูกตอบซ้ำกับภาพเดียวกัน/ใกล้เคียงตลอด TTL
+    if cache_keys is not None and combined_text.strip():
+        result_cache.put(cache_keys, combined_text)
+
+    return _single_response(combined_text, time.time() - start_time)
+
+async def _recognize_all_plates(image):
+    """
+    ตรวจจับทุกป้ายในภาพ แล้ว OCR แต่ละป้ายขนานกันบน executor / worker pool
+    ถ้าไม่พบป้ายเลยจะ OCR ทั้งภาพเป็นผลเดียว (bbox เป็น None)
+    """
+    detect_kwargs = {"dedup_iou": config.MULTI_PLATE_DEDUP_IOU, "max_plates": config.MULTI_PLATE_MAX_PLATES}
+
+    if worker_pool is not None:
+        plates = await worker_pool.run('detect_all', image, **detect_kwargs)
+        # crop จากภาพใน process หลัก แล้วกระจายไปหลาย worker
+        ocr_inputs = [
+            image[y1:y2, x1:x2]
+            for x1, y1, x2, y2 in (plate['bbox'] for plate in plates)
+        ] or [image]
+        # run copy crop ลง shared memory ใน executor (ไม่บล็อก event loop)
+        details = await asyncio.gather(*[worker_pool.run('ocr_details', ocr_input) for ocr_input in ocr_inputs])
+    else:
+        loop = asyncio.get_event_loop()
+        plates = await loop.run_in_executor(
+            executor, lambda: detector.detect_all_plates(image, **detect_kwargs)
+        )
+        ocr_inputs = [plate['image'] for plate in plates] or [image]
+        # crop ของ YOLO เป็น copy แล้ว ถ้าพบป้ายภาพต้นฉบับจะไม่ถูกอ้างอิงอีก
+        del image
+        details = await asyncio.gather(*[
+            loop.run_in_executor(executor, ocr_service.extract_text_with_details, ocr_input)
+            for ocr_input in ocr_inputs
+        ])
+
+    if not plates:
+        plates = [{'bbox': None, 'class_id': None, 'confidence': None}]
+
+    return [
+        {
+            "bbox": plate['bbox'],
+            "confidence": plate['confidence'],
+            "class_id": plate['class_id'],
+            "text": detail['text'].strip(),
+            "plate": detail['plate'],
+            "province": detail['province']
+        }
+        for plate, detail in zip(plates, details)
+    ]
+
+async def _recognize_image(image):
+    """รัน detection + OCR กับภาพเดียว คืนค่า combined_text"""
+    if worker_pool is not None:
+        # ส่งทั้ง pipeline ไปที่ process worker (ภาพส่งผ่าน shared memory)
+        return await worker_pool.run('recognize', image)
+
+    # ตรวจจับป้าย (YOLO) ก่อน แต่ถ้า skip YOLO จะใช้ทั้งภาพ
+    if batch_scheduler is not None:
+        # รวมกับ request อื่นที่เข้ามาพร้อมกันเป็น YOLO batch เดียว
+        detected_plates = await batch_scheduler.detect(image)
+    else:
         detected_plates = await asyncio.get_event_loop().run_in_executor(
             executor, detector.detect_license_plates, image
         )
-        logger.info(f"✅ Detection: {len(detected_plates)} regions")
-
-        # OCR
-        combined_text = ""
-        if detected_plates:
-            # ใช้ผลแรก (หรือเปลี่ยน logic เลือกที่มั่นใจที่สุด)
-            plate_image = detected_plates[0]['image']
-            combined_text = await asyncio.get_event_loop().run_in_executor(
-                executor, lambda: ocr_service.extract_text(plate_image)
-            )
-        else:
-            # ถ้า YOLO skip ก็ส่งทั้งภาพให้ OCR
-            combined_text = await asyncio.get_event_loop().run_in_executor(
-                executor, lambda: ocr_service.extract_text(image)
-            )
+    logger.info(f"✅ Detection: {len(detected_plates)} regions")
 
-        total_time = time.time() - start_time
+    # OCR
+    if detected_plates:
+        # ใช้ผลแรก (หรือเปลี่ยน logic เลือกที่มั่นใจที่สุด)
+        plate_image = detected_plates[0]['image']
+        # ปล่อยภาพต้นฉบับและผล detection อื่นๆ ก่อนรอ OCR (ลด peak memory ต่อ request)
+        del detected_plates, image
+        return await asyncio.get_event_loop().run_in_executor(
+            executor, lambda: ocr_service.extract_text(plate_image)
+        )
 
-        if combined_text:
-            return {
-                "success": True,
-                "message": "ตรวจจับป้ายทะเบียนสำเร็จ",
-                "combined_text": combined_text.strip(),
-                "processing_time": total_time
-            }
-        else:
-            return {
+    # ถ้า YOLO skip ก็ส่งทั้งภาพให้ OCR
+    return await asyncio.get_event_loop().run_in_executor(
+        executor, lambda: ocr_service.extract_text(image)
+    )
+
+@app.post("/detect-license-plate/batch")
+async def detect_license_plate_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    timeout: Optional[float] = None
+):
+    if len(files) > config.BATCH_MAX_FILES:
+        return JSONResponse(
+            status_code=413,
+            content={
                 "success": False,
-                "message": "ไม่สามารถอ่านข้อความจากป้ายทะเบียนได้",
-                "combined_text": None,
-                "processing_time": total_time
+                "message": f"จำนวนไฟล์เกิน {config.BATCH_MAX_FILES} ไฟล์ต่อ batch",
+                "results": [],
+                "processing_time": 0
             }
+        )
+
+    # ทั้ง batch ใช้ slot เดียว (น้ำหนักตามจำนวนไฟล์)
+    try:
+        async with _admission_slot(request, timeout, len(files)):
+            return await _process_batch(files)
+    except AdmissionRejected as e:
+        return _shed_response(e)
+
+async def _process_batch(files):
+    start_time = time.time()
+    try:
+        if not _services_ready():
+            return {"success": False, "message": "AI services not loaded", "results": [], "processing_time": 0}
+
+        # decode ทีละไฟล์ ไฟล์ที่เสียได้ผลล้มเหลวเฉพาะไฟล์นั้น ไม่ทำให้ทั้ง batch ล้ม
+        decoded = []  # (file, image, error)
+        for file in files:
+            try:
+                image_data = await file.read()
+                image = await asyncio.get_event_loop().run_in_executor(
+                    executor, decode_image, image_data, config.DECODE_MAX_SIDE
+                )
+                decoded.append((file, image, None))
+            except Exception as e:
+                logger.warning(f"⚠️ Batch: cannot decode '{file.filename}': {e}")
+                decoded.append((file, None, e))
+        images = [image for _, image, _ in decoded if image is not None]
+        logger.info(f"📷 Batch loaded: {len(images)}/{len(files)} images")
+
+        if worker_pool is not None:
+            # โหมด process: กระจายแต่ละภาพไปยัง worker ต่างๆ แบบขนาน
+            texts = await asyncio.gather(*[
+                worker_pool.run('recognize', image)
+                for image in images
+            ], return_exceptions=True)
+        else:
+            # ตรวจจับป้ายด้วย YOLO forward pass ละไม่เกิน BATCH_DETECT_MAX_SIZE ภาพ
+            batch_plates = []
+            for start in range(0, len(images), config.BATCH_DETECT_MAX_SIZE):
+                batch_plates.extend(await asyncio.get_event_loop().run_in_executor(
+                    executor, detector.detect_license_plates_batch,
+                    images[start:start + config.BATCH_DETECT_MAX_SIZE]
+                ))
+
+            # OCR แต่ละภาพ (ใช้ผลแรกของแต่ละภาพ เหมือน endpoint เดี่ยว)
+            ocr_inputs = [
+                detected_plates[0]['image'] if detected_plates else image
+                for image, detected_plates in zip(images, batch_plates)
+            ]
+            texts = await asyncio.gather(*[
+                asyncio.get_event_loop().run_in_executor(executor, ocr_service.extract_text, ocr_input)
+                for ocr_input in ocr_inputs
+            ], return_exceptions=True)
+
+        results = []
+        texts = iter(texts)
+        for file, image, error in decoded:
+            combined_text = next(texts) if image is not None else None
+            if error is not None:
+                results.append({
+                    "filename": file.filename,
+                    "success": False,
+                    "message": f"ไม่สามารถอ่านไฟล์ภาพได้: {str(error)}",
+                    "combined_text": None
+                })
+            elif isinstance(combined_text, Exception):
+                logger.error(f"💥 Batch item '{file.filename}' failed: {combined_text}")
+                results.append({
+                    "filename": file.filename,
+                    "success": False,
+                    "message": f"เกิดข้อผิดพลาด: {str(combined_text)}",
+                    "combined_text": None
+                })
+            elif combined_text:
+                results.append({
+                    "filename": file.filename,
+                    "success": True,
+                    "message": "ตรวจจับป้ายทะเบียนสำเร็จ",
+                    "combined_text": combined_text.strip()
+                })
+            else:
+                results.append({
+                    "filename": file.filename,
+                    "success": False,
+                    "message": "ไม่สามารถอ่านข้อความจากป้ายทะเบียนได้",
+                    "combined_text": None
+                })
+
+        return {
+            "success": any(r["success"] for r in results),
+            "message": f"ประมวลผล {len(results)} ภาพ",
+            "results": results,
+            "processing_time": time.time() - start_time
+        }
 
     except Exception as e:
-        logger.error(f"💥 Error: {str(e)}")
+        logger.error(f"💥 Batch error: {str(e)}")
         logger.error(traceback.format_exc())
         return {
             "success": False,
             "message": f"เกิดข้อผิดพลาด: {str(e)}",
-            "combined_text": None,
+            "results": [],
             "processing_time": 0
         }
 
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    priority: str = "normal",
+    callback_url: Optional[str] = None,
+    multi_plate: Optional[bool] = None
+):
+    """รับภาพเข้าคิวแล้วตอบ job id ทันที (ดูผลที่ GET /jobs/{id} หรือ SSE /jobs/{id}/events)"""
+    if priority not in PRIORITIES:
+        return JSONResponse(status_code=400, content={
+            "success": False, "message": f"priority ต้องเป็นหนึ่งใน {list(PRIORITIES)}"
+        })
+    if callback_url:
+        if job_queue.callback_policy is None:
+            return JSONResponse(status_code=400, content={
+                "success": False, "message": "ไม่ได้เปิดใช้ webhook (LPR_WEBHOOK_ENABLED)"
+            })
+        try:
+            # resolve DNS เป็น blocking I/O จึงรันใน default executor
+            await asyncio.get_event_loop().run_in_executor(None, job_queue.callback_policy.check, callback_url)
+        except CallbackRejected as e:
+            logger.warning(f"🚫 Rejected callback_url '{callback_url}': {e}")
+            return JSONResponse(status_code=400, content={
+                "success": False, "message": f"callback_url ไม่ได้รับอนุญาต: {e}"
+            })
+
+    # เก็บไฟล์ดิบไว้ในคิว decode ตอนประมวลผลจริง
+    image_data = await file.read()
+    try:
+        job = job_queue.submit(
+            image_data, priority=priority, callback_url=callback_url,
+            options={"multi_plate": multi_plate}
+        )
+    except JobQueueFull as e:
+        logger.warning("🚦 Job queue full, rejecting request")
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "message": "คิวงานเต็ม กรุณาลองใหม่ภายหลัง"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    logger.info(f"📥 Job {job.id} queued (priority={priority})")
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return JSONResponse(status_code=404, content={"success": False, "message": "ไม่พบงาน"})
+    return {"success": True, **job.to_dict()}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: ส่งสถานะทุกครั้งที่เปลี่ยน และปิด stream เมื่องานเสร็จหรือล้มเหลว"""
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return JSONResponse(status_code=404, content={"success": False, "message": "ไม่พบงาน"})
+
+    async def stream():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                payload = json.dumps(job.to_dict(), ensure_ascii=False)
+                yield f"event: {job.status}\ndata: {payload}\n\n"
+                if job.status in FINAL_STATES:
+                    return
+            elif not await job_queue.wait_for_change(job, version, timeout=15.0):
+                # keep-alive กัน proxy ตัดการเชื่อมต่อระหว่างรอ
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,147 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+
+from app.services.metrics import ADMISSION_REJECTED, ADMISSION_WAITING
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """request ถูกปฏิเสธก่อนเริ่มประมวลผล (ให้ API ตอบ 503 พร้อม Retry-After ทันที)"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    จำกัดจำนวน request ที่ประมวลผลพร้อมกันก่อนถึง executor
+    - นับเป็นหน่วย (weight): request ปกติใช้ 1 หน่วย request ที่แตกงานหลายชิ้นเข้า executor
+      (multi-plate, batch) ใช้หลายหน่วย รวมกันไม่เกิน max_concurrent
+    - เกิน max_concurrent จะรอในคิว FIFO ขนาดไม่เกิน max_queue (เต็มแล้วปฏิเสธทันที: queue_full)
+    - ทุก request มี deadline ถ้ายังรอในคิวจนเลย deadline จะถูกยกเลิก (deadline_exceeded)
+      งานที่ client เลิกรอแล้วจึงไม่ถูกส่งเข้า executor
+    """
+
+    def __init__(self, max_concurrent=3, max_queue=32, default_timeout=30.0, max_timeout=300.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+
+        self._active = 0
+        self._waiters = deque()  # [future, deadline, weight]
+        self._stats = {'admitted': 0, 'queued': 0, 'queue_full': 0, 'deadline_exceeded': 0}
+        self._service_time = 1.0  # ค่าเฉลี่ยแบบ EMA (วินาที) ใช้ประมาณ Retry-After
+
+    def deadline_for(self, timeout=None):
+        """แปลง timeout (วินาที, จาก client หรือค่า default) เป็น deadline บนนาฬิกา monotonic"""
+        if timeout is None or timeout <= 0:
+            timeout = self.default_timeout
+        return time.monotonic() + min(timeout, self.max_timeout)
+
+    def retry_after(self):
+        waiting = len(self._waiters) + 1
+        return max(1, int(round(waiting * self._service_time / max(1, self.max_concurrent))))
+
+    def _reject(self, reason):
+        self._stats[reason] += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+        logger.warning(f"🚦 Request shed: {reason} (active={self._active}, waiting={len(self._waiters)})")
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _weight(self, weight):
+        # request เดียวใช้ได้ไม่เกินความจุทั้งหมด (ไม่เช่นนั้นจะรอไม่มีวันได้)
+        return max(1, min(weight, self.max_concurrent))
+
+    async def acquire(self, deadline, weight=1):
+        weight = self._weight(weight)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._reject('deadline_exceeded')
+
+        if self._active + weight <= self.max_concurrent and not self._waiters:
+            self._active += weight
+            self._stats['admitted'] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject('queue_full')
+
+        future = asyncio.get_event_loop().create_future()
+        entry = [future, deadline, weight]
+        self._waiters.append(entry)
+        self._stats['queued'] += 1
+        ADMISSION_WAITING.set(len(self._waiters))
+        try:
+            await asyncio.wait_for(future, remaining)
+        except asyncio.TimeoutError:
+            self._remove_waiter(entry)
+            self._reject('deadline_exceeded')
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # ได้ slot มาแล้วแต่ถูกยกเลิกพร้อมกัน ต้องคืน slot
+                self.release(weight)
+            else:
+                self._remove_waiter(entry)
+            raise
+        self._stats['admitted'] += 1
+
+    def release(self, weight=1):
+        self._active -= self._weight(weight)
+        self._grant()
+
+    def _grant(self):
+        now = time.monotonic()
+        # ส่งหน่วยที่ว่างต่อให้ผู้รอตามลำดับ FIFO (ผู้รอคนแรกที่หน่วยยังไม่พอจะรอต่อ คนหลังไม่แซง)
+        while self._waiters:
+            future, deadline, waiter_weight = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if deadline <= now:
+                # หมดเวลาแล้ว ไม่ต้องเริ่มงาน ผู้รอจะถูกปฏิเสธด้วย deadline_exceeded
+                self._waiters.popleft()
+                future.set_exception(asyncio.TimeoutError())
+                continue
+            if self._active + waiter_weight > self.max_concurrent:
+                break
+            self._waiters.popleft()
+            self._active += waiter_weight
+            future.set_result(None)
+        ADMISSION_WAITING.set(len(self._waiters))
+
+    def _remove_waiter(self, entry):
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            pass
+        # ผู้รอที่ออกไปอาจเป็นหัวคิวที่หนัก ผู้รอที่เบากว่าข้างหลังอาจได้หน่วยที่ว่างอยู่แล้วทันที
+        self._grant()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, deadline, weight=1):
+        """async with controller.slot(deadline, weight): ... ประมวลผลเมื่อได้ slot แล้ว"""
+        await self.acquire(deadline, weight)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - start)
+            self.release(weight)
+
+    def get_stats(self):
+        return {
+            'active': self._active,
+            'waiting': len(self._waiters),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'default_timeout': self.default_timeout,
+            'avg_service_seconds': round(self._service_time, 3),
+            **self._stats
+        }
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+
+from app.services.metrics import MICROBATCH_QUEUE_DEPTH, MICROBATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchScheduler:
+    """
+    รวม request ภาพเดี่ยวที่เข้ามาในช่วงเวลาสั้นๆ (max_wait_ms หรือครบ max_batch_size)
+    แล้วเรียก LicensePlateDetector.detect_license_plates_batch ครั้งเดียว
+    จากนั้นส่งผลกลับให้แต่ละ coroutine ที่รออยู่
+    """
+
+    def __init__(self, detector, executor, max_batch_size=16, max_wait_ms=8.0, poll_interval_ms=1.0):
+        self.detector = detector
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.poll_interval = max(0.0001, poll_interval_ms / 1000.0)
+
+        self._queue = None
+        self._task = None
+        # event loop เก็บ task แบบ weak reference ต้องถือ reference ของ dispatch ที่ยังทำงานอยู่เอง
+        self._dispatch_tasks = set()
+
+        self.batches = 0
+        self.images = 0
+        self.batch_size_histogram = Counter()
+        self.queue_depth_histogram = Counter()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_event_loop().create_task(self._run())
+        logger.info(f"🧺 Micro-batching enabled: max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000:.1f}ms")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # request ที่ยังอยู่ในคิวจะไม่ถูกประมวลผลแล้ว ให้ผู้รอได้ error ทันที (ไม่ค้างจนหมด timeout ของตัวเอง)
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending)
+        # รอ batch ที่ส่งไปแล้วให้ตอบ request ให้ครบก่อนปิด
+        if self._dispatch_tasks:
+            await asyncio.gather(*self._dispatch_tasks, return_exceptions=True)
+
+    async def detect(self, image):
+        """ส่งภาพเข้าคิวและรอผลลัพธ์ (รูปแบบเดียวกับ detect_license_plates)"""
+        if self._task is None:
+            raise RuntimeError("Micro-batch scheduler is not running")
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            # เก็บ request เพิ่มจนครบ batch หรือหมดเวลารอ
+            try:
+                while len(batch) < self.max_batch_size:
+                    while len(batch) < self.max_batch_size and not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= self.max_batch_size or remaining <= 0:
+                        break
+                    await asyncio.sleep(min(remaining, self.poll_interval))
+            except asyncio.CancelledError:
+                # ถูก stop ระหว่างรอเก็บ batch: request ที่ดึงออกจากคิวแล้วต้องได้ error ด้วย
+                self._fail(batch)
+                raise
+
+            queue_depth = self._queue.qsize()
+            self.batches += 1
+            self.images += len(batch)
+            self.batch_size_histogram[len(batch)] += 1
+            self.queue_depth_histogram[queue_depth] += 1
+            MICROBATCH_SIZE.observe(len(batch))
+            MICROBATCH_QUEUE_DEPTH.observe(queue_depth)
+
+            # dispatch แยก task เพื่อให้เก็บ batch ถัดไปได้ระหว่างรอ inference
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    @staticmethod
+    def _fail(items):
+        for _, future in items:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batch scheduler stopped"))
+
+    async def _dispatch(self, batch):
+        images = [image for image, _ in batch]
+        try:
+            results = await asyncio.get_event_loop().run_in_executor(
+                self.executor, self.detector.detect_license_plates_batch, images
+            )
+        except Exception as e:
+            logger.error(f"Micro-batch detection failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), detected_plates in zip(batch, results):
+            if not future.done():
+                future.set_result(detected_plates)
+
+    def get_stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self.queue_depth(),
+            'batches': self.batches,
+            'images': self.images,
+            'avg_batch_size': self.images / self.batches if self.batches else 0.0,
+            'batch_size_histogram': dict(sorted(self.batch_size_histogram.items())),
+            'queue_depth_histogram': dict(sorted(self.queue_depth_histogram.items()))
+        }
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def box_areas(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def iou_one_to_many(box, boxes):
+    """IoU ระหว่างกล่องเดียวกับหลายกล่อง (x1, y1, x2, y2)"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box_areas(box[None, :])[0] + box_areas(boxes) - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def nms(boxes, scores, iou_threshold):
+    """Non-maximum suppression แบบ vectorized คืนค่า index ของกล่องที่เก็บไว้ (เรียงตาม score)"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = iou_one_to_many(boxes[i], boxes[order[1:]])
+        order = order[1:][ious <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes, scores, class_ids, iou_threshold):
+    """NMS แยกตาม class (เลื่อนพิกัดแต่ละ class ออกจากกันแล้วทำ NMS ครั้งเดียว)"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if boxes.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.asarray(class_ids, dtype=np.float32)[:, None] * (boxes.max() + 1.0)
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+def postprocess_boxes(detections, image_shape, padding=0.0, dedup_iou=None):
+    """
+    แปลงผล detection (N, 6) = x1, y1, x2, y2, confidence, class_id เป็นกล่องจำนวนเต็มพร้อมใช้ crop
+    ทุกขั้นตอนทำบน array: ตัดทศนิยม, clip ให้อยู่ในภาพ, เพิ่ม padding รอบกล่อง, ตัดกล่องว่าง,
+    ตัดกล่องซ้ำด้วย IoU (ถ้ากำหนด dedup_iou) แล้วเรียงตามพื้นที่จากมากไปน้อย
+    คืนค่า (boxes int64 (N, 4), confidences, class_ids, areas)
+    """
+    detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+    height, width = image_shape[:2]
+
+    # ตัดทศนิยมแบบเดียวกับ int() แล้ว clip ให้อยู่ในภาพ
+    boxes = detections[:, :4].astype(np.int64)
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+    if padding:
+        pad_x = ((boxes[:, 2] - boxes[:, 0]) * padding).astype(np.int64)
+        pad_y = ((boxes[:, 3] - boxes[:, 1]) * padding).astype(np.int64)
+        boxes[:, 0] = np.maximum(0, boxes[:, 0] - pad_x)
+        boxes[:, 1] = np.maximum(0, boxes[:, 1] - pad_y)
+        boxes[:, 2] = np.minimum(width, boxes[:, 2] + pad_x)
+        boxes[:, 3] = np.minimum(height, boxes[:, 3] + pad_y)
+
+    confidences = detections[:, 4]
+    class_ids = detections[:, 5].astype(np.int64)
+
+    valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    boxes, confidences, class_ids = boxes[valid], confidences[valid], class_ids[valid]
+
+    if dedup_iou is not None and len(boxes) > 1:
+        # เก็บกล่องที่มั่นใจที่สุดก่อน ตัดกล่องที่ซ้อนทับเกิน dedup_iou (คงลำดับเดิมของกล่องที่เหลือ)
+        keep = np.sort(nms(boxes, confidences, dedup_iou))
+        boxes, confidences, class_ids = boxes[keep], confidences[keep], class_ids[keep]
+
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-areas, kind='stable')
+    return boxes[order], confidences[order], class_ids[order], areas[order]
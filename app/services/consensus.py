@@ -0,0 +1,109 @@
+import logging
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+# ชื่อผลอ่านที่ได้จากการรวม fragments ของทุก variant (ร่วมโหวตแต่ไม่นับเป็น variant ที่อ่านตรงกัน)
+POOLED = 'pooled'
+
+
+def vote_characters(readings):
+    """
+    โหวตทีละตัวอักษรจากหลายผลอ่าน [(text, weight)] โดยจัดแนวกับผลที่น้ำหนักมากที่สุด (anchor) ด้วย difflib
+    ตำแหน่งที่จัดแนวได้ (equal / replace ความยาวเท่ากัน) ให้คะแนนตามน้ำหนัก ส่วนที่แทรก/ขาดไม่นับ
+    """
+    anchor = max(readings, key=lambda reading: reading[1])[0]
+    slots = [defaultdict(float) for _ in anchor]
+
+    for text, weight in readings:
+        matcher = SequenceMatcher(None, anchor, text, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+                for offset in range(i2 - i1):
+                    slots[i1 + offset][text[j1 + offset]] += weight
+
+    return "".join(max(slot.items(), key=lambda item: item[1])[0] for slot in slots)
+
+
+class VariantConsensus:
+    """
+    รวมผลอ่านของแต่ละ variant (ป้ายและจังหวัดที่ดีที่สุดของ variant นั้น) เป็นคำตอบเดียว
+    - จัดกลุ่มผลอ่านที่เหมือนหรือใกล้เคียงกัน (SequenceMatcher ratio >= similarity)
+    - กลุ่มที่มีป้ายถูกรูปแบบชนะกลุ่มที่มีแต่ fragment ก่อน แล้วจึงดูผลรวม confidence
+      จากนั้นโหวตทีละตัวอักษรภายในกลุ่ม
+    - จังหวัดเลือกด้วยผลรวม confidence
+    agreement() ใช้หยุด variant ที่เหลือเมื่อมี k variant อ่านป้ายที่ถูกรูปแบบได้ตรงกัน
+    ผลรวม fragments ข้าม variant ส่งเข้ามาด้วยชื่อ POOLED ได้ (ร่วมโหวต ไม่นับใน agreement)
+    """
+
+    def __init__(self, is_valid_plate, similarity=0.75):
+        self.is_valid_plate = is_valid_plate
+        self.similarity = similarity
+        self.plates = []     # (variant, text, conf)
+        self.provinces = []  # (variant, province, conf)
+        self._result = None
+
+    def add(self, variant, plate, plate_conf, province, province_conf):
+        if plate:
+            self.plates.append((variant, plate, plate_conf))
+        if province:
+            self.provinces.append((variant, province, province_conf))
+        self._result = None
+
+    def _plate_groups(self):
+        groups = []
+        for reading in sorted(self.plates, key=lambda r: r[2], reverse=True):
+            for group in groups:
+                if SequenceMatcher(None, group[0][1], reading[1], autojunk=False).ratio() >= self.similarity:
+                    group.append(reading)
+                    break
+            else:
+                groups.append([reading])
+        return groups
+
+    def result(self):
+        """
+        คืนค่า (plate, plate_conf, province, province_conf, agreement) หรือ None ถ้ายังไม่มีผลอ่าน
+        plate_conf / province_conf เป็นค่าเฉลี่ยของผลอ่านที่ชนะ (ไม่ใช่ค่าสูงสุดแบบ _select_result)
+        """
+        if self._result is not None:
+            return self._result
+        if not self.plates and not self.provinces:
+            return None
+
+        plate, plate_conf, agreement = "", 0.0, 0
+        if self.plates:
+            group = max(self._plate_groups(), key=lambda g: (
+                any(self.is_valid_plate(r[1]) for r in g), sum(r[2] for r in g), len(g)
+            ))
+            voted = vote_characters([(text, conf) for _, text, conf in group])
+            # ผลโหวตต้องยังเป็นป้ายที่ถูกรูปแบบ ไม่เช่นนั้นใช้ป้ายที่ถูกรูปแบบและมั่นใจที่สุดของกลุ่ม
+            plate = voted
+            if not self.is_valid_plate(voted):
+                plate = next((text for _, text, _ in group if self.is_valid_plate(text)), group[0][1])
+            plate_conf = sum(r[2] for r in group) / len(group)
+            if self.is_valid_plate(plate):
+                agreement = sum(1 for variant, text, _ in group if text == plate and variant != POOLED)
+
+        province, province_conf = "", 0.0
+        if self.provinces:
+            totals = defaultdict(list)
+            for _, name, conf in self.provinces:
+                totals[name].append(conf)
+            province, confs = max(totals.items(), key=lambda item: (sum(item[1]), len(item[1])))
+            province_conf = sum(confs) / len(confs)
+
+        self._result = (plate, plate_conf, province, province_conf, agreement)
+        logger.info(
+            f"🗳️ Consensus: plate='{plate}' ({agreement}/{len(self.plates)} variants agree), "
+            f"province='{province}'"
+        )
+        return self._result
+
+    def agreement(self):
+        """จำนวน variant ที่อ่านป้ายที่ถูกรูปแบบตรงกับผลโหวต (นับเฉพาะเมื่อพบจังหวัดแล้ว)"""
+        result = self.result()
+        if result is None or not result[2]:
+            return 0
+        return result[4]
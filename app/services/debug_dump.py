@@ -0,0 +1,78 @@
+import os
+import time
+import queue
+import logging
+import threading
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class DebugImageDumper:
+    """
+    เขียนภาพ debug ลงดิสก์ผ่านคิวและ thread พื้นหลัง
+    จำกัดจำนวนชุดภาพต่อวินาที และทิ้งงานเมื่อคิวเต็ม เพื่อไม่ให้ request path รอ I/O
+    """
+
+    def __init__(self, output_dir, max_per_second=1.0, queue_size=16):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._min_interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._last_accepted = 0.0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self.written = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="debug-dumper", daemon=True)
+        self._thread.start()
+        logger.info(f"🗂️ Debug image dumper writing to {output_dir} (max {max_per_second}/s)")
+
+    def dump(self, tag, images):
+        """
+        ส่งชุดภาพ (dict ชื่อ -> ndarray) เข้าคิวเขียน คืนค่า False ถ้าถูกทิ้งเพราะ rate limit หรือคิวเต็ม
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_accepted < self._min_interval:
+                self.dropped += 1
+                return False
+            self._last_accepted = now
+
+        # copy เพราะ caller อาจนำ buffer ไปใช้ต่อหลังจากคืนค่า
+        snapshot = {name: image.copy() for name, image in images.items() if image is not None}
+        try:
+            self._queue.put_nowait((tag, int(time.time() * 1000), snapshot))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            tag, timestamp, images = item
+            for name, image in images.items():
+                path = os.path.join(self.output_dir, f"{timestamp}_{tag}_{name}.jpg")
+                try:
+                    cv2.imwrite(path, image)
+                    self.written += 1
+                except Exception as e:
+                    logger.warning(f"Failed to write debug image {path}: {e}")
+
+    def get_stats(self):
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize()
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
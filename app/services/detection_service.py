@@ -3,28 +3,42 @@ import logging
 import cv2
 import numpy as np
 from PIL import Image
-from ultralytics import YOLO
-import torch
+
+from app import config
+from app.services.box_ops import iou_one_to_many, nms, postprocess_boxes
+from app.services.image_io import to_bgr
+from app.services.metrics import DETECTION_FALLBACKS, stage_timer
 
 logger = logging.getLogger(__name__)
 
 class LicensePlateDetector:
-    def __init__(self, confidence_threshold=0.03):
+    def __init__(self, confidence_threshold=0.03, headless=None, debug_dumper=None, backend=None,
+                 crop_padding=0.0, detection_max_side=None):
         self.confidence_threshold = confidence_threshold
+        # ย่อภาพให้ด้านยาวไม่เกินค่านี้ก่อนส่งเข้า YOLO (None/0 = ไม่ย่อ) แล้ว crop จากภาพเต็มความละเอียด
+        self.detection_max_side = config.DETECTOR_MAX_SIDE if detection_max_side is None else detection_max_side
+        # สัดส่วนขอบที่เพิ่มรอบกล่องก่อน crop (เช่น 0.05 แบบ _extract_detection)
+        self.crop_padding = crop_padding
+        # headless: ไม่เปิดหน้าต่าง GUI (production) / debug_dumper: คิวเขียนภาพ debug แบบ async (optional)
+        self.headless = config.HEADLESS if headless is None else headless
+        self.debug_dumper = debug_dumper
+        # backend: "ultralytics" (.pt ผ่าน torch) หรือ "onnx" (.onnx ผ่าน onnxruntime ไม่ต้องใช้ torch)
+        self.backend = (backend or config.DETECTOR_BACKEND).lower()
         self.model = None
         self.model_type = "unknown"
         self._load_best_available_model()
     
     def _load_best_available_model(self):
+        extension = ".onnx" if self.backend == "onnx" else ".pt"
         model_paths = [
-            ("new_trained_model.pt", "custom_latest_new"),
-            ("yolov8n.pt", "pretrained_fallback")
+            ("new_trained_model" + extension, "custom_latest_new"),
+            ("yolov8n" + extension, "pretrained_fallback")
         ]
         
         for model_path, model_type in model_paths:
             try:
                 if os.path.exists(model_path):
-                    self.model = YOLO(model_path)
+                    self.model = self._load_model(model_path)
                     self.model_type = model_type
                     logger.info(f"✅ Loaded {model_type} model: {model_path}")
                     
@@ -43,59 +57,81 @@ class LicensePlateDetector:
         self.model = None
         self.model_type = "none"
     
+    def _load_model(self, model_path):
+        if self.backend == "onnx":
+            from app.services.detector_backends import OnnxDetectorBackend
+            return OnnxDetectorBackend(
+                model_path,
+                imgsz=config.DETECTOR_IMGSZ,
+                providers=config.ONNX_PROVIDERS
+            )
+
+        from ultralytics import YOLO
+        return YOLO(model_path)
+
+    def _run_model(self, images, conf, verbose=False):
+        """รันโมเดลกับภาพ BGR หนึ่งภาพหรือ list ของภาพ คืนค่าผลลัพธ์ดิบต่อภาพ"""
+        with stage_timer("yolo"):
+            if self.backend == "onnx":
+                return self.model(images, conf=conf)
+            return self.model(images, conf=conf, verbose=verbose)
+
+    def _detection_input(self, cv_image):
+        """ย่อภาพสำหรับ inference ให้ด้านยาวไม่เกิน detection_max_side คืนค่า (ภาพที่ใช้ detect, scale)"""
+        height, width = cv_image.shape[:2]
+        longest = max(height, width)
+        if not self.detection_max_side or longest <= self.detection_max_side:
+            return cv_image, 1.0
+
+        scale = self.detection_max_side / longest
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        return cv2.resize(cv_image, size, interpolation=cv2.INTER_AREA), scale
+
+    def _detect_boxes(self, cv_images):
+        """
+        รันโมเดลกับภาพย่อของแต่ละภาพ (forward pass เดียว)
+        คืนค่า array (N, 6) ต่อภาพ โดยพิกัดกล่องแปลงกลับเป็นพิกัดของภาพต้นฉบับแล้ว
+        """
+        inputs, scales = zip(*(self._detection_input(cv_image) for cv_image in cv_images))
+        results = self._run_model(list(inputs), self.confidence_threshold)
+        del inputs
+
+        detections = []
+        for result, scale in zip(results, scales):
+            detection = self._result_array(result)
+            if scale != 1.0:
+                detection = np.array(detection, dtype=np.float32)
+                detection[:, :4] /= scale
+            detections.append(detection)
+        return detections
+
     def detect_license_plates(self, image):  # YOLO version
         try:
             if self.model is None:
                 logger.error("No model available for detection")
                 return self._fallback_detection(image)
 
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            results = self.model(cv_image, conf=self.confidence_threshold, verbose=False)
-
-            detected_boxes = []
-
-            # เก็บ box ทั้งหมดพร้อม area
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        confidence = float(box.conf[0])
-                        class_id = int(box.cls[0])
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        area = (x2 - x1) * (y2 - y1)
-
-                        detected_boxes.append({
-                            'box': (x1, y1, x2, y2),
-                            'confidence': confidence,
-                            'class_id': class_id,
-                            'area': area
-                        })
-
-            if not detected_boxes:
-                return self._fallback_detection(image)
+            cv_image = to_bgr(image)
+            detections = self._detect_boxes([cv_image])
 
             # เลือก box ที่มีพื้นที่ใหญ่ที่สุด
-            selected_box = max(detected_boxes, key=lambda b: b['area'])
+            selected_box = self._select_largest_box(detections[0], cv_image.shape)
+            if selected_box is None:
+                return self._fallback_detection(image)
+
             x1, y1, x2, y2 = selected_box['box']
             confidence = selected_box['confidence']
             class_id = selected_box['class_id']
 
-            # วาด label
-            labeled_img = cv_image.copy()
-            cv2.rectangle(labeled_img, (x1, y1), (x2, y2), (0,255,0), 2)
-            cv2.putText(labeled_img, f"ID:{class_id} Conf:{confidence:.2f}", 
-                        (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
-            cv2.imshow("Labeled Detection", labeled_img)
-            cv2.waitKey(0)
-
-            # crop detection
-            crop = cv_image[y1:y2, x1:x2]
+            # crop detection จากภาพเต็มความละเอียด (copy เพื่อไม่ให้ crop ค้างอ้างอิงภาพต้นฉบับทั้งภาพ)
+            crop = cv_image[y1:y2, x1:x2].copy()
 
             logger.info(f"YOLO crop shape: {crop.shape}, dtype: {crop.dtype}")
-            logger.info(f"YOLO crop min/max: {crop.min()}/{crop.max}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"YOLO crop min/max: {crop.min()}/{crop.max()}")
 
-            cv2.imwrite('/t,p/yolo_original_crop.jpg', crop)
-            logger.info("Saved original YOLO crop to /tmp/yolo_original_crop.jpg")
+            if self.debug_dumper is not None:
+                self.debug_dumper.dump("yolo", {'original_crop': crop})
             
             """
             # เพิ่มคุณภาพของภาพก่อนส่งให้ ocr
@@ -117,17 +153,157 @@ class LicensePlateDetector:
             crop = cv2.fastNlMeansDenoisingColored(crop, None, 10, 10 ,7, 21)
             """
 
-            cv2.imshow("Enhanced Crop", crop)
-            cv2.waitKey(0)
+            if not self.headless:
+                self._show_detection(cv_image, crop, (x1, y1, x2, y2), class_id, confidence)
 
-            detected_plates = [{'image': crop, 'class_id': class_id, 'confidence': confidence}]
-            cv2.destroyAllWindows()
+            detected_plates = [{
+                'image': crop, 'bbox': [x1, y1, x2, y2], 'class_id': class_id, 'confidence': confidence
+            }]
             return detected_plates
 
         except Exception as e:
             logger.error(f"Detection failed: {e}")
             return self._fallback_detection(image)
 
+    def _show_detection(self, cv_image, crop, box, class_id, confidence):
+        """แสดงผล detection บนหน้าต่าง GUI (ใช้เฉพาะตอน debug บนเครื่อง dev เท่านั้น)"""
+        x1, y1, x2, y2 = box
+
+        # วาด label
+        labeled_img = cv_image.copy()
+        cv2.rectangle(labeled_img, (x1, y1), (x2, y2), (0,255,0), 2)
+        cv2.putText(labeled_img, f"ID:{class_id} Conf:{confidence:.2f}", 
+                    (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+        cv2.imshow("Labeled Detection", labeled_img)
+        cv2.waitKey(0)
+
+        cv2.imshow("Enhanced Crop", crop)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
+
+    def detect_license_plates_batch(self, images):
+        """
+        ตรวจจับป้ายทะเบียนจากหลายภาพด้วย YOLO forward pass เดียว
+        คืนค่า list ของผลลัพธ์ตามลำดับภาพที่ส่งเข้ามา (รูปแบบเดียวกับ detect_license_plates)
+        """
+        if not images:
+            return []
+
+        if self.model is None:
+            logger.error("No model available for batch detection")
+            return [self._fallback_detection(image) for image in images]
+
+        try:
+            cv_images = [to_bgr(image) for image in images]
+            results = self._detect_boxes(cv_images)
+        except Exception as e:
+            logger.error(f"Batch detection failed: {e}")
+            return [self._fallback_detection(image) for image in images]
+
+        batch_plates = []
+        for image, cv_image, result in zip(images, cv_images, results):
+            selected_box = self._select_largest_box(result, cv_image.shape)
+            if selected_box is None:
+                batch_plates.append(self._fallback_detection(image))
+                continue
+
+            x1, y1, x2, y2 = selected_box['box']
+            batch_plates.append([{
+                'image': cv_image[y1:y2, x1:x2].copy(),
+                'bbox': [x1, y1, x2, y2],
+                'class_id': selected_box['class_id'],
+                'confidence': selected_box['confidence']
+            }])
+
+        logger.info(f"📦 Batch detection: {len(images)} images in one forward pass")
+        return batch_plates
+
+    def detect_all_plates(self, image, dedup_iou=0.3, max_plates=None):
+        """
+        ตรวจจับป้ายทุกป้ายที่ผ่าน confidence_threshold (เช่น รถหลายคัน หรือป้ายมอเตอร์ไซค์กับรถยนต์ในภาพเดียว)
+        ตัดกล่องซ้ำด้วย IoU แล้วเรียงตามพื้นที่จากมากไปน้อย ไม่ใช้ fallback regions
+        คืนค่า list ของ dict: image (crop BGR), bbox, class_id, confidence
+        """
+        if self.model is None:
+            logger.error("No model available for detection")
+            return []
+
+        try:
+            cv_image = to_bgr(image)
+            detections = self._detect_boxes([cv_image])
+            boxes = self._collect_boxes(detections[0], cv_image.shape, dedup_iou=dedup_iou)
+        except Exception as e:
+            logger.error(f"Multi-plate detection failed: {e}")
+            return []
+
+        if max_plates is not None:
+            boxes = boxes[:max_plates]
+
+        logger.info(f"✅ Multi-plate detection: {len(boxes)} plates")
+        return [
+            {
+                'image': cv_image[y1:y2, x1:x2].copy(),
+                'bbox': [x1, y1, x2, y2],
+                'class_id': box['class_id'],
+                'confidence': box['confidence']
+            }
+            for box in boxes
+            for x1, y1, x2, y2 in [box['box']]
+        ]
+
+    def detect_plate_boxes(self, cv_image, dedup_iou=0.3):
+        """
+        ตรวจจับป้ายทุกกล่องในภาพ BGR (เช่นเฟรมจากวิดีโอ) โดยไม่ crop และไม่ใช้ fallback
+        กล่องที่ซ้อนกันเกิน dedup_iou ถูกตัดออกเหมือน detect_all_plates (None = ไม่ตัด)
+        คืนค่า list ของ dict: box, confidence, class_id, area
+        """
+        if self.model is None:
+            return []
+
+        detections = self._detect_boxes([cv_image])
+        return self._collect_boxes(detections[0], cv_image.shape, dedup_iou=dedup_iou)
+
+    def _result_array(self, result):
+        """ดึง x1, y1, x2, y2, confidence, class_id ของทุกกล่องเป็น NumPy array เดียว (N, 6)"""
+        if isinstance(result, np.ndarray):
+            # ผลจาก ONNX backend เป็น array อยู่แล้ว
+            return result
+
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+        # ย้ายข้อมูลจาก tensor มา host ครั้งเดียว แทนการอ่านทีละกล่อง
+        return boxes.data.cpu().numpy()[:, :6]
+
+    def _postprocess_boxes(self, result, image_shape, dedup_iou=None):
+        with stage_timer("box_postprocess"):
+            return postprocess_boxes(
+                self._result_array(result), image_shape,
+                padding=self.crop_padding, dedup_iou=dedup_iou
+            )
+
+    def _select_largest_box(self, result, image_shape):
+        """คืนค่า box ที่มีพื้นที่ใหญ่ที่สุด (dict) หรือ None ถ้าไม่มีกล่อง"""
+        boxes, confidences, class_ids, areas = self._postprocess_boxes(result, image_shape)
+        if len(boxes) == 0:
+            return None
+        return {
+            'box': tuple(boxes[0].tolist()),
+            'confidence': float(confidences[0]),
+            'class_id': int(class_ids[0]),
+            'area': int(areas[0])
+        }
+
+    def _collect_boxes(self, result, image_shape, dedup_iou=None):
+        """เก็บ box ทั้งหมดของผลลัพธ์ YOLO หนึ่งภาพพร้อม area (เรียงตาม area มากไปน้อย)"""
+        boxes, confidences, class_ids, areas = self._postprocess_boxes(result, image_shape, dedup_iou)
+        return [
+            {'box': tuple(box), 'confidence': confidence, 'class_id': class_id, 'area': area}
+            for box, confidence, class_id, area in zip(
+                boxes.tolist(), confidences.tolist(), class_ids.tolist(), areas.tolist()
+            )
+        ]
+
     # def detect_license_plates(self, image):  # Non-YOLO version
     #     """
     #     ส่งภาพเต็มไปให้ OCR อ่านโดยตรง (ไม่ใช้ YOLO)
@@ -195,27 +371,12 @@ class LicensePlateDetector:
     def _extract_detection(self, box, cv_image, confidence, model_type):
         """Extract detection data from bounding box"""
         try:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            
-            # Ensure coordinates are within image bounds
-            h, w = cv_image.shape[:2]
-            x1 = max(0, min(x1, w))
-            y1 = max(0, min(y1, h))
-            x2 = max(0, min(x2, w))
-            y2 = max(0, min(y2, h))
-            
-            if x2 <= x1 or y2 <= y1:
+            # clip ให้อยู่ในภาพ และเพิ่มขอบเขตรอบๆ detection เล็กน้อย
+            row = np.append(box.xyxy[0].tolist(), [confidence, 0])
+            boxes = postprocess_boxes(row, cv_image.shape, padding=0.05)[0]
+            if len(boxes) == 0:
                 return None
-            
-            # เพิ่มขอบเขตรอบๆ detection เล็กน้อย
-            padding_x = int((x2 - x1) * 0.05)
-            padding_y = int((y2 - y1) * 0.05)
-            
-            x1 = max(0, x1 - padding_x)
-            y1 = max(0, y1 - padding_y)
-            x2 = min(w, x2 + padding_x)
-            y2 = min(h, y2 + padding_y)
+            x1, y1, x2, y2 = boxes[0].tolist()
                 
             cropped = cv_image[y1:y2, x1:x2]
             if cropped.size == 0:
@@ -224,7 +385,7 @@ class LicensePlateDetector:
             return {
                 'bbox': [x1, y1, x2, y2],
                 'confidence': confidence,
-                'image': cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB),
+                'image': cropped,
                 'source': model_type
             }
         except Exception as e:
@@ -278,7 +439,7 @@ class LicensePlateDetector:
                 regions.append({
                     'bbox': [rx1, ry1, rx2, ry2],
                     'confidence': confidence * 0.7,  # ลดความมั่นใจเล็กน้อย
-                    'image': cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB),
+                    'image': cropped,
                     'source': f'vehicle_region_{i}'
                 })
                 
@@ -326,7 +487,7 @@ class LicensePlateDetector:
                 regions.append({
                     'bbox': [x1, y1, x2, y2],
                     'confidence': 0.15,  # เพิ่มความมั่นใจสำหรับ fallback
-                    'image': cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB),
+                    'image': cropped,
                     'source': f'enhanced_fallback_{i}'
                 })
                 
@@ -359,7 +520,7 @@ class LicensePlateDetector:
                 regions.append({
                     'bbox': [x1, y1, x2, y2],
                     'confidence': 0.1,
-                    'image': cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB),
+                    'image': cropped,
                     'source': f'fallback_{i}'
                 })
                 
@@ -373,46 +534,18 @@ class LicensePlateDetector:
         if not detections:
             return []
             
-        # เรียงตาม confidence (สูงสุดก่อน)
-        detections.sort(key=lambda x: x['confidence'], reverse=True)
-        
-        unique_detections = []
-        for detection in detections:
-            is_duplicate = False
-            for existing in unique_detections:
-                overlap = self._calculate_overlap(detection['bbox'], existing['bbox'])
-                if overlap > 0.3:  # ลด threshold จาก 0.5 เป็น 0.3
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                unique_detections.append(detection)
-                
-        return unique_detections
+        # เรียงตาม confidence (สูงสุดก่อน) แล้วตัดกล่องที่ซ้อนทับเกิน 0.3 ด้วย NMS แบบ vectorized
+        boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+        confidences = np.array([d['confidence'] for d in detections], dtype=np.float32)
+        keep = nms(boxes, confidences, 0.3)  # ลด threshold จาก 0.5 เป็น 0.3
+        return [detections[i] for i in keep]
     
     def _calculate_overlap(self, bbox1, bbox2):
         """Calculate overlap ratio between two bounding boxes"""
         try:
-            x1_1, y1_1, x2_1, y2_1 = bbox1
-            x1_2, y1_2, x2_2, y2_2 = bbox2
-            
-            # คำนวณ intersection
-            x1_i = max(x1_1, x1_2)
-            y1_i = max(y1_1, y1_2)
-            x2_i = min(x2_1, x2_2)
-            y2_i = min(y2_1, y2_2)
-            
-            if x2_i <= x1_i or y2_i <= y1_i:
-                return 0.0
-                
-            intersection_area = (x2_i - x1_i) * (y2_i - y1_i)
-            
-            # คำนวณ union
-            area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-            area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-            union_area = area1 + area2 - intersection_area
-            
-            return intersection_area / union_area if union_area > 0 else 0.0
+            return float(iou_one_to_many(
+                np.asarray(bbox1, dtype=np.float32), np.asarray([bbox2], dtype=np.float32)
+            )[0])
         except Exception:
             return 0.0
     
@@ -420,7 +553,8 @@ class LicensePlateDetector:
         """Fallback detection when main detection fails"""
         try:
             logger.warning("Using fallback detection")
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            DETECTION_FALLBACKS.inc()
+            cv_image = to_bgr(image)
             return self._create_enhanced_fallback_regions(cv_image)
         except Exception as e:
             logger.error(f"Fallback detection failed: {e}")
@@ -430,6 +564,7 @@ class LicensePlateDetector:
         """Get information about the loaded model"""
         return {
             'model_type': self.model_type,
+            'backend': self.backend,
             'confidence_threshold': self.confidence_threshold,
             'model_available': self.model is not None
         }
@@ -442,17 +577,20 @@ class LicensePlateDetector:
     def debug_detection(self, image):
         """Debug function to show what the detector is seeing"""
         try:
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            cv_image = to_bgr(image)
             h, w = cv_image.shape[:2]
             logger.info(f"Image dimensions: {w}x{h}")
             
             if self.model is not None:
-                results = self.model(cv_image, conf=0.01, verbose=True)  # Very low confidence for debug
+                results = self._run_model(cv_image, 0.01, verbose=True)  # Very low confidence for debug
                 logger.info(f"Raw detection results: {len(results)}")
                 
                 for i, result in enumerate(results):
                     logger.info(f"Result {i}: {result}")
-                    if hasattr(result, 'boxes') and result.boxes is not None:
+                    if isinstance(result, np.ndarray):
+                        for j, box in enumerate(self._collect_boxes(result, cv_image.shape)):
+                            logger.info(f"  Box {j}: conf={box['confidence']:.3f}, cls={box['class_id']}, bbox={box['box']}")
+                    elif hasattr(result, 'boxes') and result.boxes is not None:
                         logger.info(f"Boxes: {len(result.boxes)}")
                         for j, box in enumerate(result.boxes):
                             logger.info(f"  Box {j}: conf={float(box.conf[0]):.3f}, cls={int(box.cls[0])}, bbox={box.xyxy[0].tolist()}")
@@ -463,7 +601,7 @@ class LicensePlateDetector:
     def enhance_image_for_detection(self, image):
         """ปรับปรุงภาพเพื่อช่วยในการตรวจจับ"""
         try:
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            cv_image = to_bgr(image)
             
             # ปรับขนาดถ้าเล็กเกินไป
             h, w = cv_image.shape[:2]
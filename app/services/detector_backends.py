@@ -0,0 +1,139 @@
+"""
+Backend สำหรับรัน detector บน CPU โดยไม่ต้อง import torch/ultralytics
+
+    python -m app.services.detector_backends new_trained_model.pt --imgsz 640
+
+จะ export โมเดล .pt เป็น .onnx (fixed input shape) ไว้ข้างไฟล์เดิม (ขั้นตอนนี้ต้องมี ultralytics)
+"""
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+from app.services.box_ops import batched_nms
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxDetectorBackend:
+    """
+    รัน YOLOv8 ที่ export เป็น ONNX ด้วย onnxruntime (เลือก execution provider ได้ เช่น OpenVINOExecutionProvider)
+    letterbox เป็นขนาดคงที่ และทำ NMS ด้วย NumPy ให้ผลเหมือน ultralytics (conf > threshold, iou 0.7, max_det 300)
+    คืนค่าต่อภาพเป็น array (N, 6): x1, y1, x2, y2, confidence, class_id ในพิกัดภาพต้นฉบับ
+    """
+
+    def __init__(self, model_path, imgsz=640, providers=None, iou_threshold=0.7, max_det=300,
+                 intra_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options,
+            providers=providers or ['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # ใช้ขนาด input ของโมเดลถ้าเป็น static shape
+        batch, _, height, width = model_input.shape
+        self.input_shape = (
+            height if isinstance(height, int) else imgsz,
+            width if isinstance(width, int) else imgsz
+        )
+        self.fixed_batch = batch if isinstance(batch, int) else None
+
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+        self.model_path = model_path
+        logger.info(f"✅ ONNX detector loaded: {model_path} input={self.input_shape} "
+                    f"providers={self.session.get_providers()}")
+
+    def __call__(self, images, conf=0.25):
+        if isinstance(images, np.ndarray):
+            images = [images]
+
+        prepared = [self._letterbox(image) for image in images]
+        outputs = []
+        step = self.fixed_batch or len(prepared)
+        for start in range(0, len(prepared), step):
+            chunk = prepared[start:start + step]
+            tensor = np.stack([tensor for tensor, _, _ in chunk])
+            outputs.extend(self.session.run(None, {self.input_name: tensor})[0])
+
+        return [
+            self._postprocess(output, conf, gain, pad, image.shape[:2])
+            for output, (_, gain, pad), image in zip(outputs, prepared, images)
+        ]
+
+    def _letterbox(self, image):
+        """ปรับขนาดคงอัตราส่วนแล้วเติมขอบสี 114 ให้เท่ากับ input_shape (แบบเดียวกับ ultralytics LetterBox)"""
+        height, width = image.shape[:2]
+        target_h, target_w = self.input_shape
+        gain = min(target_h / height, target_w / width)
+        new_w, new_h = int(round(width * gain)), int(round(height * gain))
+
+        if (new_w, new_h) != (width, height):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        dw, dh = (target_w - new_w) / 2, (target_h - new_h) / 2
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+        # BGR HWC uint8 -> RGB CHW float32
+        tensor = cv2.dnn.blobFromImage(image, scalefactor=1 / 255.0, swapRB=True)[0]
+        return tensor, gain, (left, top)
+
+    def _postprocess(self, output, conf, gain, pad, original_shape):
+        # output: (4 + num_classes, anchors) -> (anchors, 4 + num_classes)
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_scores)), class_ids]
+
+        mask = scores > conf
+        if not mask.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        predictions, scores, class_ids = predictions[mask], scores[mask], class_ids[mask]
+
+        cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        keep = batched_nms(boxes, scores, class_ids, self.iou_threshold)[:self.max_det]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # แปลงกลับเป็นพิกัดภาพต้นฉบับ
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= gain
+        height, width = original_shape
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+        return np.column_stack([boxes, scores, class_ids]).astype(np.float32)
+
+
+def export_onnx(weights_path, imgsz=640):
+    """export โมเดล ultralytics (.pt) เป็น ONNX แบบ static shape คืนค่า path ของไฟล์ .onnx"""
+    from ultralytics import YOLO
+
+    return YOLO(weights_path).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("weights", nargs="?", default="new_trained_model.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args(argv)
+
+    print(export_onnx(args.weights, args.imgsz))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class _Region:
+    """บริเวณข้อความหนึ่งบนป้าย รวมผลอ่านจากหลาย variant ที่ตำแหน่งเดียวกัน"""
+
+    def __init__(self, box):
+        self.box = box
+        self.votes = defaultdict(list)  # text -> [conf, ...]
+        self.text = ""
+        self.conf = 0.0
+
+    def add(self, text, conf):
+        self.votes[text].append(conf)
+
+    def resolve(self):
+        # โหวตด้วยผลรวม confidence (variant ที่อ่านตรงกันหลายภาพมีน้ำหนักมากกว่า)
+        self.text, confs = max(self.votes.items(), key=lambda item: (sum(item[1]), len(item[0])))
+        self.conf = sum(confs) / len(confs)
+
+    @property
+    def x1(self):
+        return self.box[0]
+
+    @property
+    def x2(self):
+        return self.box[2]
+
+
+def _bbox_to_box(bbox):
+    """แปลง polygon 4 จุดของ EasyOCR เป็น (x1, y1, x2, y2) คืนค่า None ถ้าไม่มีพิกัด"""
+    try:
+        xs = [float(point[0]) for point in bbox]
+        ys = [float(point[1]) for point in bbox]
+    except (TypeError, IndexError, ValueError):
+        return None
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _iou(a, b):
+    ix = min(a[2], b[2]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _vertical_overlap(a, b):
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    shortest = min(a[3] - a[1], b[3] - b[1])
+    return overlap / shortest if shortest > 0 else 0.0
+
+
+def _horizontal_overlap(a, b):
+    overlap = min(a[2], b[2]) - max(a[0], b[0])
+    shortest = min(a[2] - a[0], b[2] - b[0])
+    return overlap / shortest if shortest > 0 else 0.0
+
+
+class FragmentAssembler:
+    """
+    รวม fragments ของป้ายทะเบียนจากทุก variant โดยใช้ตำแหน่ง (bbox) แทนการลองทุกคู่
+    1. รวม fragment ที่กล่องซ้อนกัน (IoU >= region_iou) เป็นบริเวณเดียว แล้วโหวตข้อความด้วย confidence
+    2. จัดบริเวณเป็นแถวตามแนวตั้ง เรียงซ้ายไปขวา
+    3. ลองต่อเฉพาะบริเวณที่อยู่ติดกันในแถวเดียวกัน (ครั้งละไม่เกิน max_window)
+       และแถวบนต่อแถวล่างที่ตรงกันแนวนอน (เช่นป้ายรถจักรยานยนต์) ไม่ต่อกลับทิศ
+    4. เลือกผลที่ครอบคลุมหลายบริเวณและมั่นใจที่สุดก่อน บริเวณที่ใช้แล้วไม่ถูกใช้ซ้ำ
+    คืนค่า list ของ (plate_text, confidence) แบบเดียวกับ combine_license_plate_fragments เดิม
+    """
+
+    def __init__(self, is_valid_plate, region_iou=0.4, row_overlap=0.5, max_window=3):
+        self.is_valid_plate = is_valid_plate
+        self.region_iou = region_iou
+        self.row_overlap = row_overlap
+        self.max_window = max_window
+
+    def assemble(self, fragments):
+        if not fragments:
+            return []
+
+        regions = self._group_regions(fragments)
+        rows = self._group_rows(regions)
+
+        candidates = []
+        for row_index, row in enumerate(rows):
+            for start in range(len(row)):
+                for end in range(start + 1, min(start + self.max_window, len(row)) + 1):
+                    candidates.append(row[start:end])
+            # แถวบนต่อแถวล่าง (ต้องซ้อนกันในแนวนอน)
+            next_row = rows[row_index + 1] if row_index + 1 < len(rows) else None
+            if next_row and row[0].box is not None and next_row[0].box is not None:
+                candidates.extend(self._cross_row_windows(row, next_row))
+
+        scored = []
+        for window in candidates:
+            text = "".join(region.text for region in window)
+            if self.is_valid_plate(text):
+                conf = sum(region.conf for region in window) / len(window)
+                scored.append((len(window), conf, text, window))
+
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        used = set()
+        plates = []
+        for _, conf, text, window in scored:
+            if any(id(region) in used for region in window):
+                continue
+            used.update(id(region) for region in window)
+            plates.append((text, conf))
+            logger.info(f"✅ Assembled plate '{text}' from {len(window)} regions (conf={conf:.3f})")
+        return plates
+
+    def _group_regions(self, fragments):
+        regions = []
+        # fragment ที่มั่นใจที่สุดเป็นตัวกำหนดกล่องของบริเวณ
+        for text, conf, bbox in sorted(fragments, key=lambda f: f[1], reverse=True):
+            box = _bbox_to_box(bbox)
+            region = None
+            if box is not None:
+                region = max(
+                    (r for r in regions if r.box is not None and _iou(r.box, box) >= self.region_iou),
+                    key=lambda r: _iou(r.box, box),
+                    default=None
+                )
+            if region is None:
+                region = _Region(box)
+                regions.append(region)
+            region.add(text, conf)
+
+        for region in regions:
+            region.resolve()
+        return regions
+
+    def _group_rows(self, regions):
+        rows = []
+        located = sorted(
+            (r for r in regions if r.box is not None),
+            key=lambda r: (r.box[1] + r.box[3]) / 2
+        )
+        for region in located:
+            if rows and _vertical_overlap(rows[-1][-1].box, region.box) >= self.row_overlap:
+                rows[-1].append(region)
+            else:
+                rows.append([region])
+
+        for row in rows:
+            row.sort(key=lambda r: r.x1)
+        # บริเวณที่ไม่มีพิกัดถือเป็นแถวเดี่ยว (ใช้ได้เฉพาะเมื่อสมบูรณ์ในตัวเอง)
+        rows.extend([region] for region in regions if region.box is None)
+        return rows
+
+    def _cross_row_windows(self, upper, lower):
+        windows = []
+        for size_upper in range(1, min(2, len(upper)) + 1):
+            for start_upper in range(len(upper) - size_upper + 1):
+                top = upper[start_upper:start_upper + size_upper]
+                top_span = (top[0].x1, 0, top[-1].x2, 0)
+                for size_lower in range(1, min(2, len(lower)) + 1):
+                    for start_lower in range(len(lower) - size_lower + 1):
+                        bottom = lower[start_lower:start_lower + size_lower]
+                        bottom_span = (bottom[0].x1, 0, bottom[-1].x2, 0)
+                        if _horizontal_overlap(top_span, bottom_span) > 0:
+                            windows.append(top + bottom)
+        return windows
@@ -0,0 +1,97 @@
+import struct
+import logging
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# ไม่หมุนภาพตาม EXIF เพื่อให้ได้ผลเหมือนการเปิดด้วย PIL แบบเดิม
+_DECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION,
+    4: cv2.IMREAD_REDUCED_COLOR_4 | cv2.IMREAD_IGNORE_ORIENTATION,
+    8: cv2.IMREAD_REDUCED_COLOR_8 | cv2.IMREAD_IGNORE_ORIENTATION,
+}
+
+# marker SOF ของ JPEG ที่มีขนาดภาพ (ยกเว้น DHT/JPG/DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """อ่าน (width, height) จาก header ของ JPEG โดยไม่ decode คืนค่า None ถ้าไม่ใช่ JPEG"""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+
+        segment_length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+
+def decode_image(data, max_side=None):
+    """
+    decode bytes ที่อัปโหลดเป็น BGR uint8 ndarray ด้วย cv2.imdecode โดยตรงจาก buffer (ไม่ผ่าน PIL)
+    ถ้ากำหนด max_side และเป็น JPEG ขนาดใหญ่ จะ decode แบบลดความละเอียด 1/2, 1/4 หรือ 1/8
+    โดยด้านที่ยาวที่สุดยังไม่ต่ำกว่า max_side
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    flags = _DECODE_FLAGS
+
+    if max_side:
+        size = jpeg_size(data)
+        if size is not None:
+            longest = max(size)
+            for factor in (8, 4, 2):
+                if longest // factor >= max_side:
+                    flags = _REDUCED_FLAGS[factor]
+                    logger.info(f"📉 Reduced JPEG decode 1/{factor}: {size[0]}x{size[1]}")
+                    break
+
+    with stage_timer("decode"):
+        image = cv2.imdecode(buffer, flags)
+    if image is None:
+        raise ValueError("Cannot decode image data")
+    return image
+
+
+def to_bgr(image):
+    """
+    แปลงภาพเป็น BGR ndarray แบบ canonical ของ pipeline
+    ndarray 3 ช่องถือว่าเป็น BGR อยู่แล้ว (คืนค่าเดิมโดยไม่ copy)
+    """
+    if isinstance(image, Image.Image):
+        return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    return image
+
+
+def to_gray(image, dst=None):
+    """แปลงภาพ (PIL หรือ BGR ndarray) เป็น grayscale ndarray (เขียนลง dst ได้ถ้าขนาดตรงกัน)"""
+    if isinstance(image, Image.Image):
+        return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY, dst=dst)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=dst)
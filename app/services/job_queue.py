@@ -0,0 +1,212 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+
+from app.services.webhook import CallbackRejected
+
+logger = logging.getLogger(__name__)
+
+# ค่าน้อยทำก่อน
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+FINAL_STATES = (DONE, FAILED)
+
+
+class JobQueueFull(Exception):
+    """คิวเต็ม (ให้ API ตอบ 429 พร้อม Retry-After)"""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, payload, priority, callback_url=None, options=None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.priority = priority
+        self.callback_url = callback_url
+        self.options = options or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def _set_status(self, status):
+        self.status = status
+        self.version += 1
+        # ปลุกทุกคนที่รอ (SSE) แล้วสร้าง event ใหม่สำหรับการเปลี่ยนแปลงครั้งถัดไป
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+class JobQueue:
+    """
+    คิวงาน OCR แบบ async ในหน่วยความจำ: รับงานแยกจากการประมวลผล (POST /jobs ตอบทันที)
+    - priority queue มีขนาดจำกัด เต็มแล้ว submit จะ raise JobQueueFull (backpressure)
+    - consumers จำนวนคงที่เรียก handler(payload, **options) ทีละงาน จึงไม่แย่ง executor ทั้งหมดจาก request แบบ sync
+    - แจ้งผลผ่าน polling, SSE (wait_for_change) หรือ webhook (callback_url)
+    - ผลลัพธ์ที่เสร็จแล้วถูกลบหลัง result_ttl_seconds
+    """
+
+    def __init__(self, handler, max_queue_size=100, num_consumers=2, result_ttl_seconds=600.0,
+                 cleanup_interval=30.0, callback_timeout=10.0, callback_policy=None):
+        self.handler = handler
+        self.max_queue_size = max_queue_size
+        self.num_consumers = num_consumers
+        self.result_ttl_seconds = result_ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self.callback_timeout = callback_timeout
+        # CallbackPolicy ที่ใช้ตรวจ callback_url (None = ปิด webhook)
+        self.callback_policy = callback_policy
+
+        self.jobs = {}
+        self._queue = None
+        self._sequence = itertools.count()
+        self._tasks = []
+        # callback ที่ยังส่งไม่เสร็จ (event loop เก็บ task แบบ weak reference จึงต้องถือไว้เอง)
+        self._callback_tasks = set()
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'expired': 0}
+        self._total_run_time = 0.0
+
+    def start(self):
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.num_consumers)]
+        self._tasks.append(asyncio.create_task(self._cleanup()))
+        logger.info(f"📥 Job queue started: {self.num_consumers} consumers, max {self.max_queue_size} queued")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # callback มี timeout อยู่แล้ว รอให้ส่งจบก่อนปิด
+        if self._callback_tasks:
+            await asyncio.gather(*self._callback_tasks, return_exceptions=True)
+
+    def submit(self, payload, priority='normal', callback_url=None, options=None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of {list(PRIORITIES)})")
+
+        job = Job(payload, priority, callback_url, options)
+        try:
+            self._queue.put_nowait((PRIORITIES[priority], next(self._sequence), job.id))
+        except asyncio.QueueFull:
+            self._stats['rejected'] += 1
+            raise JobQueueFull(self.estimate_wait_seconds())
+
+        self.jobs[job.id] = job
+        self._stats['submitted'] += 1
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def wait_for_change(self, job, version, timeout):
+        """รอจนสถานะงานเปลี่ยนจาก version ที่รู้ หรือครบ timeout คืนค่า True ถ้ามีการเปลี่ยนแปลง"""
+        if job.version != version:
+            return True
+        try:
+            await asyncio.wait_for(job._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def estimate_wait_seconds(self):
+        """ประมาณเวลารอจากจำนวนงานในคิวและเวลาเฉลี่ยต่องาน (ใช้เป็น Retry-After)"""
+        finished = self._stats['completed'] + self._stats['failed']
+        average = self._total_run_time / finished if finished else 1.0
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return max(1, int(round(queued * average / max(1, self.num_consumers))))
+
+    async def _consume(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+
+            job.started_at = time.time()
+            job._set_status(RUNNING)
+            try:
+                job.result = await self.handler(job.payload, **job.options)
+                job.finished_at = time.time()
+                job._set_status(DONE)
+                self._stats['completed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"💥 Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.finished_at = time.time()
+                job._set_status(FAILED)
+                self._stats['failed'] += 1
+            finally:
+                # ไม่ต้องเก็บไฟล์ภาพไว้หลังประมวลผลแล้ว
+                job.payload = None
+
+            self._total_run_time += job.finished_at - job.started_at
+            if job.callback_url:
+                task = asyncio.create_task(self._send_callback(job))
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+
+    async def _send_callback(self, job):
+        body = json.dumps(job.to_dict(), ensure_ascii=False).encode("utf-8")
+        try:
+            # urllib เป็น blocking I/O จึงรันใน default executor (ไม่ใช้ thread ของ inference)
+            await asyncio.get_event_loop().run_in_executor(None, self._post_json, job.callback_url, body)
+            logger.info(f"📨 Job {job.id} callback sent")
+        except Exception as e:
+            logger.warning(f"⚠️ Job {job.id} callback failed: {e}")
+
+    def _post_json(self, url, body):
+        if self.callback_policy is None:
+            raise CallbackRejected("Webhooks are disabled")
+        self.callback_policy.post_json(url, body, self.callback_timeout)
+
+    async def _cleanup(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            cutoff = time.time() - self.result_ttl_seconds
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.status in FINAL_STATES and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            if expired:
+                self._stats['expired'] += len(expired)
+                logger.info(f"🧹 Removed {len(expired)} expired jobs")
+
+    def get_stats(self):
+        statuses = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs.values():
+            statuses[job.status] += 1
+        return {
+            'queue_size': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_size': self.max_queue_size,
+            'consumers': self.num_consumers,
+            'jobs': statuses,
+            **self._stats
+        }
@@ -0,0 +1,268 @@
+import math
+import threading
+import time
+
+# Metrics แบบ Prometheus text exposition format (version 0.0.4) โดยไม่ต้องพึ่ง prometheus_client
+# หมายเหตุ: ในโหมด process ค่าที่เก็บใน worker process จะไม่ถูกรวมมาที่ /metrics ของ process หลัก
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# bucket (วินาที) ครอบคลุมตั้งแต่ขั้นตอนเล็กๆ ของ OpenCV จนถึง OCR หลายวินาทีบน CPU
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != "histogram":
+            # metric ที่ไม่มี label แสดงค่า 0 ตั้งแต่เริ่ม
+            self._values[()] = 0
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """อ่านค่าจาก callback ทุกครั้งที่ render (เช่นความยาวคิวของ executor) ใช้ได้กับ gauge ที่ไม่มี label"""
+        self._function = function
+
+    def value(self, **labels):
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self._function is None:
+            return super()._samples()
+        try:
+            value = self._function()
+        except Exception:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def time(self, **labels):
+        """context manager จับเวลา (วินาที) แล้ว observe เมื่อออกจาก block"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(
+                (key, list(state['counts']), state['sum'], state['count'])
+                for key, state in self._values.items()
+            )
+
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type/labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ✅ Metrics ของ pipeline
+STAGE_SECONDS = REGISTRY.histogram(
+    "lpr_stage_duration_seconds",
+    "Duration of each pipeline stage (decode, yolo, box_postprocess, preprocess_*, readtext, ...)",
+    ("stage",)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "lpr_request_duration_seconds", "End-to-end HTTP request duration", ("endpoint",)
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "lpr_requests_total", "HTTP requests handled", ("endpoint", "status")
+)
+IN_FLIGHT = REGISTRY.gauge("lpr_requests_in_flight", "HTTP requests currently being processed")
+EXECUTOR_QUEUE_DEPTH = REGISTRY.gauge(
+    "lpr_executor_queue_depth", "Work items waiting for a ThreadPoolExecutor thread"
+)
+DETECTION_FALLBACKS = REGISTRY.counter(
+    "lpr_detection_fallbacks_total", "Requests that used _fallback_detection instead of a YOLO box"
+)
+EMPTY_OCR_RESULTS = REGISTRY.counter(
+    "lpr_ocr_empty_results_total", "OCR calls that produced no plate and no province"
+)
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "lpr_admission_rejected_total", "Requests shed before processing", ("reason",)
+)
+ADMISSION_WAITING = REGISTRY.gauge(
+    "lpr_admission_waiting", "Requests waiting in the admission queue for a processing slot"
+)
+
+# bucket ของจำนวน (ภาพต่อ batch / request ที่ค้างในคิว) แทนหน่วยวินาที
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+MICROBATCH_SIZE = REGISTRY.histogram(
+    "lpr_microbatch_size", "Images per YOLO micro-batch", buckets=COUNT_BUCKETS
+)
+MICROBATCH_QUEUE_DEPTH = REGISTRY.histogram(
+    "lpr_microbatch_queue_depth", "Requests left in the micro-batch queue when a batch is dispatched",
+    buckets=COUNT_BUCKETS
+)
+
+
+def stage_timer(stage):
+    """จับเวลาขั้นตอนหนึ่งของ pipeline ลง lpr_stage_duration_seconds{stage=...}"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def render():
+    return REGISTRY.render()
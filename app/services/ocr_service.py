@@ -2,174 +2,200 @@ from PIL import Image
 if not hasattr(Image, "ANTIALIAS"):
     Image.ANTIALIAS = Image.Resampling.LANCZOS
 
-import easyocr
-import re
 import cv2
 import numpy as np
 import logging
-import difflib
+import threading
+import time
+from collections import Counter
+
+from app.services.consensus import POOLED, VariantConsensus
+from app.services.fragment_assembler import FragmentAssembler
+from app.services.image_io import to_bgr, to_gray
+from app.services.metrics import EMPTY_OCR_RESULTS, STAGE_SECONDS, stage_timer
+from app.services.preprocess_context import ThreadLocalPreprocessContext
+from app.services.province_matcher import THAI_PROVINCES, ProvinceMatcher
+from app.services.text_postprocess import COMMON_CORRECTIONS, PlateTextPostProcessor
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+class _StageTimer:
+    """
+    จับเวลาขั้นตอนหนึ่ง แล้วบวกเข้า timings[stage] (ms, ถ้ามี timings)
+    และบันทึกลง metrics เป็น stage "preprocess_<stage>" (ถ้า metric=True)
+    """
+
+    def __init__(self, timings, stage, metric=True):
+        self.timings = timings
+        self.stage = stage
+        self.metric = metric
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.metric:
+            STAGE_SECONDS.observe(elapsed, stage=f"preprocess_{self.stage}")
+        if self.timings is not None:
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed * 1000
+        return False
+
+class EasyOCRAdapter:
+    """
+    เรียก text detector / recognizer ของ EasyOCR ตรงด้วยภาพ grayscale ที่ preprocess แล้ว
+    - detect: แปลง GRAY -> BGR ครั้งเดียว (CRAFT ต้องการ 3 channel) แล้วเรียก reader.detect(reformat=False)
+    - recognize: ไม่ผ่าน reformat_input ของ EasyOCR ตัดทุกกล่องและ resize ให้สูงเท่า imgH ของ recognizer
+      ด้วย get_image_list แล้วเรียก get_text ครั้งเดียวด้วย batch_size
+      (readtext / recognize บน CPU รัน recognizer ทีละกล่อง)
+    ถ้า EasyOCR เวอร์ชันที่ติดตั้งไม่มีฟังก์ชันภายในเหล่านี้ จะใช้ reader.readtext / reader.recognize แทน
+    """
+
+    def __init__(self, reader, allowlist, batch_size=16, detect_kwargs=None):
+        self.reader = reader
+        self.allowlist = allowlist
+        self.batch_size = max(1, batch_size)
+        self.detect_kwargs = detect_kwargs or {}
+        self.imgH = getattr(reader, 'imgH', 64)
+        # อักษรที่ recognizer รู้จักแต่ไม่อยู่ใน allowlist (แบบเดียวกับที่ reader.recognize คำนวณทุกครั้ง)
+        self.ignore_char = ''.join(set(getattr(reader, 'character', '')) - set(allowlist))
+
+        try:
+            from easyocr.recognition import get_text
+            from easyocr.utils import get_image_list
+            self._get_text, self._get_image_list = get_text, get_image_list
+        except ImportError as e:
+            logger.warning(f"⚠️ EasyOCR internals unavailable, using reader.readtext: {e}")
+            self._get_text = self._get_image_list = None
+
+    @property
+    def direct(self):
+        return self._get_text is not None
+
+    def readtext(self, image, bgr_dst=None):
+        """detect + recognize ผลลัพธ์รูปแบบเดียวกับ reader.readtext(detail=1)"""
+        if not self.direct:
+            return self.reader.readtext(
+                image, paragraph=False, detail=1, allowlist=self.allowlist, **self.detect_kwargs
+            )
+        return self.recognize(image, self.detect(image, bgr_dst))
+
+    def detect(self, image, bgr_dst=None):
+        """คืนค่า (horizontal_list, free_list) ของภาพเดียว (bgr_dst: buffer สำหรับภาพ BGR ที่ส่งให้ CRAFT)"""
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR, dst=bgr_dst)
+        horizontal_list, free_list = self.reader.detect(image, reformat=False, **self.detect_kwargs)
+        return horizontal_list[0], free_list[0]
+
+    def recognize(self, image, regions):
+        horizontal_list, free_list = regions
+        if not horizontal_list and not free_list:
+            return []
+        gray = to_gray(image)
+        if not self.direct:
+            return self.reader.recognize(
+                gray, horizontal_list=horizontal_list, free_list=free_list,
+                paragraph=False, detail=1, allowlist=self.allowlist
+            )
+
+        image_list, max_width = self._get_image_list(
+            horizontal_list, free_list, gray, model_height=self.imgH
+        )
+        return self._get_text(
+            self.reader.character, self.imgH, int(max_width),
+            self.reader.recognizer, self.reader.converter, image_list,
+            ignore_char=self.ignore_char, decoder='greedy', beamWidth=5,
+            batch_size=self.batch_size, contrast_ths=0.1, adjust_contrast=0.5,
+            filter_ths=0.003, workers=0, device=self.reader.device
+        )
+
 class OCRService:
-    COMMON_CORRECTIONS = {
-        "ขนบ": "ขนษ",
-        "รของ": "ระนอง",
-        "รยอง": "ระยอง",
-        "บก": "บข",
-        "6อบ": "660",
-        "6บ": "660",
-        "66บ": "660",
-        "77อ": "772",
-        # เพิ่มการแก้ไขสำหรับกรุงเทพมหานคร
-        "งเทพมหาน": "กรุงเทพมหานคร",
-        "งทพมหาน": "กรุงเทพมหานคร",
-        "งทพมทวน": "กรุงเทพมหานคร",
-        "รุงเทพฯ": "กรุงเทพมหานคร",
-        "งทพมหวนคร": "กรุงเทพมหานคร",
-        "กรงทศมทวบคร": "กรุงเทพมหานคร",
-        "กกรงทพมนวนคร": "กรุงเทพมหานคร",
-        "รุงเทพมหานคร": "กรุงเทพมหานคร",
-        "กรงททพยพทนคร": "กรุงเทพมหานคร",
-        "กรงทพมห1นคร": "กรุงเทพมหานคร",
-        "กรงทพมนวนคร": "กรุงเทพมหานคร",
-        "กรงทพมหวนคร": "กรุงเทพมหานคร",
-        "กรงททมนวนคร": "กรุงเทพมหานคร",
-        "กรงทพมททนคร": "กรุงเทพมหานคร",
-        # เพิ่มการแก้ไขสำหรับกรุงเทพ - แก้จาก กกญจนบร -> กาญจนบุรี (ไม่ใช่กรุงเทพ)
-        "กกญจนบร": "กาญจนบุรี",
-        "กวญจนบร": "กาญจนบุรี", 
-        "กญจนบร": "กาญจนบุรี",
-        # เพิ่มการแก้ไขฉะเชิงเทรา
-        "ฉรชงททรก": "ฉะเชิงเทรา",
-        # เพิ่มการแก้ไข ร - ธ
-        "ระยอง": "ระนอง",
-        "รของ": "ระยอง",
-        "รระบุงร": "ธระบุรี",
-        "ธะนอง": "ระนอง",  
-        "ธะยอง": "ระยอง",
-        "ราชบุธี": "ราชบุรี",
-        "ธาชบุรี": "ราชบุรี",
-        "ธ้อยเอ็ด": "ร้อยเอ็ด",
-        "รังควย": "ราชบุรี",
-        "นครธรรมธาช": "นครศรีธรรมราช",
-        "สรรบร": "สระบุรี",
-        "สร8บร": "สระบุรี",
-        "สุธิธธานี": "สุราษฎร์ธานี",
-        "สุราดรธานี": "สุราษฎร์ธานี",
-        "สุราสธรธานี": "สุราษฎร์ธานี",
-        "ฉชงททรว": "ฉะเชิงเทรา",
-        # เพิ่มการแก้ไขอุดรธานี
-        "อุดรธภนี": "อุดรธานี",
-        "อุดธธานี": "อุดรธานี",
-        "อุดรราณี": "อุดรธานี",
-        # เพิ่มการแก้ไขอักษรป้ายทะเบียนที่อ่านผิด - แก้ กข เป็น กช
-        "กข": "กช",
-        "1กข": "1กช",
-        "2กข": "2กช",
-        "3กข": "3กช",
-        "4กข": "4กช",
-        "5กข": "5กช",
-        "6กข": "6กข",  # 6กข เป็นป้ายจริง ไม่ต้องแก้
-        "7กข": "7กช",
-        "8กข": "8กช",
-        "9กข": "9กช",
-        "0กข": "0กช",
-        # เพิ่มการแก้ไขอักษรอื่นที่มักอ่านผิด
-        "บ": "ษ",
-        "กค": "กข",
-        "กซ": "กช",
-        "กฑ": "กด",
-        "กฒ": "กท",
-        "กฟ": "กผ",
-        "1กค": "1กข",
-        "1กซ": "1กช",
-        "1กฑ": "1กด",
-        "1กฒ": "1กท",
-        "1กฟ": "1กผ",
-    }
-
-    def __init__(self, debug=False):
+    COMMON_CORRECTIONS = COMMON_CORRECTIONS
+
+    # ชื่อภาพที่ได้จาก preprocess_image ตามลำดับ
+    VARIANT_NAMES = ('sharpened', 'otsu', 'adaptive', 'morph_open', 'morph_close')
+
+    OCR_ALLOWLIST = '0123456789กขฃคงจฉชซฌญฎฏฐฑฒณดตถทธนบปผฝพฟภมยรลวศษสหฬอฮ'
+    PREPROCESS_PROFILES = ('quality', 'fast')
+
+    def __init__(self, debug=False, debug_dumper=None, cascade=False, cascade_order=None,
+                 cascade_min_confidence=0.5, shared_detection=False, detection_variant='sharpened',
+                 preprocess_profile='quality', consensus=False, consensus_k=2, consensus_similarity=0.75,
+                 recognizer_batch_size=16):
         self.debug = debug
+        # ภาพ input ของ OCR จะถูกส่งเข้าคิวเขียนแบบ async เฉพาะเมื่อ debug และมี dumper เท่านั้น
+        self.debug_dumper = debug_dumper
+
+        # Cascade: ลอง variant ตามลำดับและหยุดเมื่อได้ป้ายที่สมบูรณ์พร้อมจังหวัด
+        self.cascade = cascade
+        self.cascade_order = tuple(cascade_order or self.VARIANT_NAMES)
+        unknown = set(self.cascade_order) - set(self.VARIANT_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown OCR variants in cascade_order: {sorted(unknown)}")
+        self.cascade_min_confidence = cascade_min_confidence
+        # Shared detection: รัน CRAFT text detector ครั้งเดียวบน detection_variant
+        # แล้วใช้กล่องเดิมกับทุก variant (ภาพทุก variant มีพิกัดตรงกัน) รันเฉพาะ recognizer
+        self.shared_detection = shared_detection
+        if detection_variant not in self.VARIANT_NAMES:
+            raise ValueError(f"Unknown OCR detection variant: {detection_variant}")
+        self.detection_variant = detection_variant
+
+        # Preprocess profile: "quality" (Non-local means denoise) หรือ "fast" (bilateral filter)
+        if preprocess_profile not in self.PREPROCESS_PROFILES:
+            raise ValueError(f"Unknown OCR preprocess profile: {preprocess_profile}")
+        self.preprocess_profile = preprocess_profile
+        # CLAHE / kernel / buffer ของ preprocess ใช้ซ้ำต่อ thread (ดู PreprocessContext)
+        self._preprocess_contexts = ThreadLocalPreprocessContext()
+
+        # Consensus (opt-in): รวมผลอ่านของทุก variant ด้วยการโหวต (แทนการเลือกผลที่ confidence สูงสุดผลเดียว)
+        # confidence ของป้ายเป็นค่าเฉลี่ยของกลุ่มที่ชนะ และหยุด variant ที่เหลือเมื่อมี consensus_k variant อ่านตรงกัน (0 = ไม่หยุดก่อน)
+        self.consensus = consensus
+        self.consensus_k = consensus_k
+        self.consensus_similarity = consensus_similarity
+
+        self.variant_wins = Counter()
+        self.variant_stats = Counter()
+        self.consensus_wins = Counter()
+        self.consensus_stats = Counter()
+        self.stage_totals = Counter()
+        self.stage_counts = Counter()
+        self._stats_lock = threading.Lock()
+
         try:
+            # import เมื่อสร้าง service เท่านั้น (easyocr ดึง torch มาด้วย ทำให้ import module นี้ช้า)
+            import easyocr
             self.reader = easyocr.Reader(['th', 'en'], gpu=False, verbose=False)
             logger.info("✅ EasyOCR initialized successfully")
         except Exception as e:
             logger.error(f"❌ Failed to initialize EasyOCR: {e}")
             self.reader = None
 
-        self.provinces = {
-            'กรุงเทพมหานคร', 'กรุงเทพฯ', 'กระบี่', 'กาญจนบุรี', 'กาฬสินธุ์', 'กำแพงเพชร',
-            'ขอนแก่น', 'จันทบุรี', 'ฉะเชิงเทรา', 'ชลบุรี', 'ชัยนาท', 'ชัยภูมิ', 'ชุมพร',
-            'เชียงราย', 'เชียงใหม่', 'ตรัง', 'ตราด', 'ตาก', 'นครนายก', 'นครปฐม', 'นครพนม',
-            'นครราชสีมา', 'นครศรีธรรมราช', 'นครสวรรค์', 'นนทบุรี', 'นราธิวาส', 'น่าน',
-            'บึงกาฬ', 'บุรีรัมย์', 'ปทุมธานี', 'ประจวบคีรีขันธ์', 'ปราจีนบุรี', 'ปัตตานี',
-            'พระนครศรีอยุธยา', 'พะเยา', 'พังงา', 'พัทลุง', 'พิจิตร', 'พิษณุโลก', 'เพชรบุรี',
-            'เพชรบูรณ์', 'แพร่', 'ภูเก็ต', 'มหาสารคาม', 'มุกดาหาร', 'แม่ฮ่องสอน', 'ยโสธร',
-            'ยะลา', 'ร้อยเอ็ด', 'ระนอง', 'ระยอง', 'ราชบุรี', 'ลพบุรี', 'ลำปาง', 'ลำพูน',
-            'เลย', 'ศรีสะเกษ', 'สกลนคร', 'สงขลา', 'สตูล', 'สมุทรปราการ', 'สมุทรสงคราม',
-            'สมุทรสาคร', 'สระแก้ว', 'สระบุรี', 'สิงห์บุรี', 'สุโขทัย', 'สุพรรณบุรี', 'สุราษฎร์ธานี',
-            'สุรินทร์', 'หนองคาย', 'หนองบัวลำภู', 'อ่างทอง', 'อำนาจเจริญ', 'อุดรธานี', 'อุตรดิตถ์',
-            'อุทัยธานี', 'อุบลราชธานี'
-        }
+        # ส่งภาพ grayscale เข้า detector / recognizer ตรง และ recognize ทุกกล่องของป้ายใน batch เดียว
+        self.ocr_adapter = None
+        if self.reader is not None:
+            self.ocr_adapter = EasyOCRAdapter(
+                self.reader, self.OCR_ALLOWLIST, batch_size=recognizer_batch_size,
+                detect_kwargs={'width_ths': 0.05, 'height_ths': 0.05}
+            )
+
+        self.provinces = set(THAI_PROVINCES)
+        # index สำหรับจับคู่จังหวัด สร้างครั้งเดียว
+        self.province_matcher = ProvinceMatcher(self.provinces)
+        # regex / ตารางแก้อักษรของการทำความสะอาดข้อความ สร้างครั้งเดียว
+        self.text_postprocessor = PlateTextPostProcessor(self.COMMON_CORRECTIONS)
+        self.fragment_assembler = FragmentAssembler(self.is_valid_license_plate)
 
     def partial_match_province(self, text, min_length=3):
         """
-        จับคู่จังหวัดโดยใช้ partial string matching
+        จับคู่จังหวัดโดยใช้ partial string matching (ผ่าน index ของ ProvinceMatcher)
         """
         if len(text) < min_length:
             return None
-            
-        best_match = None
-        best_score = 0
-        
-        for province in self.provinces:
-            max_common_len = 0
-            
-            # ตรวจสอบว่าเป็น substring ของ province
-            if text in province:
-                score = len(text) / len(province)
-                if province.startswith(text):
-                    score += 0.4
-                elif province.endswith(text):
-                    score += 0.3
-                else:
-                    score += 0.2
-                    
-                if score > best_score:
-                    best_score = score
-                    best_match = province
-                    max_common_len = len(text)
-            
-            # ตรวจสอบ province เป็น substring ของ text
-            elif province in text and len(province) >= min_length:
-                score = len(province) / len(text) + 0.1
-                if score > best_score:
-                    best_score = score
-                    best_match = province
-                    max_common_len = len(province)
-            
-            else:
-                for i in range(len(text) - min_length + 1):
-                    for j in range(i + min_length, len(text) + 1):
-                        substring = text[i:j]
-                        if substring in province and len(substring) > max_common_len:
-                            max_common_len = len(substring)
-                            # คำนวณคะแนนตามความยาวของส่วนที่ตรงกัน
-                            score = (len(substring) / len(province)) * 0.8
-                            # ให้คะแนนพิเศษถ้าเริ่มต้นหรือท้ายของจังหวัด
-                            if province.startswith(substring):
-                                score += 0.4
-                            elif province.endswith(substring):
-                                score += 0.3
-                            else:
-                                score += 0.2
-                            
-                            if score > best_score:
-                                best_score = score
-                                best_match = province
-        
+
+        best_match, best_score = self.province_matcher.partial_match_with_score(text, min_length)
+
         # ลดเกณฑ์การตัดสินใจลงเหลือ 0.25 เพื่อให้จับได้ง่ายขึ้น
         logger.info(f"🔍 Partial matching '{text}': best_match='{best_match}', score={best_score:.3f}")
         return best_match if best_match and best_score >= 0.25 else None
@@ -178,8 +204,7 @@ class OCRService:
         """
         จับคู่จังหวัดโดยใช้ fuzzy matching (สำหรับตัวอักษรที่ผิด)
         """
-        match = difflib.get_close_matches(text, self.provinces, n=1, cutoff=0.6)
-        return match[0] if match else None
+        return self.province_matcher.fuzzy_match(text)
 
     def match_province(self, text):
         """
@@ -208,294 +233,380 @@ class OCRService:
 
     def smart_correct_license_chars(self, text):
         """
-        แก้ไขอักษรป้ายทะเบียนที่อ่านผิดโดยดูจากบริบท
+        แก้ไขอักษรป้ายทะเบียนที่อ่านผิดโดยดูจากบริบท (ผ่าน PlateTextPostProcessor)
+        """
+        return self.text_postprocessor.smart_correct(text)
+
+    def preprocess_image(self, img_array, timings=None):
+        """
+        สร้างภาพทุก variant (ตามลำดับ VARIANT_NAMES) ด้วย preprocess_profile ปัจจุบัน
+        คืนค่าเป็นสำเนา เพราะภาพภายในอยู่ใน buffer ที่ request ถัดไปจะเขียนทับ
         """
-        if not text:
-            return text
-            
-        # อักษรที่มักอ่านผิด - ใช้ความน่าจะเป็นในการแก้ไข
-        char_corrections = {
-            'ข': 'ช',  # ข มักอ่านผิดเป็น ช ในป้ายทะเบียน
-            'ค': 'ข',  # ค มักอ่านผิดเป็น ข
-            'ซ': 'ช',  # ซ มักอ่านผิดเป็น ช
-            'ฑ': 'ด',  # ฑ มักอ่านผิดเป็น ด
-            'ฒ': 'ท',  # ฒ มักอ่านผิดเป็น ท
-            'ฟ': 'ผ',  # ฟ มักอ่านผิดเป็ ผ
-        }
-        
-        # ตรวจสอบว่าเป็นบริบทของป้ายทะเบียนหรือไม่ (มีตัวเลข)
-        has_digit = any(c.isdigit() for c in text)
-        
-        # อักษรป้ายทะเบียนที่มีอยู่จริง - ไม่ควรแก้ไข
-        real_license_chars = ['กก', 'กข', 'กค', 'กง', 'กจ', 'กฉ', 'กช', 'กซ', 'กฌ', 'กญ', 
-                             'กฎ', 'กฏ', 'กฐ', 'กฑ', 'กฒ', 'กณ', 'กด', 'กต', 'กถ', 'กท', 
-                             'กธ', 'กน', 'กบ', 'กป', 'กผ', 'กฝ', 'กพ', 'กฟ', 'กภ', 'กม', 
-                             'กย', 'กร', 'กล', 'กว', 'กศ', 'กษ', 'กส', 'กห', 'กฬ', 'กอ', 'กฮ']
-        
-        corrected = ""
-        original_changed = False
-        
-        for i, char in enumerate(text):
-            # ตรวจสอบบริบท - แก้ไขเฉพาะในป้ายทะเบียน และไม่ใช่อักษรป้ายจริง
-            if (has_digit and char in char_corrections):
-                # ตรวจสอบว่าอักษร 2 ตัวนี้เป็นอักษรป้ายจริงหรือไม่
-                if i < len(text) - 1:
-                    two_chars = text[i:i+2]
-                    if two_chars not in real_license_chars and char == 'ข':
-                        corrected += char_corrections[char]
-                        original_changed = True
-                        logger.info(f"🔧 Smart character correction: '{char}' -> '{char_corrections[char]}' in context '{text}'")
-                    else:
-                        corrected += char
-                else:
-                    if char == 'ข':  # แก้ไข ข -> ช เฉพาะในบริบทป้ายทะเบียน
-                        corrected += char_corrections[char]
-                        original_changed = True
-                        logger.info(f"🔧 Smart character correction: '{char}' -> '{char_corrections[char]}' in context '{text}'")
-                    else:
-                        corrected += char
-            else:
-                corrected += char
-        
-        if original_changed:
-            logger.info(f"🔄 Smart correction result: '{text}' -> '{corrected}'")
-                
-        return corrected
-
-    def preprocess_image(self, img_array):
         try:
-            if len(img_array.shape) == 3:
-                color_img = img_array.copy()
-                gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = img_array
+            variants = {}
+            return [
+                self._get_variant(name, variants, img_array, timings).copy()
+                for name in self.VARIANT_NAMES
+            ]
+        except Exception as e:
+            logger.error(f"Preprocessing failed: {e}")
+            return [img_array]
+
+    def _get_variant(self, name, variants, img_array, timings=None):
+        """
+        คืนภาพ variant ตามชื่อ โดยสร้างเฉพาะเมื่อถูกเรียกครั้งแรกแล้วเก็บไว้ใน variants
+        (cascade ที่หยุดเร็วจึงไม่ต้องสร้าง threshold/morphology ที่ไม่ได้ใช้)
+        ภาพที่คืนเป็น view ของ buffer ใน PreprocessContext ของ thread นี้ ใช้ได้จนจบ request เท่านั้น
+        """
+        image = variants.get(name)
+        if image is not None:
+            return image
+
+        context = self._preprocess_contexts.get()
+        if name == 'sharpened':
+            image = self._preprocess_base(img_array, timings)
+        elif name == 'otsu':
+            sharpened = self._get_variant('sharpened', variants, img_array, timings)
+            with _StageTimer(timings, 'otsu'):
+                image = cv2.threshold(
+                    sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                    dst=context.buffer('otsu', sharpened.shape)
+                )[1]
+        elif name == 'adaptive':
+            sharpened = self._get_variant('sharpened', variants, img_array, timings)
+            with _StageTimer(timings, 'adaptive'):
+                image = cv2.adaptiveThreshold(
+                    sharpened, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY, 11, 2, dst=context.buffer('adaptive', sharpened.shape)
+                )
+        elif name in ('morph_open', 'morph_close'):
+            otsu = self._get_variant('otsu', variants, img_array, timings)
+            operation = cv2.MORPH_OPEN if name == 'morph_open' else cv2.MORPH_CLOSE
+            with _StageTimer(timings, name):
+                image = cv2.morphologyEx(
+                    otsu, operation, context.morph_kernel, dst=context.buffer(name, otsu.shape)
+                )
+        else:
+            raise ValueError(f"Unknown OCR variant: {name}")
+
+        variants[name] = image
+        return image
+
+    def _preprocess_base(self, img_array, timings=None):
+        """
+        gray -> upscale -> denoise (ตาม profile) -> CLAHE -> unsharp mask
+        ทุกขั้นตอนเขียนลง buffer ของ PreprocessContext (dst=) แทนการจองภาพใหม่
+        """
+        context = self._preprocess_contexts.get()
+        with _StageTimer(timings, 'resize'):
+            # ภาพสีใน pipeline เป็น BGR (ดู image_io) ไม่ต้อง copy ภาพสีไว้อีกชุด
+            gray_dst = None
+            if isinstance(img_array, np.ndarray) and img_array.ndim == 3:
+                gray_dst = context.buffer('gray', img_array.shape[:2])
+            gray = to_gray(img_array, dst=gray_dst)
 
             # ✅ Resize ให้ใหญ่พอ
             height, width = gray.shape
             if width < 500 or height < 200:  # เพิ่มขนาดขั้นต่ำ
-                scale = max(500 / width, 200 / height) 
-                gray = cv2.resize(gray, (int(width * scale), int(height * scale)), 
-                                interpolation=cv2.INTER_CUBIC)
-                if color_img is not None:
-                    color_img = cv2.resize(color_img, (int(width * scale), int(height * scale)),
-                                           interpolation=cv2.INTER_CUBIC)
-                logger.info(f"Upscaled from {width}x{height} to {int(width*scale)}x{int(height*scale)}")
-
-            gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-
-            # ✅ CLAHE (ปรับ contrast แบบ local)
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(gray)
-
-            # ✅ เพิ่ม - Unsharp mask สำหรับความคมชัด
-            gaussian = cv2.GaussianBlur(enhanced, (0, 0), 2.0)
-            sharpened = cv2.addWeighted(enhanced, 1.5, gaussian, -0.5, 0)
+                scale = max(500 / width, 200 / height)
+                size = (int(width * scale), int(height * scale))
+                gray = cv2.resize(gray, size, dst=context.buffer('resized', (size[1], size[0])),
+                                  interpolation=cv2.INTER_CUBIC)
+                logger.info(f"Upscaled from {width}x{height} to {size[0]}x{size[1]}")
+
+        with _StageTimer(timings, 'denoise'):
+            denoised = context.buffer('denoised', gray.shape)
+            if self.preprocess_profile == 'fast':
+                # bilateral เร็วกว่า Non-local means หลายสิบเท่า และยังรักษาขอบตัวอักษร
+                gray = cv2.bilateralFilter(gray, 5, 50, 50, dst=denoised)
+            else:
+                gray = cv2.fastNlMeansDenoising(gray, denoised, 10, 7, 21)
 
-            # ✅ เพิ่ม - Morphological operations เพื่อเชื่อมตัวอักษร
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-            morph = cv2.morphologyEx(sharpened, cv2.MORPH_CLOSE, kernel)
+        with _StageTimer(timings, 'clahe'):
+            # ✅ CLAHE (ปรับ contrast แบบ local) ใช้ object เดิมของ thread
+            enhanced = context.clahe.apply(gray, dst=context.buffer('enhanced', gray.shape))
 
+        with _StageTimer(timings, 'sharpen'):
             # ✅ Blur เล็กน้อยแล้ว sharpen
-            blurred = cv2.GaussianBlur(enhanced, (3, 3), 0)
-            sharpened = cv2.addWeighted(enhanced, 1.5, blurred, -0.5, 0)
-
-            # ✅ Threshold หลายแบบ
-            otsu = cv2.threshold(sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-            adaptive = cv2.adaptiveThreshold(
-                sharpened, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY, 11, 2
+            blurred = cv2.GaussianBlur(enhanced, (3, 3), 0, dst=context.buffer('blurred', enhanced.shape))
+            return cv2.addWeighted(
+                enhanced, 1.5, blurred, -0.5, 0, dst=context.buffer('sharpened', enhanced.shape)
             )
 
-            # ✅ เพิ่ม - Inverse threshold (บางครั้งตัวอักษรอาจเป็นสีขาวบนพื้นดำ)
-            otsu_inv = cv2.bitwise_not(otsu)
-            adaptive_inv = cv2.bitwise_not(adaptive)
-
-            morph_open = cv2.morphologyEx(otsu, cv2.MORPH_OPEN, kernel)
-            morph_close = cv2.morphologyEx(otsu, cv2.MORPH_CLOSE, kernel)
-            return [sharpened, otsu, adaptive, morph_open, morph_close]
-
-        except Exception as e:
-            logger.error(f"Preprocessing failed: {e}")
-            return [img_array]
-
     def clean_text(self, text):
-        if not text:
-            return ""
-        text = text.strip()
-        
-        # ✅ วิธีที่ 1: ใช้ smart correction ก่อน (ดูบริบท)
-        text = self.smart_correct_license_chars(text)
-        
-        # ✅ วิธีที่ 2: ใช้ COMMON_CORRECTIONS (dictionary lookup)
-        if text in self.COMMON_CORRECTIONS:
-            original_text = text
-            text = self.COMMON_CORRECTIONS[text]
-            logger.info(f"🔧 Dictionary correction: '{original_text}' -> '{text}'")
-        
-        # ลบเฉพาะอักขระที่ไม่ใช่ ไทย/เลข แต่เก็บสระและวรรณยุกต์ครบ
-        text = re.sub(r'[^\u0E00-\u0E7F0-9]', '', text)
-        # เพิ่มความยาวสำหรับชื่อจังหวัดที่อาจยาว เช่น กรุงเทพมหานคร
-        return text[:20]  # เพิ่มจาก 15 เป็น 20
+        """smart correction -> COMMON_CORRECTIONS -> เก็บเฉพาะอักษรไทย/เลข (ไม่เกิน 20 ตัว)"""
+        return self.text_postprocessor.clean(text)
 
     def is_license_plate_fragment(self, text):
         """
         ตรวจสอบว่า text เป็นส่วนหนึ่งของป้ายทะเบียนหรือไม่
         """
-        if len(text) < 1:
-            return False
-            
-        # Pattern สำหรับ fragment ของป้ายทะเบียน
-        fragment_patterns = [
-            r'^\d+[ก-ฮ]+$',        # เช่น "1กช" 
-            r'^[ก-ฮ]+\d*$',        # เช่น "กช" หรือ "กช123"
-            r'^\d+$',              # เช่น "4559"
-            r'^[ก-ฮ]+$',           # เช่น "กช"
-        ]
-        
-        return any(re.match(p, text) for p in fragment_patterns)
+        return self.text_postprocessor.is_fragment(text)
 
     def is_valid_license_plate(self, text):
         """
         ตรวจสอบว่า text เป็นป้ายทะเบียนที่สมบูรณ์หรือไม่
         """
-        if len(text) < 3:
-            return False
-            
-        patterns = [
-            r'^[ก-ฮ]{1,3}\d{1,4}$',        # เช่น กช4559
-            r'^\d{1,2}[ก-ฮ]{1,3}\d{1,4}$', # เช่น 1กช4559
-            r'^[ก-ฮ]{1,2}\d{1,4}[ก-ฮ]{0,2}$', # เช่น กช4559ก
-        ]
-        return any(re.match(p, text) for p in patterns)
+        return self.text_postprocessor.is_valid_plate(text)
 
     def combine_license_plate_fragments(self, fragments):
         """
-        รวม fragments ของป้ายทะเบียนเป็นป้ายทะเบียนเต็ม
+        รวม fragments ของป้ายทะเบียน (text, conf, bbox) จากทุก variant เป็นป้ายทะเบียนเต็ม
+        ตามตำแหน่งบนภาพ (ดู FragmentAssembler) คืนค่า list ของ (plate_text, confidence)
         """
         if not fragments:
             return []
-            
-        # เรียง fragments ตาม confidence
-        fragments.sort(key=lambda x: x[1], reverse=True)
-        
-        combined_plates = []
-        used_fragments = set()
-        
-        logger.info(f"🔧 Combining fragments: {[(f[0], f[1]) for f in fragments]}")
-        
-        for i, (text1, conf1, bbox1) in enumerate(fragments):
-            if i in used_fragments:
-                continue
-
-            thai_count1 = len(re.findall(r'[ก-ฮ]', text1))
-                
-            # ลองรวมกับ fragments อื่น
-            for j, (text2, conf2, bbox2) in enumerate(fragments):
-                if i == j or j in used_fragments:
-                    continue
-
-                thai_count2 = len(re.findall(r'[ก-ฮ]', text2))
-                    
-                # ลองรวมแบบต่างๆ
-                combinations = [
-                    text1 + text2,  # รวมตรงๆ
-                    text2 + text1,  # รวมกลับกัน
-                ]
-                
-                for combined in combinations:
-
-                    thai_count_combined = len(re.findall(r'[ก-ฮ]', combined))
-
-                    if self.is_valid_license_plate(combined):
-                        avg_conf = (conf1 + conf2) / 2
-                        combined_plates.append((combined, avg_conf))
-                        used_fragments.add(i)
-                        used_fragments.add(j)
-                        logger.info(f"✅ Combined '{text1}' + '{text2}' = '{combined}' (conf={avg_conf:.3f})")
-                        break
-                        
-                if i in used_fragments:
-                    break
-        
-        # เพิ่ม fragments ที่เป็นป้ายทะเบียนสมบูรณ์อยู่แล้ว
-        for i, (text, conf, bbox) in enumerate(fragments):
-
-            thai_count = len(re.findall(r'[ก-ฮ]', text))
 
-            if i not in used_fragments and self.is_valid_license_plate(text):
-                combined_plates.append((text, conf))
-                logger.info(f"✅ Complete plate found: '{text}' (conf={conf:.3f})")
-        
-        return combined_plates
+        logger.info(f"🔧 Combining fragments: {[(f[0], f[1]) for f in fragments]}")
+        return self.fragment_assembler.assemble(fragments)
 
     def extract_text(self, image):
+        return self.extract_text_with_details(image)['text']
+
+    def extract_text_with_details(self, image):
+        """
+        อ่านป้ายทะเบียนและคืนค่ารายละเอียด: ข้อความรวม, ป้าย, จังหวัด,
+        variant ที่ทำให้ cascade หยุด, รายชื่อ variant ที่ถูกประมวลผลจริง
+        และเวลาของแต่ละขั้นตอน preprocess (timings, ms)
+        """
+        details = {
+            'text': "", 'plate': "", 'province': "", 'variant': None, 'variants_run': [], 'timings': {},
+            'agreement': 0
+        }
         if self.reader is None:
             logger.warning("EasyOCR not available")
-            return ""
+            return details
 
-        img_array = np.array(image) if isinstance(image, Image.Image) else image
-        processed_images = self.preprocess_image(img_array)
+        img_array = to_bgr(image) if isinstance(image, Image.Image) else image
+        # variant สร้างแบบ lazy ตามลำดับที่ OCR ต้องใช้ และจับเวลาแต่ละขั้นตอน (ms)
+        variants = {}
+        timings = details['timings'] = {}
 
         plate_fragments = []  # เก็บ fragments ของป้ายทะเบียน
         province_candidates = []
 
-        for idx, img in enumerate(processed_images):
+        # ทุก variant สร้างต่อจาก sharpened จึงสร้างภาพฐานก่อนเสมอ
+        preprocessed = True
+        try:
+            self._get_variant('sharpened', variants, img_array, timings)
+        except Exception as e:
+            logger.error(f"Preprocessing failed: {e}")
+            # อ่านจากภาพต้นฉบับครั้งเดียวแทน
+            variants = {'sharpened': img_array}
+            preprocessed = False
+
+        regions = None
+        if self.shared_detection:
+            anchor = variants['sharpened']
+            if preprocessed:
+                anchor = self._get_variant(self.detection_variant, variants, img_array, timings)
+            with _StageTimer(timings, 'text_detection', metric=False):
+                regions = self._detect_text_regions(anchor)
+
+        order = self.cascade_order if self.cascade else self.VARIANT_NAMES
+        selection = None
+        consensus_variant = None
+        consensus = VariantConsensus(self.is_valid_license_plate, self.consensus_similarity) if self.consensus else None
+        for name in order:
+            if preprocessed:
+                img = self._get_variant(name, variants, img_array, timings)
+            else:
+                img = variants.get(name)
+            if img is None:
+                continue
 
-            cv2.imwrite(f'/tmp/ocr_input_{idx}.jpg', img)
-            logger.info(f"Saved OCR input image: /tmp/ocr_input_{idx}.jpg")
+            fragments_before, provinces_before = len(plate_fragments), len(province_candidates)
+            with _StageTimer(timings, 'ocr', metric=False):
+                self._read_variant(name, img, plate_fragments, province_candidates, regions)
+            details['variants_run'].append(name)
+
+            # 🗳️ Consensus: เก็บผลที่ดีที่สุดของ variant นี้ แล้วหยุดเมื่อมี k variant อ่านตรงกัน
+            if consensus is not None:
+                consensus.add(name, *self._select_result(
+                    plate_fragments[fragments_before:], province_candidates[provinces_before:]
+                ))
+                if self.consensus_k and consensus.agreement() >= self.consensus_k:
+                    details['variant'] = consensus_variant = name
+                    logger.info(f"⏩ Consensus reached at variant '{name}' after {len(details['variants_run'])} passes")
+                    break
 
-            results = self.reader.readtext(
-                img,
-                width_ths=0.05, height_ths=0.05, paragraph=False, detail=1,
-                allowlist='0123456789กขฃคงจฉชซฌญฎฏฐฑฒณดตถทธนบปผฝพฟภมยรลวศษสหฬอฮ'
-            )
-            logger.info(f"🔹 Processed image {idx+1}: found {len(results)} OCR lines")
+            # ✅ Cascade: หยุดทันทีเมื่อได้ป้ายที่สมบูรณ์พร้อมจังหวัดที่มั่นใจพอ
+            if self.cascade:
+                selection = self._select_result(plate_fragments, province_candidates)
+                if self._cascade_satisfied(selection):
+                    details['variant'] = name
+                    logger.info(f"⏩ Cascade stopped at variant '{name}' after {len(details['variants_run'])} passes")
+                    break
+                selection = None
+
+        if self.debug and self.debug_dumper is not None:
+            self.debug_dumper.dump("ocr", variants)
+
+        # selection ยังอยู่เฉพาะเมื่อ cascade หยุดได้ (ใช้ผลของ cascade)
+        cascade_variant = details['variant'] if selection is not None else None
+        if selection is None:
+            selection = self._select_result(plate_fragments, province_candidates)
+            if consensus is not None:
+                # ผลรวม fragments ข้าม variant ร่วมโหวตด้วย (ป้ายที่แต่ละ variant อ่านได้เพียงบางส่วน)
+                consensus.add(POOLED, selection[0], selection[1], "", 0.0)
+                voted = consensus.result()
+                if voted is not None:
+                    selection = voted[:4]
+                    details['agreement'] = voted[4]
+
+        if self.cascade:
+            self._record_cascade_outcome(cascade_variant)
+        if consensus is not None and self.consensus_k and cascade_variant is None:
+            self._record_consensus_outcome(consensus_variant)
+        self._record_timings(timings)
+
+        best_plate, _, best_province, _ = selection
 
-            for bbox, text, conf in results:
-                cleaned = self.clean_text(text)
-                if not cleaned:
-                    continue
+        # ✅ รวมผลลัพธ์
+        combined_text = best_plate
+        if best_province:
+            combined_text += f" {best_province}"
+
+        logger.info(f"✅ Final combined text: '{combined_text}'")
+        if not combined_text:
+            EMPTY_OCR_RESULTS.inc()
+        details.update({'text': combined_text, 'plate': best_plate, 'province': best_province})
+        return details
+
+    def _read_variant(self, name, img, plate_fragments, province_candidates, regions=None):
+        """
+        รัน OCR บนภาพ variant เดียว แล้วเพิ่มผลลงใน plate_fragments / province_candidates
+        ถ้ามี regions (จาก shared detection) จะรันเฉพาะ recognizer บนกล่องเหล่านั้น
+        """
+        if regions is not None:
+            with stage_timer("recognize"):
+                results = self._recognize_regions(img, regions)
+        else:
+            with stage_timer("readtext"):
+                results = self.ocr_adapter.readtext(img, self._detection_buffer(img))
+        logger.info(f"🔹 Processed image '{name}': found {len(results)} OCR lines")
+
+        for bbox, text, conf in results:
+            cleaned = self.clean_text(text)
+            if not cleaned:
+                continue
 
-                logger.info(f"📝 Cleaned text: '{text}' -> '{cleaned}' (conf={conf:.3f})")
+            logger.info(f"📝 Cleaned text: '{text}' -> '{cleaned}' (conf={conf:.3f})")
 
-                # ตรวจสอบจังหวัด
+            # ตรวจสอบจังหวัด
+            with stage_timer("province_match"):
                 matched_province = self.match_province(cleaned)
-                if matched_province:
-                    province_candidates.append((matched_province, conf, cleaned))
-                    continue
+            if matched_province:
+                province_candidates.append((matched_province, conf, cleaned))
+                continue
+
+            # เก็บ fragments ของป้ายทะเบียน (ทั้งที่สมบูรณ์และไม่สมบูรณ์)
+            if self.is_license_plate_fragment(cleaned):
+                plate_fragments.append((cleaned, conf, bbox))
+                logger.info(f"🧩 Plate fragment: '{cleaned}' (conf={conf:.3f})")
+
+    def _detection_buffer(self, img):
+        """buffer ของ thread สำหรับภาพ BGR ที่ส่งเข้า text detector (เฉพาะภาพ grayscale)"""
+        if img.ndim != 2:
+            return None
+        return self._preprocess_contexts.get().buffer('detect_bgr', img.shape + (3,))
+
+    def _detect_text_regions(self, img):
+        """รัน CRAFT text detector ของ EasyOCR ครั้งเดียว คืนค่า (horizontal_list, free_list)"""
+        with stage_timer("text_detection"):
+            horizontal_list, free_list = self.ocr_adapter.detect(img, self._detection_buffer(img))
+        logger.info(f"🔎 Shared text detection: {len(horizontal_list) + len(free_list)} regions")
+        return horizontal_list, free_list
 
-                # เก็บ fragments ของป้ายทะเบียน (ทั้งที่สมบูรณ์และไม่สมบูรณ์)
-                if self.is_license_plate_fragment(cleaned):
-                    plate_fragments.append((cleaned, conf, bbox))
-                    logger.info(f"🧩 Plate fragment: '{cleaned}' (conf={conf:.3f})")
+    def _recognize_regions(self, img, regions):
+        """รันเฉพาะ recognizer ของ EasyOCR บนกล่องที่ตรวจจับไว้แล้ว (ผลลัพธ์รูปแบบเดียวกับ readtext)"""
+        return self.ocr_adapter.recognize(img, regions)
 
+    def _select_result(self, plate_fragments, province_candidates):
+        """
+        เลือกป้ายทะเบียนและจังหวัดที่ดีที่สุด
+        คืนค่า (best_plate, plate_conf, best_province, province_conf)
+        """
         # ✅ รวม fragments เป็นป้ายทะเบียนเต็ม
-        combined_plates = self.combine_license_plate_fragments(plate_fragments)
-        
+        with stage_timer("fragment_combine"):
+            combined_plates = self.combine_license_plate_fragments(plate_fragments)
+
         # ✅ เลือกป้ายทะเบียนที่ดีที่สุด
-        best_plate = ""
+        best_plate, plate_conf = "", 0.0
         if combined_plates:
             # เรียงตาม confidence และความยาว (ป้ายยาวกว่าจะดีกว่า)
             combined_plates.sort(key=lambda x: (x[1], len(x[0])), reverse=True)
-            best_plate = combined_plates[0][0]
-            logger.info(f"🏆 Selected plate: '{best_plate}' (conf={combined_plates[0][1]:.3f})")
+            best_plate, plate_conf = combined_plates[0][0], combined_plates[0][1]
+            logger.info(f"🏆 Selected plate: '{best_plate}' (conf={plate_conf:.3f})")
         elif plate_fragments:
             # ถ้ารวมไม่ได้ ให้เอา fragment ที่ดีที่สุด
             plate_fragments.sort(key=lambda x: (x[1], len(x[0])), reverse=True)
-            best_plate = plate_fragments[0][0]
-            logger.info(f"🏆 Selected plate fragment: '{best_plate}' (conf={plate_fragments[0][1]:.3f})")
+            best_plate, plate_conf = plate_fragments[0][0], plate_fragments[0][1]
+            logger.info(f"🏆 Selected plate fragment: '{best_plate}' (conf={plate_conf:.3f})")
 
         # ✅ เลือกจังหวัดที่ดีที่สุด
-        best_province = ""
+        best_province, province_conf = "", 0.0
         if province_candidates:
             province_candidates.sort(key=lambda x: x[1], reverse=True)
-            best_province = province_candidates[0][0]
-            logger.info(f"🏆 Selected province: '{best_province}' (from '{province_candidates[0][2]}', conf: {province_candidates[0][1]:.3f})")
-
-        # ✅ รวมผลลัพธ์
-        combined_text = best_plate
-        if best_province:
-            combined_text += f" {best_province}"
+            best_province, province_conf = province_candidates[0][0], province_candidates[0][1]
+            logger.info(f"🏆 Selected province: '{best_province}' (from '{province_candidates[0][2]}', conf: {province_conf:.3f})")
+
+        return best_plate, plate_conf, best_province, province_conf
+
+    def _cascade_satisfied(self, selection):
+        best_plate, plate_conf, best_province, province_conf = selection
+        return (
+            bool(best_province)
+            and self.is_valid_license_plate(best_plate)
+            and min(plate_conf, province_conf) >= self.cascade_min_confidence
+        )
+
+    def _record_cascade_outcome(self, variant):
+        with self._stats_lock:
+            self.variant_stats['requests'] += 1
+            if variant is None:
+                self.variant_stats['exhausted'] += 1
+            else:
+                self.variant_wins[variant] += 1
 
-        logger.info(f"✅ Final combined text: '{combined_text}'")
-        return combined_text
\ No newline at end of file
+    def _record_consensus_outcome(self, variant):
+        with self._stats_lock:
+            self.consensus_stats['requests'] += 1
+            if variant is None:
+                self.consensus_stats['exhausted'] += 1
+            else:
+                self.consensus_wins[variant] += 1
+
+    def _record_timings(self, timings):
+        with self._stats_lock:
+            self.stage_counts['requests'] += 1
+            for stage, elapsed in timings.items():
+                self.stage_totals[stage] += elapsed
+                self.stage_counts[stage] += 1
+
+    def get_variant_stats(self):
+        """สถิติว่า variant ไหนทำให้ cascade / consensus หยุด และเวลาเฉลี่ยของแต่ละขั้นตอน preprocess (ms)"""
+        with self._stats_lock:
+            return {
+                'cascade': self.cascade,
+                'order': list(self.cascade_order),
+                'requests': self.variant_stats['requests'],
+                'exhausted': self.variant_stats['exhausted'],
+                'wins': dict(self.variant_wins),
+                'consensus': {
+                    'enabled': self.consensus,
+                    'k': self.consensus_k,
+                    'requests': self.consensus_stats['requests'],
+                    'exhausted': self.consensus_stats['exhausted'],
+                    'wins': dict(self.consensus_wins)
+                },
+                'preprocess_profile': self.preprocess_profile,
+                'preprocess_ms': {
+                    stage: round(total / self.stage_counts[stage], 3)
+                    for stage, total in self.stage_totals.items()
+                },
+                'preprocess_stage_runs': {
+                    stage: count for stage, count in self.stage_counts.items() if stage != 'requests'
+                },
+                'preprocess_requests': self.stage_counts['requests']
+            }
@@ -0,0 +1,41 @@
+import logging
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+
+def detector_kwargs(debug_dumper=None):
+    """kwargs ของ LicensePlateDetector จาก app.config (ใช้ร่วมกันทั้ง API, worker pool และ benchmark)"""
+    return {"headless": config.HEADLESS, "debug_dumper": debug_dumper}
+
+
+def ocr_kwargs(debug_dumper=None):
+    """kwargs ของ OCRService จาก app.config (ใช้ร่วมกันทั้ง API, worker pool และ benchmark)"""
+    return {
+        "debug": True,
+        "debug_dumper": debug_dumper,
+        "cascade": config.OCR_CASCADE,
+        "cascade_order": config.OCR_CASCADE_ORDER,
+        "cascade_min_confidence": config.OCR_CASCADE_MIN_CONFIDENCE,
+        "shared_detection": config.OCR_SHARED_DETECTION,
+        "detection_variant": config.OCR_DETECTION_VARIANT,
+        "preprocess_profile": config.OCR_PREPROCESS_PROFILE,
+        "consensus": config.OCR_CONSENSUS,
+        "consensus_k": config.OCR_CONSENSUS_K,
+        "consensus_similarity": config.OCR_CONSENSUS_SIMILARITY,
+        "recognizer_batch_size": config.OCR_RECOGNIZER_BATCH_SIZE
+    }
+
+
+def recognize_plate(detector, ocr_service, image):
+    """
+    ตรวจจับป้าย (YOLO) แล้ว OCR ผลแรก ถ้าไม่พบป้ายจะส่งทั้งภาพให้ OCR
+    คืนค่า combined_text (ใช้ร่วมกันทั้งโหมด thread และ process worker)
+    """
+    detected_plates = detector.detect_license_plates(image)
+    logger.info(f"✅ Detection: {len(detected_plates)} regions")
+
+    if detected_plates:
+        return ocr_service.extract_text(detected_plates[0]['image'])
+    return ocr_service.extract_text(image)
@@ -0,0 +1,62 @@
+import threading
+
+import cv2
+import numpy as np
+
+# ขนาดมาตรฐานของภาพหลัง upscale ใน OCRService._preprocess_base (อย่างน้อย 500x200)
+DEFAULT_CAPACITY = 500 * 200
+# buffer ที่เก็บไว้ใช้ซ้ำขยายได้ไม่เกินนี้ (pixel ต่อ channel: ภาพ BGR ได้ 3 เท่าของภาพ gray)
+# ภาพที่ใหญ่กว่า (เช่น OCR ทั้งเฟรมเมื่อไม่พบป้าย) ใช้ array ชั่วคราวแทน ไม่ค้างอยู่ใน thread ตลอดไป
+DEFAULT_MAX_POOLED = 4 * DEFAULT_CAPACITY
+
+
+class PreprocessContext:
+    """
+    ของที่ใช้ซ้ำได้ระหว่าง request ของ preprocess (ใช้ภายใน thread เดียวเท่านั้น)
+    - CLAHE และ structuring element สร้างครั้งเดียว
+    - buffer uint8 แยกตามชื่อขั้นตอน ขยายอย่างเดียว (grow-only) จนถึง max_pooled pixel ต่อ channel
+      แล้วคืนเป็น view ขนาดที่ต้องการ ใช้เป็น dst= ของฟังก์ชัน OpenCV จึงไม่ต้องจองภาพใหม่ทุก request
+      ภาพที่ใหญ่เกินได้ array ใหม่ที่ไม่ถูกเก็บไว้
+    ภาพที่ได้จาก buffer จะถูกเขียนทับใน request ถัดไปของ thread เดียวกัน ต้อง copy ถ้าจะเก็บไว้
+    """
+
+    def __init__(self, clip_limit=3.0, tile_grid_size=(8, 8), morph_kernel_size=(2, 2),
+                 initial_capacity=DEFAULT_CAPACITY, max_pooled=DEFAULT_MAX_POOLED):
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+        self.morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, morph_kernel_size)
+        self.initial_capacity = initial_capacity
+        self.max_pooled = max(max_pooled, initial_capacity)
+        self._buffers = {}
+        self.allocations = 0
+        self.unpooled = 0
+
+    def buffer(self, name, shape):
+        """คืน view ขนาด shape (uint8, contiguous) ของ buffer ชื่อ name"""
+        size = int(np.prod(shape))
+        channels = shape[2] if len(shape) == 3 else 1
+        if size > self.max_pooled * channels:
+            self.unpooled += 1
+            return np.empty(shape, dtype=np.uint8)
+        storage = self._buffers.get(name)
+        if storage is None or storage.size < size:
+            storage = np.empty(max(size, self.initial_capacity), dtype=np.uint8)
+            self._buffers[name] = storage
+            self.allocations += 1
+        return storage[:size].reshape(shape)
+
+    @property
+    def nbytes(self):
+        return sum(storage.nbytes for storage in self._buffers.values())
+
+
+class ThreadLocalPreprocessContext(threading.local):
+    """PreprocessContext แยกต่อ thread (executor ของ API มีหลาย thread ใช้ OCRService ตัวเดียวกัน)"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.context = None
+
+    def get(self):
+        if self.context is None:
+            self.context = PreprocessContext(**self.kwargs)
+        return self.context
@@ -0,0 +1,167 @@
+import difflib
+from collections import Counter, defaultdict
+
+THAI_PROVINCES = frozenset({
+    'กรุงเทพมหานคร', 'กรุงเทพฯ', 'กระบี่', 'กาญจนบุรี', 'กาฬสินธุ์', 'กำแพงเพชร',
+    'ขอนแก่น', 'จันทบุรี', 'ฉะเชิงเทรา', 'ชลบุรี', 'ชัยนาท', 'ชัยภูมิ', 'ชุมพร',
+    'เชียงราย', 'เชียงใหม่', 'ตรัง', 'ตราด', 'ตาก', 'นครนายก', 'นครปฐม', 'นครพนม',
+    'นครราชสีมา', 'นครศรีธรรมราช', 'นครสวรรค์', 'นนทบุรี', 'นราธิวาส', 'น่าน',
+    'บึงกาฬ', 'บุรีรัมย์', 'ปทุมธานี', 'ประจวบคีรีขันธ์', 'ปราจีนบุรี', 'ปัตตานี',
+    'พระนครศรีอยุธยา', 'พะเยา', 'พังงา', 'พัทลุง', 'พิจิตร', 'พิษณุโลก', 'เพชรบุรี',
+    'เพชรบูรณ์', 'แพร่', 'ภูเก็ต', 'มหาสารคาม', 'มุกดาหาร', 'แม่ฮ่องสอน', 'ยโสธร',
+    'ยะลา', 'ร้อยเอ็ด', 'ระนอง', 'ระยอง', 'ราชบุรี', 'ลพบุรี', 'ลำปาง', 'ลำพูน',
+    'เลย', 'ศรีสะเกษ', 'สกลนคร', 'สงขลา', 'สตูล', 'สมุทรปราการ', 'สมุทรสงคราม',
+    'สมุทรสาคร', 'สระแก้ว', 'สระบุรี', 'สิงห์บุรี', 'สุโขทัย', 'สุพรรณบุรี', 'สุราษฎร์ธานี',
+    'สุรินทร์', 'หนองคาย', 'หนองบัวลำภู', 'อ่างทอง', 'อำนาจเจริญ', 'อุดรธานี', 'อุตรดิตถ์',
+    'อุทัยธานี', 'อุบลราชธานี'
+})
+
+
+class ProvinceMatcher:
+    """
+    จับคู่ชื่อจังหวัดจากข้อความ OCR โดยสร้าง index ครั้งเดียว
+    ให้ผลและคะแนนเหมือนการวนเทียบทุกจังหวัด/ทุก substring แบบเดิม แต่:
+    - ใช้ n-gram index (n = min_length) คัดเฉพาะจังหวัดที่มีส่วนร่วมกับข้อความ
+      (จังหวัดที่ไม่มี n-gram ร่วมเลยไม่มีทางได้คะแนน)
+    - ใช้เซตของ substring ของแต่ละจังหวัด หา common substring ที่ยาวที่สุดในเวลาเชิงเส้น
+    - fuzzy match คัดด้วยความยาวก่อน (เงื่อนไขเดียวกับ real_quick_ratio ของ difflib)
+    """
+
+    def __init__(self, provinces=THAI_PROVINCES, partial_threshold=0.25, fuzzy_cutoff=0.6):
+        # ลำดับเดียวกับการวนเซตเดิม เพื่อให้ผลเสมอกันเลือกจังหวัดเดียวกัน
+        self.provinces = tuple(provinces)
+        self.partial_threshold = partial_threshold
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._province_set = frozenset(self.provinces)
+        self._order = {province: i for i, province in enumerate(self.provinces)}
+        self._substrings = {
+            province: frozenset(
+                province[i:j] for i in range(len(province)) for j in range(i + 1, len(province) + 1)
+            )
+            for province in self.provinces
+        }
+        self._gram_indexes = {}
+
+        self._by_length = defaultdict(list)
+        for province in self.provinces:
+            self._by_length[len(province)].append((province, Counter(province)))
+
+    def _gram_index(self, n):
+        index = self._gram_indexes.get(n)
+        if index is None:
+            index = defaultdict(set)
+            for province in self.provinces:
+                for i in range(len(province) - n + 1):
+                    index[province[i:i + n]].add(province)
+            self._gram_indexes[n] = index
+        return index
+
+    def partial_match_with_score(self, text, min_length=3):
+        """คืนค่า (best_match, best_score) ก่อนตัดด้วย partial_threshold"""
+        if len(text) < min_length:
+            return None, 0
+
+        index = self._gram_index(min_length)
+        candidates = set()
+        for i in range(len(text) - min_length + 1):
+            candidates.update(index.get(text[i:i + min_length], ()))
+
+        best_match = None
+        best_score = 0
+
+        for province in sorted(candidates, key=self._order.__getitem__):
+            # ตรวจสอบว่าเป็น substring ของ province
+            if text in province:
+                score = len(text) / len(province)
+                score += self._position_bonus(province, text)
+                if score > best_score:
+                    best_score = score
+                    best_match = province
+
+            # ตรวจสอบ province เป็น substring ของ text
+            elif province in text and len(province) >= min_length:
+                score = len(province) / len(text) + 0.1
+                if score > best_score:
+                    best_score = score
+                    best_match = province
+
+            else:
+                substrings = self._substrings[province]
+                max_common_len = 0
+                common_len = 0
+                for i in range(len(text) - min_length + 1):
+                    # ความยาวสูงสุดของ text[i:] ที่เป็น substring ของ province (ลดลงได้ไม่เกิน 1 ต่อขั้น)
+                    common_len = max(common_len - 1, 0)
+                    while i + common_len < len(text) and text[i:i + common_len + 1] in substrings:
+                        common_len += 1
+
+                    # substring ที่ยาวกว่าเดิมแต่ละความยาวถูกนับคะแนนตามลำดับเหมือนการวนแบบเดิม
+                    for length in range(max(max_common_len + 1, min_length), common_len + 1):
+                        substring = text[i:i + length]
+                        max_common_len = length
+                        score = (length / len(province)) * 0.8
+                        score += self._position_bonus(province, substring)
+                        if score > best_score:
+                            best_score = score
+                            best_match = province
+
+        return best_match, best_score
+
+    @staticmethod
+    def _position_bonus(province, substring):
+        # ให้คะแนนพิเศษถ้าเริ่มต้นหรือท้ายของจังหวัด
+        if province.startswith(substring):
+            return 0.4
+        elif province.endswith(substring):
+            return 0.3
+        return 0.2
+
+    def partial_match(self, text, min_length=3):
+        best_match, best_score = self.partial_match_with_score(text, min_length)
+        return best_match if best_match and best_score >= self.partial_threshold else None
+
+    def fuzzy_match(self, text):
+        """ผลเหมือน difflib.get_close_matches(text, provinces, n=1, cutoff=fuzzy_cutoff)"""
+        cutoff = self.fuzzy_cutoff
+        text_len = len(text)
+        text_counts = Counter(text)
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(text)
+
+        best = None
+        for length, provinces in self._by_length.items():
+            # real_quick_ratio ขึ้นกับความยาวอย่างเดียว ตัดทั้งกลุ่มได้เลย
+            total = length + text_len
+            if 2.0 * min(length, text_len) / total < cutoff:
+                continue
+            for province, counts in provinces:
+                # quick_ratio = จำนวนตัวอักษรร่วมแบบ multiset (ใช้ Counter ที่คำนวณไว้แล้ว)
+                matches = sum(min(count, text_counts[char]) for char, count in counts.items() if char in text_counts)
+                if 2.0 * matches / total >= cutoff:
+                    matcher.set_seq1(province)
+                    ratio = matcher.ratio()
+                    if ratio >= cutoff and (best is None or (ratio, province) > best):
+                        best = (ratio, province)
+
+        return best[1] if best else None
+
+    def match(self, text):
+        """
+        exact -> partial -> fuzzy คืนค่า (province, method) หรือ (None, None)
+        """
+        if not text or len(text) < 2:
+            return None, None
+
+        if text in self._province_set:
+            return text, 'exact'
+
+        partial_result = self.partial_match(text)
+        if partial_result:
+            return partial_result, 'partial'
+
+        fuzzy_result = self.fuzzy_match(text)
+        if fuzzy_result:
+            return fuzzy_result, 'fuzzy'
+
+        return None, None
@@ -0,0 +1,112 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    LRU + TTL cache ของผล OCR โดยใช้ hash ของ pixel ที่ decode แล้วเป็น key
+    ถ้าเปิด perceptual จะใช้ dHash จับภาพที่เกือบซ้ำ (เช่นรถจอดนิ่งหน้าไม้กั้น)
+    hash_size ควรใหญ่พอ เพราะป้ายเป็นส่วนเล็กของภาพ dHash หยาบๆ อาจมองรถต่างคันเป็นภาพเดียวกัน
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=60.0, perceptual=False,
+                 max_hamming_distance=6, hash_size=16):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.perceptual = perceptual
+        self.max_hamming_distance = max_hamming_distance
+        self.hash_size = hash_size
+
+        self._entries = OrderedDict()  # exact_key -> (value, phash, expires_at)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def keys_for(self, pixels):
+        """คำนวณ (exact_key, perceptual_hash) ของภาพ (ndarray)"""
+        pixels = np.ascontiguousarray(pixels)
+        digest = hashlib.blake2b(pixels.data, digest_size=16)
+        digest.update(f"{pixels.shape}{pixels.dtype.str}".encode())
+        phash = self._dhash(pixels) if self.perceptual else None
+        return digest.hexdigest(), phash
+
+    def _dhash(self, pixels):
+        gray = cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY) if pixels.ndim == 3 else pixels
+        small = cv2.resize(gray, (self.hash_size + 1, self.hash_size), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+    def get(self, keys):
+        """คืนค่าผลที่ cache ไว้ หรือ None ถ้าไม่พบ/หมดอายุ"""
+        exact_key, phash = keys
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._entries.move_to_end(exact_key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[exact_key]
+                self.expirations += 1
+
+            if phash is not None:
+                match_key = self._find_near_duplicate(phash, now)
+                if match_key is not None:
+                    self._entries.move_to_end(match_key)
+                    self.near_hits += 1
+                    return self._entries[match_key][0]
+
+            self.misses += 1
+            return None
+
+    def _find_near_duplicate(self, phash, now):
+        best_key, best_distance = None, self.max_hamming_distance + 1
+        for key, (_, entry_hash, expires_at) in self._entries.items():
+            if entry_hash is None or expires_at <= now:
+                continue
+            distance = bin(entry_hash ^ phash).count('1')
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def put(self, keys, value):
+        exact_key, phash = keys
+        with self._lock:
+            self._entries[exact_key] = (value, phash, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(exact_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'perceptual': self.perceptual,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0
+            }
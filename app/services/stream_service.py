@@ -0,0 +1,230 @@
+import logging
+import itertools
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _iou_matrix(boxes_a, boxes_b):
+    """IoU ระหว่างกล่องทุกคู่ (x1, y1, x2, y2)"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+class PlateTrack:
+    def __init__(self, track_id, box, confidence, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.confidence = confidence
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.hits = 1
+
+        # ผล OCR ที่ดีที่สุดของ track นี้
+        self.best_quality = 0.0
+        self.ocr_count = 0
+        self.text = ""
+        self.plate = ""
+        self.province = ""
+
+    def to_dict(self):
+        return {
+            'track_id': self.track_id,
+            'bbox': list(self.box),
+            'confidence': self.confidence,
+            'first_frame': self.first_frame,
+            'last_frame': self.last_frame,
+            'hits': self.hits,
+            'ocr_count': self.ocr_count,
+            'text': self.text,
+            'plate': self.plate,
+            'province': self.province
+        }
+
+
+class IoUTracker:
+    """จับคู่กล่องระหว่างเฟรมแบบ greedy ตาม IoU สูงสุด"""
+
+    def __init__(self, iou_threshold=0.3, max_missed_frames=15, min_new_confidence=0.0):
+        self.iou_threshold = iou_threshold
+        self.max_missed_frames = max_missed_frames
+        # กล่องที่ไม่ตรงกับ track เดิมต้องมั่นใจอย่างน้อยเท่านี้จึงเปิด track ใหม่ได้
+        self.min_new_confidence = min_new_confidence
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, detections, frame_index):
+        """
+        detections: list ของ dict ที่มี 'box' และ 'confidence'
+        คืนค่า (matched, ended) โดย matched เป็น list ของ (track, detection, is_new)
+        """
+        tracks = list(self.tracks.values())
+        matched = []
+        unmatched_detections = set(range(len(detections)))
+
+        if tracks and detections:
+            ious = _iou_matrix([t.box for t in tracks], [d['box'] for d in detections])
+            pairs = np.argwhere(ious >= self.iou_threshold)
+            order = np.argsort(-ious[pairs[:, 0], pairs[:, 1]], kind='stable')
+            used_tracks = set()
+            for track_idx, det_idx in pairs[order]:
+                if track_idx in used_tracks or det_idx not in unmatched_detections:
+                    continue
+                used_tracks.add(track_idx)
+                unmatched_detections.discard(det_idx)
+
+                track, detection = tracks[track_idx], detections[det_idx]
+                track.box = detection['box']
+                track.confidence = detection['confidence']
+                track.last_frame = frame_index
+                track.hits += 1
+                matched.append((track, detection, False))
+
+        for det_idx in sorted(unmatched_detections):
+            detection = detections[det_idx]
+            if detection['confidence'] < self.min_new_confidence:
+                continue
+            track = PlateTrack(next(self._ids), detection['box'], detection['confidence'], frame_index)
+            self.tracks[track.track_id] = track
+            matched.append((track, detection, True))
+
+        ended = [
+            track for track in tracks
+            if frame_index - track.last_frame > self.max_missed_frames
+        ]
+        for track in ended:
+            del self.tracks[track.track_id]
+
+        return matched, ended
+
+    def flush(self):
+        ended = list(self.tracks.values())
+        self.tracks.clear()
+        return ended
+
+
+class StreamProcessor:
+    """
+    ประมวลผลสตรีมวิดีโอ: ตรวจจับป้ายทุก sample_every เฟรม ติดตามกล่องด้วย IoU tracker
+    และ OCR เฉพาะเมื่อเจอ track ใหม่ หรือเมื่อคุณภาพของ crop ดีขึ้นกว่าเดิม quality_gain เท่า
+    กล่องที่ซ้อนกันเกิน dedup_iou ถูกตัดก่อนเข้า tracker และกล่องที่มั่นใจต่ำกว่า min_track_confidence
+    อัปเดต track เดิมได้แต่ไม่เปิด track ใหม่ (detector ใช้ threshold ต่ำมาก)
+    """
+
+    def __init__(self, detector, ocr_service, sample_every=3, iou_threshold=0.3,
+                 max_missed_frames=15, quality_gain=1.2, max_ocr_per_track=3,
+                 dedup_iou=0.3, min_track_confidence=0.25):
+        self.detector = detector
+        self.ocr_service = ocr_service
+        self.sample_every = max(1, sample_every)
+        self.dedup_iou = dedup_iou
+        self.quality_gain = quality_gain
+        self.max_ocr_per_track = max_ocr_per_track
+        # max_missed_frames นับเป็นจำนวนเฟรมจริง (ไม่ใช่เฉพาะเฟรมที่ถูก sample)
+        self.tracker = IoUTracker(iou_threshold, max_missed_frames * self.sample_every, min_track_confidence)
+
+        self.frames_read = 0
+        self.frames_detected = 0
+        self.ocr_calls = 0
+
+    @staticmethod
+    def crop_quality(crop, confidence):
+        """คะแนนคุณภาพ crop: ขนาด x ความมั่นใจ x ความคมชัด (variance ของ Laplacian)"""
+        if crop.size == 0:
+            return 0.0
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+        return float(np.sqrt(crop.shape[0] * crop.shape[1]) * confidence * np.log1p(sharpness))
+
+    def process_frame(self, frame, frame_index):
+        """ประมวลผลเฟรม BGR หนึ่งเฟรม คืนค่า list ของ event"""
+        self.frames_read += 1
+        if frame_index % self.sample_every != 0:
+            return []
+
+        self.frames_detected += 1
+        detections = self.detector.detect_plate_boxes(frame, dedup_iou=self.dedup_iou)
+        matched, ended = self.tracker.update(detections, frame_index)
+
+        events = []
+        for track, detection, is_new in matched:
+            if track.ocr_count >= self.max_ocr_per_track:
+                continue
+
+            x1, y1, x2, y2 = detection['box']
+            crop = frame[max(0, y1):y2, max(0, x1):x2]
+            quality = self.crop_quality(crop, detection['confidence'])
+            if not is_new and quality < track.best_quality * self.quality_gain:
+                continue
+
+            details = self.ocr_service.extract_text_with_details(crop)
+            self.ocr_calls += 1
+            track.ocr_count += 1
+            track.best_quality = quality
+
+            text_changed = details['text'] and details['text'] != track.text
+            if details['text']:
+                track.text = details['text']
+                track.plate = details['plate']
+                track.province = details['province']
+
+            if is_new or text_changed:
+                events.append({
+                    'event': 'new_track' if is_new else 'updated',
+                    'frame': frame_index,
+                    'quality': quality,
+                    **track.to_dict()
+                })
+
+        for track in ended:
+            events.append({'event': 'track_ended', 'frame': frame_index, **track.to_dict()})
+        return events
+
+    def run(self, source):
+        """อ่านวิดีโอจากไฟล์/pipe/URL ด้วย cv2.VideoCapture แล้ว yield event ทีละรายการ"""
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise RuntimeError(f"Cannot open video source: {source}")
+
+        frame_index = 0
+        try:
+            while True:
+                # เฟรมที่ไม่ถูก sample ใช้ grab() เพื่อข้ามการ decode เต็มเฟรม
+                if frame_index % self.sample_every != 0:
+                    if not capture.grab():
+                        break
+                    self.frames_read += 1
+                    frame_index += 1
+                    continue
+
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield from self.process_frame(frame, frame_index)
+                frame_index += 1
+        finally:
+            capture.release()
+
+        for track in self.tracker.flush():
+            yield {'event': 'track_ended', 'frame': frame_index, **track.to_dict()}
+
+    def get_stats(self):
+        return {
+            'frames_read': self.frames_read,
+            'frames_detected': self.frames_detected,
+            'ocr_calls': self.ocr_calls,
+            'active_tracks': len(self.tracker.tracks)
+        }
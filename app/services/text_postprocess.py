@@ -0,0 +1,146 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# เก็บเฉพาะอักษรไทย (รวมสระ/วรรณยุกต์) และเลขอารบิก
+_NON_PLATE_CHARS = re.compile(r'[^\u0E00-\u0E7F0-9]')
+
+# fragment ของป้าย: "1กช", "กช" / "กช123", "4559"
+_FRAGMENT_PATTERN = re.compile(r'^(?:\d+[ก-ฮ]+|[ก-ฮ]+\d*|\d+|[ก-ฮ]+)$')
+
+# ป้ายสมบูรณ์: กช4559, 1กช4559, กช4559ก
+_PLATE_PATTERN = re.compile(
+    r'^(?:[ก-ฮ]{1,3}\d{1,4}|\d{1,2}[ก-ฮ]{1,3}\d{1,4}|[ก-ฮ]{1,2}\d{1,4}[ก-ฮ]{0,2})$'
+)
+
+# แก้อักษรที่มักอ่านผิดเมื่ออยู่ในบริบทป้ายทะเบียน (มีตัวเลข)
+# ตารางเดิมมี ค->ข, ซ->ช, ฑ->ด, ฒ->ท, ฟ->ผ ด้วย แต่เงื่อนไขเดิมแก้เฉพาะ ข เท่านั้น
+# และรายการอักษรป้ายจริงที่ห้ามแก้ (กก, กข, ...) ขึ้นต้นด้วย ก ทั้งหมด จึงไม่มีทางตรงกับคู่ที่ขึ้นต้นด้วย ข
+DIGIT_CONTEXT_CORRECTIONS = {'ข': 'ช'}
+
+# แก้ทั้งบรรทัดที่ OCR อ่านผิดบ่อย (OCRService.COMMON_CORRECTIONS อ้างถึง dict นี้)
+COMMON_CORRECTIONS = {
+    "ขนบ": "ขนษ",
+    "รของ": "ระนอง",
+    "รยอง": "ระยอง",
+    "บก": "บข",
+    "6อบ": "660",
+    "6บ": "660",
+    "66บ": "660",
+    "77อ": "772",
+    # เพิ่มการแก้ไขสำหรับกรุงเทพมหานคร
+    "งเทพมหาน": "กรุงเทพมหานคร",
+    "งทพมหาน": "กรุงเทพมหานคร",
+    "งทพมทวน": "กรุงเทพมหานคร",
+    "รุงเทพฯ": "กรุงเทพมหานคร",
+    "งทพมหวนคร": "กรุงเทพมหานคร",
+    "กรงทศมทวบคร": "กรุงเทพมหานคร",
+    "กกรงทพมนวนคร": "กรุงเทพมหานคร",
+    "รุงเทพมหานคร": "กรุงเทพมหานคร",
+    "กรงททพยพทนคร": "กรุงเทพมหานคร",
+    "กรงทพมห1นคร": "กรุงเทพมหานคร",
+    "กรงทพมนวนคร": "กรุงเทพมหานคร",
+    "กรงทพมหวนคร": "กรุงเทพมหานคร",
+    "กรงททมนวนคร": "กรุงเทพมหานคร",
+    "กรงทพมททนคร": "กรุงเทพมหานคร",
+    # เพิ่มการแก้ไขสำหรับกรุงเทพ - แก้จาก กกญจนบร -> กาญจนบุรี (ไม่ใช่กรุงเทพ)
+    "กกญจนบร": "กาญจนบุรี",
+    "กวญจนบร": "กาญจนบุรี", 
+    "กญจนบร": "กาญจนบุรี",
+    # เพิ่มการแก้ไขฉะเชิงเทรา
+    "ฉรชงททรก": "ฉะเชิงเทรา",
+    # เพิ่มการแก้ไข ร - ธ
+    "ระยอง": "ระนอง",
+    "รของ": "ระยอง",
+    "รระบุงร": "ธระบุรี",
+    "ธะนอง": "ระนอง",  
+    "ธะยอง": "ระยอง",
+    "ราชบุธี": "ราชบุรี",
+    "ธาชบุรี": "ราชบุรี",
+    "ธ้อยเอ็ด": "ร้อยเอ็ด",
+    "รังควย": "ราชบุรี",
+    "นครธรรมธาช": "นครศรีธรรมราช",
+    "สรรบร": "สระบุรี",
+    "สร8บร": "สระบุรี",
+    "สุธิธธานี": "สุราษฎร์ธานี",
+    "สุราดรธานี": "สุราษฎร์ธานี",
+    "สุราสธรธานี": "สุราษฎร์ธานี",
+    "ฉชงททรว": "ฉะเชิงเทรา",
+    # เพิ่มการแก้ไขอุดรธานี
+    "อุดรธภนี": "อุดรธานี",
+    "อุดธธานี": "อุดรธานี",
+    "อุดรราณี": "อุดรธานี",
+    # เพิ่มการแก้ไขอักษรป้ายทะเบียนที่อ่านผิด - แก้ กข เป็น กช
+    "กข": "กช",
+    "1กข": "1กช",
+    "2กข": "2กช",
+    "3กข": "3กช",
+    "4กข": "4กช",
+    "5กข": "5กช",
+    "6กข": "6กข",  # 6กข เป็นป้ายจริง ไม่ต้องแก้
+    "7กข": "7กช",
+    "8กข": "8กช",
+    "9กข": "9กช",
+    "0กข": "0กช",
+    # เพิ่มการแก้ไขอักษรอื่นที่มักอ่านผิด
+    "บ": "ษ",
+    "กค": "กข",
+    "กซ": "กช",
+    "กฑ": "กด",
+    "กฒ": "กท",
+    "กฟ": "กผ",
+    "1กค": "1กข",
+    "1กซ": "1กช",
+    "1กฑ": "1กด",
+    "1กฒ": "1กท",
+    "1กฟ": "1กผ",
+}
+
+
+class PlateTextPostProcessor:
+    """
+    ทำความสะอาดข้อความแต่ละบรรทัดจาก OCR และตรวจรูปแบบป้ายทะเบียน
+    regex / ตารางแปลงอักษรสร้างครั้งเดียว ให้ผลเหมือนเมธอดเดิมของ OCRService ทุกกรณี
+    (ดู benchmarks/bench_text_postprocess.py)
+    """
+
+    def __init__(self, common_corrections, max_length=20):
+        # COMMON_CORRECTIONS เป็นการเทียบทั้งบรรทัด (exact match) จึงใช้ dict lookup O(1)
+        self.common_corrections = dict(common_corrections)
+        self.max_length = max_length
+        self._digit_context_table = str.maketrans(DIGIT_CONTEXT_CORRECTIONS)
+        self._digit_context_chars = frozenset(DIGIT_CONTEXT_CORRECTIONS)
+
+    def smart_correct(self, text):
+        """แก้อักษรที่อ่านผิดโดยดูบริบท: ถ้ามีตัวเลขในบรรทัดถือว่าเป็นป้ายทะเบียน"""
+        if not text:
+            return text
+        if self._digit_context_chars.isdisjoint(text) or not any(map(str.isdigit, text)):
+            return text
+
+        corrected = text.translate(self._digit_context_table)
+        logger.debug(f"🔄 Smart correction result: '{text}' -> '{corrected}'")
+        return corrected
+
+    def clean(self, text):
+        if not text:
+            return ""
+        text = self.smart_correct(text.strip())
+
+        corrected = self.common_corrections.get(text)
+        if corrected is not None:
+            logger.debug(f"🔧 Dictionary correction: '{text}' -> '{corrected}'")
+            text = corrected
+
+        return _NON_PLATE_CHARS.sub('', text)[:self.max_length]
+
+    def is_fragment(self, text):
+        if len(text) < 1:
+            return False
+        return _FRAGMENT_PATTERN.match(text) is not None
+
+    def is_valid_plate(self, text):
+        if len(text) < 3:
+            return False
+        return _PLATE_PATTERN.match(text) is not None
@@ -0,0 +1,69 @@
+import ipaddress
+import logging
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackRejected(ValueError):
+    """callback_url ไม่ได้รับอนุญาต (ให้ API ตอบ 400)"""
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # ไม่ตาม redirect: ปลายทางที่ตรวจแล้วอาจ redirect ต่อไปยัง address ภายใน
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise urllib.error.HTTPError(req.full_url, code, f"Redirect to {newurl} not followed", headers, fp)
+
+
+class CallbackPolicy:
+    """
+    ตรวจ callback_url ของ job ก่อนรับงานและก่อนส่งทุกครั้ง (กัน server ถูกใช้ยิง request เข้าเครือข่ายภายใน)
+    - ต้องเป็น http:// หรือ https:// และ host อยู่ใน allowed_hosts (ถ้ากำหนด)
+    - ทุก address ที่ host resolve ได้ต้องเป็น public IP (ไม่ใช่ loopback, link-local/metadata, RFC1918 ฯลฯ)
+      เว้นแต่ allow_private
+    - ไม่ตาม redirect
+    """
+
+    def __init__(self, allowed_hosts=None, allow_private=False):
+        self.allowed_hosts = {host.lower().rstrip('.') for host in allowed_hosts or ()}
+        self.allow_private = allow_private
+        self._opener = urllib.request.build_opener(_NoRedirect)
+
+    def check(self, url):
+        """คืนค่า url ถ้าอนุญาต ไม่เช่นนั้น raise CallbackRejected (resolve DNS จึงเป็น blocking call)"""
+        parsed = urllib.parse.urlsplit(url or "")
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise CallbackRejected("callback_url must be an http:// or https:// URL")
+        host = parsed.hostname.lower().rstrip('.')
+        if self.allowed_hosts and host not in self.allowed_hosts:
+            raise CallbackRejected(f"Host '{host}' is not in the webhook allowlist")
+        try:
+            port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        except ValueError:
+            raise CallbackRejected("Invalid port in callback_url")
+
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+        except socket.gaierror as e:
+            raise CallbackRejected(f"Cannot resolve host '{host}': {e}")
+
+        if not self.allow_private:
+            for address in addresses:
+                ip = ipaddress.ip_address(address.split('%')[0])
+                if ip.version == 6 and ip.ipv4_mapped is not None:
+                    ip = ip.ipv4_mapped
+                if not ip.is_global:
+                    raise CallbackRejected(f"Host '{host}' resolves to non-public address {ip}")
+        return url
+
+    def post_json(self, url, body, timeout):
+        # ตรวจซ้ำตอนส่ง: DNS ของ host อาจเปลี่ยนไปหลังรับงาน
+        self.check(url)
+        request = urllib.request.Request(
+            url, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        with self._opener.open(request, timeout=timeout) as response:
+            response.read()
@@ -0,0 +1,457 @@
+import os
+import asyncio
+import logging
+import itertools
+import threading
+import time
+import traceback
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_READY = "__ready__"
+
+
+class WorkerCrashed(RuntimeError):
+    """process ของ worker จบการทำงานระหว่างประมวลผลงาน"""
+
+
+class WorkerTaskTimeout(TimeoutError):
+    """งานไม่เสร็จภายใน task_timeout (worker ที่ค้างอยู่กับงานนั้นจะถูก kill แล้วสร้างใหม่)"""
+
+
+def _release_staged(staging):
+    """คืน shared memory ของภาพที่ copy เสร็จแต่ไม่ได้ส่งให้ worker"""
+    if staging.cancelled() or staging.exception() is not None:
+        return
+    shm = staging.result()[0]
+    shm.close()
+    shm.unlink()
+
+# สถานะภายใน process ลูก (โหลดครั้งเดียวตอนเริ่ม worker)
+_detector = None
+_ocr_service = None
+
+
+def _attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _task_recognize(image, **kwargs):
+    from app.services.pipeline import recognize_plate
+    return recognize_plate(_detector, _ocr_service, image)
+
+
+def _task_detect(image, **kwargs):
+    # copy ภาพ crop ออกจาก shared memory ก่อนส่งกลับ เพราะ buffer จะถูกปิดหลังงานเสร็จ
+    return [
+        {**plate, 'image': np.array(plate['image'])}
+        for plate in _detector.detect_license_plates(image)
+    ]
+
+
+def _task_detect_all(image, **kwargs):
+    # ส่งกลับเฉพาะพิกัด ให้ process หลัก crop จากภาพของตัวเอง
+    return [
+        {key: value for key, value in plate.items() if key != 'image'}
+        for plate in _detector.detect_all_plates(image, **kwargs)
+    ]
+
+
+def _task_ocr(image, **kwargs):
+    return _ocr_service.extract_text(image)
+
+
+def _task_ocr_details(image, **kwargs):
+    return _ocr_service.extract_text_with_details(image)
+
+
+_TASKS = {
+    'recognize': _task_recognize,
+    'detect': _task_detect,
+    'detect_all': _task_detect_all,
+    'ocr': _task_ocr,
+    'ocr_details': _task_ocr_details,
+}
+
+
+def _worker_main(worker_id, conn, torch_threads, detector_kwargs, ocr_kwargs):
+    """main loop ของ process ลูก: โหลดโมเดลครั้งเดียว แล้วรับงานจาก pipe ของตัวเองตามลำดับ"""
+    global _detector, _ocr_service
+
+    # ต้องตั้งก่อน import torch เพื่อไม่ให้แต่ละ worker แย่ง intra-op threads กัน
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+
+    try:
+        import cv2
+        cv2.setNumThreads(torch_threads)
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+            torch.set_num_interop_threads(1)
+        except ImportError:
+            pass
+
+        from app.services.detection_service import LicensePlateDetector
+        from app.services.ocr_service import OCRService
+
+        _detector = LicensePlateDetector(**detector_kwargs)
+        _ocr_service = OCRService(**ocr_kwargs)
+    except Exception:
+        conn.send((_READY, worker_id, traceback.format_exc()))
+        return
+
+    conn.send((_READY, worker_id, None))
+
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+
+        task_id, task_name, (shm_name, shape, dtype), kwargs = item
+        shm = image = None
+        try:
+            # งานที่หมดเวลาแล้ว shared memory ถูก unlink ไปแล้ว attach จะล้มเหลว (ผลถูกทิ้ง)
+            shm = _attach_shared_memory(shm_name)
+            image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            result = (task_id, True, _TASKS[task_name](image, **kwargs))
+        except Exception:
+            result = (task_id, False, traceback.format_exc())
+        finally:
+            image = None
+            try:
+                if shm is not None:
+                    shm.close()
+            except BufferError:
+                # ยังมี view ของ buffer ค้างอยู่ จะถูกปล่อยเมื่อ GC เก็บ
+                logger.warning(f"Worker {worker_id}: shared memory {shm_name} still referenced")
+        conn.send(result)
+
+
+class _WorkerHandle:
+    """process ลูกหนึ่งตัวกับ pipe ของมัน และลำดับงานที่ส่งให้แล้วแต่ยังไม่ได้ผล (ตัวแรก = กำลังทำ)"""
+
+    def __init__(self, worker_id, process, conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.tasks = deque()
+        self.ready = False
+        self.load_failed = False
+        self.exited = False
+        self.send_lock = threading.Lock()
+
+
+class InferenceWorkerPool:
+    """
+    Pool ของ process สำหรับ inference แต่ละ process โหลด LicensePlateDetector และ OCRService
+    ครั้งเดียวตอนเริ่ม จำกัดจำนวน torch threads ต่อ worker และรับภาพผ่าน shared memory (ไม่ต้อง pickle ภาพ)
+    - แต่ละ worker มี pipe ของตัวเอง (ไม่มี lock ข้าม process ที่ค้างได้เมื่อ worker ถูก kill)
+      pool เลือก worker ที่มีงานค้างน้อยที่สุด จึงรู้เสมอว่างานไหนอยู่กับ worker ตัวไหน
+    - worker ที่ตาย: งานที่กำลังทำ fail ด้วย WorkerCrashed งานที่รอต่อคิวถูกส่งใหม่ให้ worker ที่สร้างแทน
+    - งานที่เกิน task_timeout: fail ด้วย WorkerTaskTimeout ถ้า worker กำลังทำงานนั้นอยู่จะถูก kill แล้วสร้างใหม่
+    future ทุกตัวจึงจบเสมอ (ผู้รอไม่ค้างและคืน admission slot ได้)
+    """
+
+    def __init__(self, num_workers=3, torch_threads=1, detector_kwargs=None, ocr_kwargs=None,
+                 task_timeout=120.0, check_interval=1.0):
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads
+        self.task_timeout = task_timeout
+        self.check_interval = check_interval
+        self._detector_kwargs = detector_kwargs or {}
+        self._ocr_kwargs = ocr_kwargs or {}
+
+        self._ctx = mp.get_context("spawn")
+        self._pending = {}  # task_id -> [future, shm, deadline, message]
+        self._pending_lock = threading.Lock()
+        self._task_ids = itertools.count()
+
+        self.ready_workers = 0
+        self.failed_workers = 0
+        self.restarts = 0
+        self.crashed_tasks = 0
+        self.timed_out_tasks = 0
+        self._closing = False
+        self._ready_event = threading.Event()
+
+        self._workers = [self._spawn(i) for i in range(num_workers)]
+
+        self._listener = threading.Thread(target=self._collect_results, name="worker-pool-results", daemon=True)
+        self._listener.start()
+        logger.info(f"🚀 Started {num_workers} inference workers ({torch_threads} torch threads each)")
+
+    def _spawn(self, worker_id):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn, self.torch_threads, self._detector_kwargs, self._ocr_kwargs),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _WorkerHandle(worker_id, process, parent_conn)
+
+    def wait_ready(self, timeout=None):
+        """รอจนทุก worker โหลดโมเดลเสร็จ คืนค่า True ถ้ามี worker พร้อมอย่างน้อยหนึ่งตัว"""
+        self._ready_event.wait(timeout)
+        return self.ready_workers > 0
+
+    def submit(self, task_name, image, **kwargs):
+        """
+        ส่งงานให้ worker คืนค่า concurrent.futures.Future ของผลลัพธ์ (fail เมื่อเกิน task_timeout)
+        copy ภาพลง shared memory ใน thread ที่เรียก จาก event loop ให้ใช้ run() แทน
+        """
+        self._check_task(task_name)
+        return self._submit_staged(task_name, self._stage(image), kwargs)
+
+    async def run(self, task_name, image, **kwargs):
+        """
+        ส่งงานจาก event loop แล้วรอผลลัพธ์: จอง shared memory และ copy ภาพใน default executor
+        (ภาพหลายล้าน pixel ไม่บล็อก request อื่น) เหลือเฉพาะการส่งทาง pipe และลงทะเบียน future บน loop
+        """
+        self._check_task(task_name)
+        loop = asyncio.get_running_loop()
+        staging = loop.run_in_executor(None, self._stage, image)
+        try:
+            staged = await asyncio.shield(staging)
+        except asyncio.CancelledError:
+            # ผู้รอถูกยกเลิกระหว่าง copy: คืน shared memory เมื่อ copy เสร็จ
+            staging.add_done_callback(_release_staged)
+            raise
+        return await asyncio.wrap_future(self._submit_staged(task_name, staged, kwargs))
+
+    @staticmethod
+    def _check_task(task_name):
+        if task_name not in _TASKS:
+            raise ValueError(f"Unknown worker task: {task_name}")
+
+    @staticmethod
+    def _stage(image):
+        """copy ภาพลง shared memory ใหม่ คืนค่า (shm, shape, dtype)"""
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+        return shm, image.shape, image.dtype.str
+
+    def _submit_staged(self, task_name, staged, kwargs):
+        shm, shape, dtype = staged
+        future = Future()
+        task_id = next(self._task_ids)
+        deadline = time.monotonic() + self.task_timeout if self.task_timeout else None
+        message = (task_id, task_name, (shm.name, shape, dtype), kwargs)
+        with self._pending_lock:
+            handle = self._assign(task_id)
+            if handle is not None:
+                self._pending[task_id] = [future, shm, deadline, message]
+        if handle is None:
+            shm.close()
+            shm.unlink()
+            raise RuntimeError("No inference worker available")
+        self._send(handle, message)
+        return future
+
+    def _assign(self, task_id):
+        """
+        เลือก worker ที่มีงานค้างน้อยที่สุด (ที่พร้อมแล้วก่อน) แล้วจองงานไว้ (เรียกขณะถือ _pending_lock)
+        คืนค่า None ถ้าไม่มี worker ที่ใช้งานได้เลย
+        """
+        usable = [h for h in self._workers if not h.load_failed]
+        if not usable:
+            return None
+        handle = min([h for h in usable if h.ready] or usable, key=lambda h: len(h.tasks))
+        handle.tasks.append(task_id)
+        return handle
+
+    def _send(self, handle, message):
+        # ส่งนอก _pending_lock: pipe อาจเต็มชั่วคราวระหว่างที่ listener ต้องใช้ lock
+        try:
+            with handle.send_lock:
+                handle.conn.send(message)
+        except (OSError, ValueError):
+            # worker ตายแล้ว รอบตรวจของ listener จะจัดการงานนี้ (fail / ส่งใหม่)
+            pass
+
+    def pending_count(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _collect_results(self):
+        next_check = time.monotonic() + self.check_interval
+        while not self._closing:
+            # ตรวจ timeout ตามรอบเวลา แม้ผลลัพธ์จะเข้ามาตลอด
+            if time.monotonic() >= next_check:
+                self._expire_tasks()
+                next_check = time.monotonic() + self.check_interval
+
+            handles = [h for h in self._workers if not h.exited]
+            by_conn = {h.conn: h for h in handles}
+            by_sentinel = {h.process.sentinel: h for h in handles}
+            for ready in wait(list(by_conn) + list(by_sentinel), timeout=self.check_interval):
+                handle = by_conn.get(ready)
+                if handle is not None:
+                    self._receive(handle)
+            # process ที่จบแล้ว (อ่านผลที่ค้างใน pipe ไปแล้วด้านบน)
+            for handle in handles:
+                if handle.process.exitcode is not None:
+                    self._handle_exit(handle)
+
+    def _receive(self, handle):
+        try:
+            while handle.conn.poll():
+                item = handle.conn.recv()
+                if item[0] == _READY:
+                    self._mark_ready(handle, item[2])
+                    continue
+
+                task_id, ok, payload = item
+                with self._pending_lock:
+                    if task_id in handle.tasks:
+                        handle.tasks.remove(task_id)
+                    entry = self._pending.pop(task_id, None)
+                if entry is None:
+                    continue  # หมดเวลาไปแล้ว
+                if ok:
+                    self._finish(entry, result=payload)
+                else:
+                    self._finish(entry, error=RuntimeError(f"Inference worker failed:\n{payload}"))
+        except (EOFError, OSError):
+            pass  # worker ตาย จัดการใน _handle_exit
+
+    def _finish(self, entry, result=None, error=None):
+        future, shm = entry[0], entry[1]
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        if future.done():
+            return
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _mark_ready(self, handle, error):
+        if error is None:
+            handle.ready = True
+            logger.info(f"✅ Inference worker {handle.worker_id} ready")
+        else:
+            handle.load_failed = True
+            self.failed_workers += 1
+            logger.error(f"❌ Inference worker {handle.worker_id} failed to load models:\n{error}")
+        self.ready_workers = sum(1 for h in self._workers if h.ready)
+
+        if all(h.ready or h.load_failed for h in self._workers):
+            self._ready_event.set()
+
+    def _handle_exit(self, handle):
+        """worker จบการทำงาน: fail งานที่กำลังทำ สร้าง worker ใหม่ (ถ้าไม่ใช่โหลดโมเดลไม่สำเร็จ) แล้วส่งงานที่เหลือใหม่"""
+        if self._closing:
+            return
+        handle.exited = True
+        handle.conn.close()
+        with self._pending_lock:
+            task_ids, handle.tasks = list(handle.tasks), deque()
+            running = self._pending.pop(task_ids[0], None) if task_ids and not handle.load_failed else None
+            if running is not None:
+                task_ids = task_ids[1:]
+
+        if running is not None:
+            self.crashed_tasks += 1
+            self._finish(running, error=WorkerCrashed(f"Inference worker {handle.worker_id} exited"))
+
+        if handle.load_failed:
+            # exit ปกติหลังรายงานว่าโหลดโมเดลไม่สำเร็จ ไม่สร้างใหม่ (จะล้มเหลวซ้ำ)
+            replacement = handle
+        else:
+            logger.error(
+                f"💀 Inference worker {handle.worker_id} exited unexpectedly "
+                f"(exitcode={handle.process.exitcode}), respawning"
+            )
+            replacement = self._spawn(handle.worker_id)
+            self.restarts += 1
+        self._workers[handle.worker_id] = replacement
+        self.ready_workers = sum(1 for h in self._workers if h.ready)
+
+        # งานที่ยังไม่เริ่มส่งใหม่ตามลำดับเดิม
+        for task_id in task_ids:
+            with self._pending_lock:
+                entry = self._pending.get(task_id)
+                if entry is None:
+                    continue
+                target = self._assign(task_id)
+                if target is None:
+                    self._pending.pop(task_id)
+            if target is None:
+                self._finish(entry, error=WorkerCrashed("No inference worker available"))
+            else:
+                self._send(target, entry[3])
+
+    def _expire_tasks(self):
+        now = time.monotonic()
+        stuck = []
+        with self._pending_lock:
+            expired = [
+                (task_id, entry) for task_id, entry in self._pending.items()
+                if entry[2] is not None and entry[2] <= now
+            ]
+            for task_id, entry in expired:
+                del self._pending[task_id]
+                for handle in self._workers:
+                    if task_id in handle.tasks:
+                        if handle.tasks[0] == task_id:
+                            stuck.append(handle)
+                        handle.tasks.remove(task_id)
+
+        for task_id, entry in expired:
+            self.timed_out_tasks += 1
+            self._finish(entry, error=WorkerTaskTimeout(f"Inference task {task_id} timed out"))
+        for handle in stuck:
+            # worker ค้างอยู่กับงานที่หมดเวลา kill แล้วรอบถัดไปจะสร้างใหม่และส่งงานที่เหลือต่อ
+            logger.error(f"⏱️ Inference worker {handle.worker_id} stuck past task timeout, killing")
+            handle.process.kill()
+
+    def get_stats(self):
+        return {
+            'workers': self.num_workers,
+            'ready_workers': self.ready_workers,
+            'failed_workers': self.failed_workers,
+            'torch_threads': self.torch_threads,
+            'pending': self.pending_count(),
+            'task_timeout': self.task_timeout,
+            'restarts': self.restarts,
+            'crashed_tasks': self.crashed_tasks,
+            'timed_out_tasks': self.timed_out_tasks
+        }
+
+    def close(self):
+        self._closing = True
+        for handle in self._workers:
+            self._send(handle, None)
+        for handle in self._workers:
+            handle.process.join(timeout=10)
+            if handle.process.exitcode is None:
+                handle.process.kill()
+        self._listener.join(timeout=5)
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future, shm, _, _ in pending.values():
+            shm.close()
+            shm.unlink()
+            future.cancel()
@@ -0,0 +1,70 @@
+"""
+อ่านป้ายทะเบียนจากวิดีโอ (ไฟล์, named pipe หรือ URL เช่น rtsp://) แล้วพิมพ์ event เป็น JSON ทีละบรรทัด
+
+    python -m app.stream_cli path/to/video.mp4 --sample-every 3
+"""
+import sys
+import json
+import time
+import argparse
+import logging
+
+from app.services.detection_service import LicensePlateDetector
+from app.services.ocr_service import OCRService
+from app.services.pipeline import detector_kwargs, ocr_kwargs
+from app.services.stream_service import StreamProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="ไฟล์วิดีโอ, named pipe หรือ URL ของสตรีม")
+    parser.add_argument("--sample-every", type=int, default=3, help="ตรวจจับทุกๆ N เฟรม")
+    parser.add_argument("--iou-threshold", type=float, default=0.3)
+    parser.add_argument("--max-missed-frames", type=int, default=15,
+                        help="จำนวนเฟรมที่ sample แล้วไม่เจอก่อนปิด track")
+    parser.add_argument("--quality-gain", type=float, default=1.2,
+                        help="OCR ซ้ำเมื่อคุณภาพ crop ดีขึ้นอย่างน้อยกี่เท่า")
+    parser.add_argument("--max-ocr-per-track", type=int, default=3)
+    parser.add_argument("--dedup-iou", type=float, default=0.3,
+                        help="ตัดกล่องที่ซ้อนกันเกิน IoU นี้ในเฟรมเดียวกัน")
+    parser.add_argument("--min-track-confidence", type=float, default=0.25,
+                        help="confidence ขั้นต่ำของกล่องที่จะเปิด track ใหม่")
+    parser.add_argument("--output", default="-", help="ไฟล์ JSONL สำหรับ event (ค่าเริ่มต้น stdout)")
+    args = parser.parse_args(argv)
+
+    # ocr_service เรียก basicConfig(INFO) ตอน import แล้ว ต้อง force เพื่อให้ stdout มีแต่ event
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr, force=True)
+
+    # ใช้ค่าจาก LPR_* ชุดเดียวกับ API (profile, cascade, consensus, backend ฯลฯ) ผลจึงตรงกัน
+    processor = StreamProcessor(
+        LicensePlateDetector(**{**detector_kwargs(), "headless": True}),
+        OCRService(**ocr_kwargs()),
+        sample_every=args.sample_every,
+        iou_threshold=args.iou_threshold,
+        max_missed_frames=args.max_missed_frames,
+        quality_gain=args.quality_gain,
+        max_ocr_per_track=args.max_ocr_per_track,
+        dedup_iou=args.dedup_iou,
+        min_track_confidence=args.min_track_confidence
+    )
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start_time = time.time()
+    try:
+        for event in processor.run(args.source):
+            output.write(json.dumps(event, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    stats = processor.get_stats()
+    stats['elapsed'] = time.time() - start_time
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""
+เทียบ preprocess ของ OCRService ที่ใช้ PreprocessContext (CLAHE/kernel/buffer ใช้ซ้ำ)
+กับแบบเดิมที่จองภาพใหม่ทุกขั้นตอน: ตรวจว่าภาพทุก variant ตรงกันทุก pixel แล้วจับเวลาและ peak memory
+
+    python -m benchmarks.bench_preprocess [--count 50] [--repeat 5] [--profile fast] [--seed 0]
+
+peak memory วัดด้วย tracemalloc (numpy / OpenCV จองผ่าน allocator ของ numpy จึงถูกนับ)
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.services.ocr_service import OCRService
+
+# ขนาดภาพ crop ป้ายทะเบียน (h, w): เล็กกว่า 500x200 จะถูก upscale
+CROP_SIZES = [(60, 180), (90, 260), (120, 360), (220, 640)]
+
+
+def legacy_preprocess(img_array, profile):
+    """สำเนา preprocess เดิมของ OCRService (จอง CLAHE / kernel / ภาพใหม่ทุกครั้ง) ใช้เป็นค่าอ้างอิง"""
+    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+
+    height, width = gray.shape
+    if width < 500 or height < 200:
+        scale = max(500 / width, 200 / height)
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)),
+                          interpolation=cv2.INTER_CUBIC)
+
+    if profile == 'fast':
+        gray = cv2.bilateralFilter(gray, 5, 50, 50)
+    else:
+        gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(gray)
+
+    blurred = cv2.GaussianBlur(enhanced, (3, 3), 0)
+    sharpened = cv2.addWeighted(enhanced, 1.5, blurred, -0.5, 0)
+
+    otsu = cv2.threshold(sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    adaptive = cv2.adaptiveThreshold(
+        sharpened, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    )
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+    morph_open = cv2.morphologyEx(otsu, cv2.MORPH_OPEN, kernel)
+    morph_close = cv2.morphologyEx(otsu, cv2.MORPH_CLOSE, kernel)
+    return [sharpened, otsu, adaptive, morph_open, morph_close]
+
+
+def context_preprocess(service, img_array):
+    """เส้นทางที่ extract_text_with_details ใช้จริง: ได้ view ของ buffer (ไม่ copy)"""
+    variants = {}
+    return [service._get_variant(name, variants, img_array) for name in service.VARIANT_NAMES]
+
+
+def make_crops(rng, count):
+    crops = []
+    for index in range(count):
+        height, width = CROP_SIZES[index % len(CROP_SIZES)]
+        crop = rng.integers(150, 230, size=(height, width, 3), dtype=np.uint8)
+        cv2.putText(crop, f"{rng.integers(1000, 9999)}", (width // 10, int(height * 0.7)),
+                    cv2.FONT_HERSHEY_SIMPLEX, height / 50, (20, 20, 20), max(1, height // 25))
+        crops.append(crop)
+    return crops
+
+
+def measure(function, crops, repeat):
+    function(crops[0])  # warm-up: buffer ของ context ถูกจองครั้งแรกที่นี่
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for crop in crops:
+            function(crop)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for crop in crops:
+        function(crop)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best / len(crops), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", choices=OCRService.PREPROCESS_PROFILES, default="fast")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    crops = make_crops(np.random.default_rng(args.seed), args.count)
+    # ไม่ต้องใช้ EasyOCR (reader เป็น None ได้) เพราะวัดเฉพาะ preprocess
+    service = OCRService(preprocess_profile=args.profile)
+
+    mismatches = 0
+    for index, crop in enumerate(crops):
+        expected = legacy_preprocess(crop, args.profile)
+        for name, old, new in zip(service.VARIANT_NAMES, expected, context_preprocess(service, crop)):
+            if old.shape != new.shape or not np.array_equal(old, new):
+                mismatches += 1
+                print(f"mismatch: crop {index} {crop.shape[:2]} variant '{name}'")
+        for old, new in zip(expected, service.preprocess_image(crop)):
+            if not np.array_equal(old, new):
+                mismatches += 1
+                print(f"mismatch: crop {index} preprocess_image")
+    print(f"equivalence: {len(crops)} crops x {len(service.VARIANT_NAMES)} variants, {mismatches} mismatches")
+
+    runs = [
+        ("legacy", lambda crop: legacy_preprocess(crop, args.profile)),
+        ("context", lambda crop: context_preprocess(service, crop)),
+        ("context+copy", service.preprocess_image),
+    ]
+    for label, function in runs:
+        per_crop, peak = measure(function, crops, args.repeat)
+        print(f"{label:13s} {per_crop * 1e3:8.3f} ms/crop  peak {peak / 1024:9.1f} KiB")
+
+    context = service._preprocess_contexts.get()
+    print(f"context buffers: {context.nbytes / 1024:.1f} KiB in {context.allocations} allocations")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
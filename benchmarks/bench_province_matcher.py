@@ -0,0 +1,146 @@
+"""
+Microbenchmark: ProvinceMatcher เทียบกับการวนเทียบจังหวัดแบบเดิมของ OCRService
+
+    python -m benchmarks.bench_province_matcher [--repeat 20] [--seed 0]
+
+ตรวจว่าผล (จังหวัดและคะแนน) ตรงกันทุกข้อความก่อน แล้วจึงจับเวลา
+"""
+import argparse
+import difflib
+import random
+import time
+
+from app.services.province_matcher import THAI_PROVINCES, ProvinceMatcher
+
+THAI_CONSONANTS = 'กขคงจฉชซฌญฎฏฐฑฒณดตถทธนบปผฝพฟภมยรลวศษสหฬอฮ'
+
+
+def legacy_partial_match_province(provinces, text, min_length=3):
+    """สำเนาของ OCRService.partial_match_province ก่อนใช้ ProvinceMatcher (ใช้เป็นค่าอ้างอิง)"""
+    if len(text) < min_length:
+        return None, 0
+
+    best_match = None
+    best_score = 0
+
+    for province in provinces:
+        max_common_len = 0
+
+        if text in province:
+            score = len(text) / len(province)
+            if province.startswith(text):
+                score += 0.4
+            elif province.endswith(text):
+                score += 0.3
+            else:
+                score += 0.2
+
+            if score > best_score:
+                best_score = score
+                best_match = province
+                max_common_len = len(text)
+
+        elif province in text and len(province) >= min_length:
+            score = len(province) / len(text) + 0.1
+            if score > best_score:
+                best_score = score
+                best_match = province
+                max_common_len = len(province)
+
+        else:
+            for i in range(len(text) - min_length + 1):
+                for j in range(i + min_length, len(text) + 1):
+                    substring = text[i:j]
+                    if substring in province and len(substring) > max_common_len:
+                        max_common_len = len(substring)
+                        score = (len(substring) / len(province)) * 0.8
+                        if province.startswith(substring):
+                            score += 0.4
+                        elif province.endswith(substring):
+                            score += 0.3
+                        else:
+                            score += 0.2
+
+                        if score > best_score:
+                            best_score = score
+                            best_match = province
+
+    return best_match, best_score
+
+
+def legacy_fuzzy_match_province(provinces, text):
+    match = difflib.get_close_matches(text, provinces, n=1, cutoff=0.6)
+    return match[0] if match else None
+
+
+def make_inputs(rng, count):
+    provinces = sorted(THAI_PROVINCES)
+    inputs = []
+    for _ in range(count):
+        province = rng.choice(provinces)
+        kind = rng.randrange(5)
+        if kind == 0:
+            # ตัดหัวหรือท้ายเหมือน OCR อ่านไม่ครบ
+            start = rng.randrange(0, max(1, len(province) // 2))
+            end = rng.randrange(max(start + 1, len(province) // 2), len(province) + 1)
+            text = province[start:end]
+        elif kind == 1:
+            # แทนที่ตัวอักษรแบบสุ่ม
+            chars = list(province)
+            for _ in range(rng.randint(1, 3)):
+                chars[rng.randrange(len(chars))] = rng.choice(THAI_CONSONANTS)
+            text = ''.join(chars)
+        elif kind == 2:
+            # ข้อความป้ายทะเบียน (ไม่ใช่จังหวัด)
+            text = f"{rng.randint(1, 9)}{rng.choice(THAI_CONSONANTS)}{rng.choice(THAI_CONSONANTS)}{rng.randint(1, 9999)}"
+        elif kind == 3:
+            # จังหวัดติดกับตัวอักษรขยะ
+            text = rng.choice(THAI_CONSONANTS) + province + str(rng.randint(0, 99))
+        else:
+            text = ''.join(rng.choice(THAI_CONSONANTS) for _ in range(rng.randint(2, 20)))
+        inputs.append(text[:20])
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="จำนวนข้อความทดสอบ")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    provinces = set(THAI_PROVINCES)
+    matcher = ProvinceMatcher(provinces)
+    inputs = make_inputs(rng, args.count)
+
+    mismatches = 0
+    for text in inputs:
+        if legacy_partial_match_province(provinces, text) != matcher.partial_match_with_score(text):
+            mismatches += 1
+            print(f"partial mismatch: {text!r}")
+        if legacy_fuzzy_match_province(provinces, text) != matcher.fuzzy_match(text):
+            mismatches += 1
+            print(f"fuzzy mismatch: {text!r}")
+    print(f"equivalence: {len(inputs)} inputs, {mismatches} mismatches")
+
+    benchmarks = [
+        ("partial (legacy)", lambda t: legacy_partial_match_province(provinces, t)),
+        ("partial (ProvinceMatcher)", matcher.partial_match_with_score),
+        ("fuzzy (legacy)", lambda t: legacy_fuzzy_match_province(provinces, t)),
+        ("fuzzy (ProvinceMatcher)", matcher.fuzzy_match),
+    ]
+    for name, fn in benchmarks:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for text in inputs:
+                fn(text)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:28s} {best / len(inputs) * 1e6:9.2f} us/call")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
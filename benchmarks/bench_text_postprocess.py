@@ -0,0 +1,68 @@
+"""
+ตรวจความเท่ากันและจับเวลา PlateTextPostProcessor เทียบกับเมธอดทำความสะอาดข้อความเดิมของ OCRService
+
+    python -m benchmarks.bench_text_postprocess [--count 20000] [--repeat 5] [--seed 0]
+
+ตรวจ clean_text, smart_correct_license_chars, is_license_plate_fragment และ is_valid_license_plate
+กับข้อความสุ่ม (อักษรไทย สระ/วรรณยุกต์ ตัวเลขไทย/อารบิก ตัวอักษรอังกฤษ ช่องว่าง) และคำใน COMMON_CORRECTIONS
+ค่าอ้างอิง (LegacyTextCleaner) และชุดข้อความอยู่ใน tests/legacy_text.py ใช้ร่วมกับ tests/test_text_postprocess.py
+"""
+import argparse
+import logging
+import random
+import time
+
+from app.services.text_postprocess import COMMON_CORRECTIONS, PlateTextPostProcessor
+from tests.legacy_text import LegacyTextCleaner, make_inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(args.seed)
+    inputs = make_inputs(rng, args.count)
+
+    legacy = LegacyTextCleaner()
+    processor = PlateTextPostProcessor(COMMON_CORRECTIONS)
+    pairs = [
+        ("clean_text", legacy.clean_text, processor.clean),
+        ("smart_correct_license_chars", legacy.smart_correct_license_chars, processor.smart_correct),
+        ("is_license_plate_fragment", legacy.is_license_plate_fragment, processor.is_fragment),
+        ("is_valid_license_plate", legacy.is_valid_license_plate, processor.is_valid_plate),
+    ]
+
+    mismatches = 0
+    for name, old, new in pairs:
+        for text in inputs:
+            if old(text) != new(text):
+                mismatches += 1
+                print(f"{name} mismatch: {text!r}: {old(text)!r} != {new(text)!r}")
+        # ตรวจต่อกับผลของ clean_text ด้วย (ข้อความที่ใช้จริงใน pipeline)
+        if name.startswith("is_"):
+            for text in inputs:
+                cleaned = legacy.clean_text(text)
+                if old(cleaned) != new(cleaned):
+                    mismatches += 1
+                    print(f"{name} mismatch on cleaned text: {cleaned!r}")
+    print(f"equivalence: {len(inputs)} inputs x {len(pairs)} functions, {mismatches} mismatches")
+
+    for name, old, new in pairs:
+        for label, function in (("legacy", old), ("processor", new)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for text in inputs:
+                    function(text)
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:10s} {name:28s} {best / len(inputs) * 1e6:9.2f} us/call")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,285 @@
+"""
+Benchmark ของ serving pipeline (decode -> LicensePlateDetector -> OCRService) บนชุดภาพ golden แบบ offline / CPU
+
+    python -m benchmarks.run_benchmark --golden path/to/golden [--repeat 3] [--warmup 2]
+    python -m benchmarks.run_benchmark --golden path/to/golden \\
+        --config "baseline:" \\
+        --config "fast:LPR_OCR_PREPROCESS_PROFILE=fast,LPR_OCR_CASCADE=1"
+
+โฟลเดอร์ golden ต้องมีไฟล์ labels.csv (header: filename,plate,province) และภาพตามชื่อใน filename
+แต่ละ --config รันใน subprocess แยก (ค่าใน app.config อ่านจาก env ตอน import และ peak RSS แยกกัน)
+config แรกเป็น baseline ส่วน config ถัดไปจะถูกเทียบทั้งความเร็วและความแม่นยำ
+
+รายงาน: throughput, p50/p95/p99 ของแต่ละขั้นตอน (ms), peak RSS, ความแม่นยำ (ป้ายตรงทั้งหมด, จังหวัดตรง)
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# บังคับ CPU และไม่ดาวน์โหลดอะไรระหว่าง benchmark (โมเดลต้องอยู่ในเครื่องแล้ว)
+OFFLINE_ENV = {
+    "CUDA_VISIBLE_DEVICES": "",
+    "YOLO_OFFLINE": "True",
+    "HF_HUB_OFFLINE": "1",
+    "LPR_HEADLESS": "1",
+    "LPR_WORKER_MODE": "thread",
+}
+
+
+def load_golden(golden_dir):
+    """อ่าน labels.csv คืนค่า list ของ (path, plate, province)"""
+    labels_path = os.path.join(golden_dir, "labels.csv")
+    samples = []
+    with open(labels_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = os.path.join(golden_dir, row["filename"])
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Golden image not found: {path}")
+            samples.append((path, (row.get("plate") or "").strip(), (row.get("province") or "").strip()))
+    if not samples:
+        raise ValueError(f"No samples in {labels_path}")
+    return samples
+
+
+def normalize_plate(text):
+    return "".join(text.split())
+
+
+def percentile(values, q):
+    """percentile แบบ linear interpolation (เหมือน numpy.percentile ค่า default)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples_ms):
+    return {
+        stage: {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        for stage, values in sorted(samples_ms.items())
+        if values
+    }
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB, macOS เป็น bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_pipeline(golden_dir, repeat, warmup):
+    """รันใน process ปัจจุบันด้วย config จาก env คืนค่า dict ของผล benchmark"""
+    from app import config
+    from app.services.detection_service import LicensePlateDetector
+    from app.services.image_io import decode_image
+    from app.services.ocr_service import OCRService
+    from app.services.pipeline import detector_kwargs, ocr_kwargs
+
+    samples = load_golden(golden_dir)
+    payloads = []
+    for path, plate, province in samples:
+        with open(path, "rb") as f:
+            payloads.append((os.path.basename(path), f.read(), plate, province))
+
+    load_start = time.perf_counter()
+    # ใช้ kwargs ชุดเดียวกับ API เพื่อให้ --config ทุกค่า (LPR_OCR_*) มีผลกับ service ที่ถูกวัด
+    detector = LicensePlateDetector(**{**detector_kwargs(), "headless": True})
+    ocr_service = OCRService(**ocr_kwargs())
+    load_time = time.perf_counter() - load_start
+    if detector.model is None or ocr_service.reader is None:
+        raise RuntimeError("Models are not available locally (benchmark runs offline)")
+
+    def recognize(data):
+        timings = {}
+        start = time.perf_counter()
+        image = decode_image(data, config.DECODE_MAX_SIDE)
+        timings["decode"] = (time.perf_counter() - start) * 1000
+
+        stage_start = time.perf_counter()
+        detected_plates = detector.detect_license_plates(image)
+        timings["detect"] = (time.perf_counter() - stage_start) * 1000
+
+        stage_start = time.perf_counter()
+        details = ocr_service.extract_text_with_details(
+            detected_plates[0]["image"] if detected_plates else image
+        )
+        timings["ocr"] = (time.perf_counter() - stage_start) * 1000
+        timings["total"] = (time.perf_counter() - start) * 1000
+
+        for stage, elapsed in details.get("timings", {}).items():
+            timings[f"ocr.{stage}"] = elapsed
+        return details, timings
+
+    # warm-up (ไม่นับเวลา): โหลด lazy state ของ torch / EasyOCR
+    for _, data, _, _ in payloads[:warmup]:
+        recognize(data)
+
+    stage_samples = {}
+    predictions = {}
+    measured = 0
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for filename, data, plate, province in payloads:
+            details, timings = recognize(data)
+            measured += 1
+            for stage, elapsed in timings.items():
+                stage_samples.setdefault(stage, []).append(elapsed)
+            # เก็บผลของรอบแรก (pipeline เป็น deterministic)
+            predictions.setdefault(filename, {
+                "expected_plate": plate,
+                "expected_province": province,
+                "plate": details["plate"],
+                "province": details["province"],
+                "text": details["text"],
+            })
+    wall_time = time.perf_counter() - wall_start
+
+    plate_hits = sum(
+        normalize_plate(p["plate"]) == normalize_plate(p["expected_plate"]) for p in predictions.values()
+    )
+    province_hits = sum(p["province"] == p["expected_province"] for p in predictions.values())
+    both_hits = sum(
+        normalize_plate(p["plate"]) == normalize_plate(p["expected_plate"])
+        and p["province"] == p["expected_province"]
+        for p in predictions.values()
+    )
+
+    return {
+        "images": len(payloads),
+        "requests": measured,
+        "model_load_seconds": load_time,
+        "wall_seconds": wall_time,
+        "throughput_per_second": measured / wall_time if wall_time else None,
+        "latency_ms": summarize(stage_samples),
+        "peak_rss_mb": peak_rss_mb(),
+        "accuracy": {
+            "plate_exact": plate_hits / len(predictions),
+            "province": province_hits / len(predictions),
+            "plate_and_province": both_hits / len(predictions),
+        },
+        "predictions": predictions,
+    }
+
+
+def parse_config(spec):
+    """แปลง "name:KEY=VALUE,KEY=VALUE" เป็น (name, env overrides)"""
+    name, _, assignments = spec.partition(":")
+    overrides = {}
+    for assignment in filter(None, (part.strip() for part in assignments.split(","))):
+        key, sep, value = assignment.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid config override '{assignment}' (expected KEY=VALUE)")
+        overrides[key.strip()] = value.strip()
+    return name.strip() or "config", overrides
+
+
+def run_config(name, overrides, args):
+    """รัน benchmark ของหนึ่ง config ใน subprocess แล้วอ่านผล JSON กลับมา"""
+    env = {**os.environ, **OFFLINE_ENV, **overrides}
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        command = [
+            sys.executable, "-m", "benchmarks.run_benchmark",
+            "--golden", args.golden, "--repeat", str(args.repeat), "--warmup", str(args.warmup),
+            "--single-run", result_path
+        ]
+        print(f"▶️  [{name}] {' '.join(f'{k}={v}' for k, v in overrides.items()) or '(defaults)'}", file=sys.stderr)
+        subprocess.run(command, env=env, check=True)
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        os.unlink(result_path)
+    result["name"] = name
+    result["overrides"] = overrides
+    return result
+
+
+def print_report(results):
+    stages = sorted({stage for result in results for stage in result["latency_ms"]})
+    names = [result["name"] for result in results]
+    width = max(14, *(len(name) for name in names))
+
+    def row(label, values):
+        print(f"{label:28s}" + "".join(f"{value:>{width + 2}s}" for value in values))
+
+    row("", names)
+    row("throughput (img/s)", [f"{r['throughput_per_second']:.2f}" for r in results])
+    row("peak RSS (MB)", [f"{r['peak_rss_mb']:.0f}" for r in results])
+    row("model load (s)", [f"{r['model_load_seconds']:.1f}" for r in results])
+    for metric in ("plate_exact", "province", "plate_and_province"):
+        row(f"accuracy {metric}", [f"{r['accuracy'][metric] * 100:.1f}%" for r in results])
+    for stage in stages:
+        for q in ("p50", "p95", "p99"):
+            values = []
+            for r in results:
+                summary = r["latency_ms"].get(stage)
+                values.append(f"{summary[q]:.1f}" if summary else "-")
+            row(f"{stage} {q} (ms)", values)
+
+    baseline = results[0]
+    for result in results[1:]:
+        changed = [
+            (filename, prediction, result["predictions"].get(filename))
+            for filename, prediction in baseline["predictions"].items()
+            if result["predictions"].get(filename, {}).get("text") != prediction["text"]
+        ]
+        print(f"\n🔍 {result['name']} vs {baseline['name']}: {len(changed)} images with different output")
+        for filename, before, after in changed:
+            after_text = after["text"] if after else None
+            print(f"   {filename}: '{before['text']}' -> '{after_text}' "
+                  f"(expected '{before['expected_plate']} {before['expected_province']}')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", required=True, help="โฟลเดอร์ภาพ golden ที่มี labels.csv")
+    parser.add_argument("--config", action="append", default=[],
+                        help='"name:KEY=VALUE,..." (ใส่ได้หลายครั้ง, config แรกเป็น baseline)')
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบที่วัดผลต่อภาพ")
+    parser.add_argument("--warmup", type=int, default=2, help="จำนวนภาพ warm-up ที่ไม่นับเวลา")
+    parser.add_argument("--output", help="เขียนผลทั้งหมดเป็น JSON")
+    parser.add_argument("--fail-on-accuracy-drop", action="store_true",
+                        help="exit code 1 ถ้า config ใดแม่นยำน้อยกว่า baseline")
+    parser.add_argument("--single-run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_run:
+        result = run_pipeline(args.golden, args.repeat, args.warmup)
+        with open(args.single_run, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        return 0
+
+    configs = [parse_config(spec) for spec in args.config] or [("current", {})]
+    results = [run_config(name, overrides, args) for name, overrides in configs]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.fail_on_accuracy_drop:
+        baseline = results[0]["accuracy"]["plate_and_province"]
+        if any(result["accuracy"]["plate_and_province"] < baseline for result in results[1:]):
+            print("❌ Accuracy dropped compared to baseline", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
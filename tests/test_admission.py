@@ -0,0 +1,71 @@
+"""
+ตรวจลำดับการให้ slot ของ AdmissionController (FIFO ตามน้ำหนัก)
+
+    python -m pytest tests
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def test_light_waiter_admitted_when_heavy_head_times_out():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=3)
+        now = time.monotonic()
+        await controller.acquire(now + 5, weight=2)
+
+        # หัวคิวต้องการ 3 หน่วย (รอไม่ได้เพราะมีงานถือ 2 หน่วย) ผู้รอเบาข้างหลังต้องรอตาม FIFO
+        heavy = asyncio.ensure_future(controller.acquire(now + 0.05, weight=3))
+        light = asyncio.ensure_future(controller.acquire(now + 1.0, weight=1))
+        await asyncio.sleep(0)
+        assert not light.done()
+
+        with pytest.raises(AdmissionRejected):
+            await heavy
+        # ไม่ต้องรอ release() ครั้งถัดไป
+        await asyncio.wait_for(light, 0.5)
+        assert controller.get_stats()['active'] == 3
+        assert controller.get_stats()['waiting'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_light_waiter_admitted_when_heavy_head_is_cancelled():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=3)
+        now = time.monotonic()
+        await controller.acquire(now + 5, weight=2)
+
+        heavy = asyncio.ensure_future(controller.acquire(now + 5, weight=3))
+        light = asyncio.ensure_future(controller.acquire(now + 5, weight=1))
+        await asyncio.sleep(0)
+        heavy.cancel()
+
+        await asyncio.wait_for(light, 0.5)
+        assert controller.get_stats()['active'] == 3
+
+    asyncio.run(scenario())
+
+
+def test_release_keeps_fifo_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2)
+        now = time.monotonic()
+        await controller.acquire(now + 5, weight=1)
+
+        heavy = asyncio.ensure_future(controller.acquire(now + 5, weight=2))
+        light = asyncio.ensure_future(controller.acquire(now + 5, weight=1))
+        await asyncio.sleep(0)
+        # มีหน่วยว่าง 1 หน่วยแต่ผู้รอเบาไม่แซงหัวคิว
+        assert not light.done()
+
+        controller.release(1)
+        await asyncio.wait_for(heavy, 0.5)
+        assert not light.done()
+        controller.release(2)
+        await asyncio.wait_for(light, 0.5)
+
+    asyncio.run(scenario())
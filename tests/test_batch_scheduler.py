@@ -0,0 +1,58 @@
+"""
+ตรวจ MicroBatchScheduler: รวม request เป็น batch, ส่ง metrics เข้า /metrics และไม่ทิ้งผู้รอค้างเมื่อ stop
+
+    python -m pytest tests
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import metrics
+from app.services.batch_scheduler import MicroBatchScheduler
+
+
+class _Detector:
+    def __init__(self):
+        self.batches = []
+
+    def detect_license_plates_batch(self, images):
+        self.batches.append(len(images))
+        return [[image] for image in images]
+
+
+def test_batches_and_exports_metrics():
+    async def scenario():
+        detector = _Detector()
+        scheduler = MicroBatchScheduler(detector, ThreadPoolExecutor(1), max_batch_size=4, max_wait_ms=20)
+        scheduler.start()
+        results = await asyncio.wait_for(asyncio.gather(*[scheduler.detect(i) for i in range(8)]), 5)
+        await scheduler.stop()
+        return detector, results
+
+    detector, results = asyncio.run(scenario())
+    assert results == [[i] for i in range(8)]
+    assert sum(detector.batches) == 8 and max(detector.batches) <= 4
+
+    rendered = metrics.render()
+    assert "lpr_microbatch_size_count" in rendered
+    assert "lpr_microbatch_queue_depth_count" in rendered
+
+
+def test_stop_fails_waiting_requests():
+    async def scenario():
+        # max_wait ยาวมาก: request ทั้งหมดรออยู่ในคิว / batch ที่กำลังเก็บ ตอน stop
+        scheduler = MicroBatchScheduler(_Detector(), ThreadPoolExecutor(1), max_batch_size=16, max_wait_ms=60000)
+        scheduler.start()
+        waiting = [asyncio.ensure_future(scheduler.detect(name)) for name in "abc"]
+        await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(scheduler.stop(), 5)
+        for future in waiting:
+            assert future.done()
+            with pytest.raises(RuntimeError):
+                future.result()
+        with pytest.raises(RuntimeError):
+            await scheduler.detect("d")
+
+    asyncio.run(scenario())
@@ -0,0 +1,39 @@
+"""
+ตรวจว่า PreprocessContext ใช้ buffer ซ้ำสำหรับภาพขนาดปกติ และไม่เก็บ buffer ของภาพที่ใหญ่เกิน
+
+    python -m pytest tests
+"""
+import numpy as np
+
+from app.services.preprocess_context import DEFAULT_MAX_POOLED, PreprocessContext
+
+
+def test_gray_crop_reuses_buffer():
+    context = PreprocessContext()
+    for _ in range(5):
+        context.buffer('resized', (200, 860))
+    assert context.allocations == 1
+    assert context.unpooled == 0
+
+
+def test_bgr_crop_reuses_buffer():
+    # buffer BGR ที่ส่งเข้า text detector ของ crop ที่ upscale แล้ว (860x200x3)
+    context = PreprocessContext()
+    first = context.buffer('detect_bgr', (200, 860, 3))
+    for _ in range(5):
+        again = context.buffer('detect_bgr', (200, 860, 3))
+    assert np.shares_memory(first, again)
+    assert context.allocations == 1
+    assert context.unpooled == 0
+
+
+def test_oversized_image_is_not_pooled():
+    context = PreprocessContext()
+    before = context.nbytes
+    image = context.buffer('gray', (1080, 1920))
+    assert image.shape == (1080, 1920)
+    assert context.unpooled == 1
+    assert context.nbytes == before
+    assert context.buffer('detect_bgr', (1080, 1920, 3)) is not None
+    assert context.unpooled == 2
+    assert context.nbytes <= DEFAULT_MAX_POOLED * 3
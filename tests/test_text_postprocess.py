@@ -0,0 +1,87 @@
+"""
+ตรวจว่า PlateTextPostProcessor ให้ผลเหมือนเมธอดทำความสะอาดข้อความเดิมของ OCRService ทุกกรณี
+ไม่โหลด OpenCV / EasyOCR (ค่าอ้างอิงและชุดข้อความอยู่ใน tests/legacy_text.py)
+
+    python -m pytest tests
+"""
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from app.services.text_postprocess import COMMON_CORRECTIONS, PlateTextPostProcessor
+from tests.legacy_text import LegacyTextCleaner, make_inputs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INPUTS = make_inputs(random.Random(0), 5000)
+
+PAIRS = [
+    ("clean_text", "clean"),
+    ("smart_correct_license_chars", "smart_correct"),
+    ("is_license_plate_fragment", "is_fragment"),
+    ("is_valid_license_plate", "is_valid_plate"),
+]
+
+
+@pytest.fixture(scope="module")
+def legacy():
+    return LegacyTextCleaner()
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return PlateTextPostProcessor(COMMON_CORRECTIONS)
+
+
+def test_does_not_load_ocr_dependencies():
+    # ตรวจใน interpreter ใหม่ ไม่ขึ้นกับ test อื่นที่ import OpenCV ไปแล้วใน process นี้
+    code = (
+        "import sys, app.services.text_postprocess, tests.legacy_text; "
+        "print(sorted(m for m in ('cv2', 'easyocr', 'app.services.ocr_service') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+@pytest.mark.parametrize("legacy_name, new_name", PAIRS)
+def test_matches_legacy(legacy, processor, legacy_name, new_name):
+    old, new = getattr(legacy, legacy_name), getattr(processor, new_name)
+    mismatches = [text for text in INPUTS if old(text) != new(text)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("legacy_name, new_name", PAIRS[2:])
+def test_validation_matches_legacy_on_cleaned_text(legacy, processor, legacy_name, new_name):
+    # ข้อความที่ใช้จริงใน pipeline ผ่าน clean_text มาแล้ว
+    old, new = getattr(legacy, legacy_name), getattr(processor, new_name)
+    cleaned = {legacy.clean_text(text) for text in INPUTS}
+    mismatches = [text for text in cleaned if old(text) != new(text)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("กข1234", "กช1234"),
+    (" รุงเทพฯ ", "กรุงเทพมหานคร"),
+    ("1กช 4559", "1กช4559"),
+    ("", ""),
+])
+def test_clean_examples(processor, text, expected):
+    assert processor.clean(text) == expected
+
+
+@pytest.mark.parametrize("text, valid, fragment", [
+    ("กช4559", True, True),
+    ("1กช4559", True, False),
+    ("กช4559ก", True, False),
+    ("1กช", False, True),
+    ("4559", False, True),
+    ("กช", False, True),
+])
+def test_plate_patterns(processor, text, valid, fragment):
+    assert processor.is_valid_plate(text) is valid
+    assert processor.is_fragment(text) is fragment
@@ -0,0 +1,46 @@
+"""
+ตรวจ CallbackPolicy: callback_url ของ job ต้องไม่ชี้ไปยัง address ภายใน (ใช้ IP ตรงๆ ไม่ต้องมี DNS)
+
+    python -m pytest tests
+"""
+import pytest
+
+from app.services.webhook import CallbackPolicy, CallbackRejected
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/hook",
+    "http://localhost/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.10/hook",
+    "http://172.16.0.1/hook",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://0.0.0.0/hook",
+])
+def test_rejects_private_targets(url):
+    with pytest.raises(CallbackRejected):
+        CallbackPolicy().check(url)
+
+
+@pytest.mark.parametrize("url", ["ftp://8.8.8.8/hook", "file:///etc/passwd", "http:///hook", "http://8.8.8.8:99999/"])
+def test_rejects_invalid_urls(url):
+    with pytest.raises(CallbackRejected):
+        CallbackPolicy().check(url)
+
+
+def test_accepts_public_address():
+    assert CallbackPolicy().check("https://8.8.8.8/hook") == "https://8.8.8.8/hook"
+
+
+def test_allowlist():
+    policy = CallbackPolicy(allowed_hosts=["8.8.8.8"])
+    assert policy.check("http://8.8.8.8/hook")
+    with pytest.raises(CallbackRejected):
+        policy.check("http://1.1.1.1/hook")
+
+
+def test_allow_private():
+    policy = CallbackPolicy(allow_private=True)
+    assert policy.check("http://10.0.0.5/hook")